@@ -1,20 +1,26 @@
 import streamlit as st
 import os
-import tempfile
-import docx
+import html
 import textwrap
-import contextlib
 from read_docx_util import read_docx
-from pdf_converter import batch_convert_to_pdf
-from PyPDF2 import PdfReader
-from highlighting import highlight_errors
+from pdf_converter import batch_convert_to_pdf, DEFAULT_CONVERT_WORKERS
+from folder_scanner import DEFAULT_INCLUDE
+from pdf_reader import read_pdf_text, read_pdf_sections, PDF_PREVIEW_MAX_PAGES
+from highlighting import highlight_categorized, build_section_html, span_anchors, CATEGORY_STYLES
+from report_render import make_report_key, page_count, build_results_page_html, build_card_html, get_render_cache, RESULTS_PAGE_SIZE
+from revision_tracker import RevisionPlan, plan_revision, get_revision_store, lineage_key
+from chunking import build_chunks, assign_findings, collect_section_errors
+from parse_cache import get_parse_cache
+from result_cache import CachedChain, get_result_cache
+from structured_output import IncrementalJsonArrayParser, reask_failed
+from job_queue import get_job_manager, ACTIVE_STATUSES
+from metrics import start_run, span, start_metrics_server, get_metrics, record_structured_output
+from llm_clients import get_client_registry
+from llm_runner import run_chain_tasks, stream_chain_tasks, get_rate_limiter, quiet_llm_output, RUN_MODES, DEFAULT_MAX_CONCURRENCY
 import time 
 
-# --- LangChain 관련 임포트 ---
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+# --- 체인 생성 (LangChain은 체인을 처음 만들 때 불러옴) ---
+from chains import get_proofreading_chain, get_logical_error_chain, get_english_chain, get_chain
 
 import re
 
@@ -27,14 +33,17 @@ def escape_markdown_special_chars(text):
 
 # [함수] 파일 변경 시 상태 리셋
 def reset_state():
-    keys_to_reset = ["proofreading_results", "logic_results", "style_results", "highlighted_preview"]
+    keys_to_reset = ["proofreading_results", "logic_results", "style_results", "highlighted_preview", "cache_stats", "parse_stats", "revision_summary", "job_id"]
+    keys_to_reset += [f"report_key_{analysis_type}" for analysis_type in ANALYSIS_TYPES]
     for key in keys_to_reset:
         if key in st.session_state:
             st.session_state[key] = None
 
 # --- 읽기 함수 ---
+# python-docx는 docx 파일을 처음 읽을 때 불러옵니다. (첫 화면 로딩 시간 단축)
 def read_raw_docx(file_path):
     try:
+        import docx
         doc = docx.Document(file_path)
         full_text = []
         for para in doc.paragraphs:
@@ -43,190 +52,436 @@ def read_raw_docx(file_path):
     except Exception as e:
         return f"파일을 읽는 중 오류가 발생했습니다: {str(e)}"
 
-def read_pdf(file):
-    reader = PdfReader(file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    return text
-
-# --- 체인 생성 함수들 ---
-def get_proofreading_chain(api_key):
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0, google_api_key=api_key)
-    template = """
-    당신은 한국어 교정 전문가입니다. 아래 텍스트에서 오타, 비문, 어색한 표현을 찾아주세요.
-    [텍스트]: {text}
-    [응답 형식]: JSON 포맷 (error_sentence, correction, reason)
+def read_document_sections(document):
+    """docx는 굵은 제목 기준, PDF는 페이지 기준으로 섹션을 나눕니다. (같은 문서는 한 번만 파싱)"""
+    if document.suffix == '.pdf':
+        return document.get_sections(read_pdf_sections)
+    return document.get_sections(read_docx)
+
+# 분석 종류별 (체인 생성 함수, 결과 저장 키) : 카테고리 이름은 highlighting.CATEGORY_STYLES의 색상과 연결됨
+ANALYSIS_TYPES = {
+    "proofreading": (get_proofreading_chain, "proofreading_results"),
+    "logic": (get_logical_error_chain, "logic_results"),
+    "style": (get_english_chain, "style_results"),
+}
+ANALYSIS_LABELS = {"proofreading": "오타/비문", "logic": "논리/팩트", "style": "영어 스타일"}
+
+STREAM_RENDER_INTERVAL = 0.5 # 스트리밍 모드에서 화면을 다시 그리는 최소 간격(초)
+JOB_POLL_INTERVAL = 1.0       # 백그라운드 작업 진행 상황을 다시 조회하는 간격(초)
+
+ADMIN_PANEL_ENABLED = os.getenv("METRICS_ADMIN_PANEL", "0") == "1" # 관리자 패널(단계별 소요 시간/캐시 적중률) 탭 표시 여부
+
+# 실행 방식 : llm_runner의 실행 방식 + 작업 큐(job_queue)로 넘기는 백그라운드 작업
+RUN_MODE_OPTIONS = {**RUN_MODES, "background": "백그라운드 작업"}
+
+# --- 미리보기 HTML 생성 헬퍼 함수 ---
+def build_preview_container(preview_content):
+    return textwrap.dedent(f"""
+        <div style="height: 600px; overflow-y: scroll; border: 1px solid #dee2e6; padding: 20px; border-radius: 5px; background-color: #ffffff; color: #333333; font-family: sans-serif; font-size: 14px; line-height: 1.6;">
+            {preview_content}
+        </div>
+    """)
+
+def build_report(sections, section_errors, section_failures, analysis_types, run=None):
     """
-    # (실제 템플릿 내용은 위 코드와 동일하므로 생략하거나 유지)
-    template = """
-    당신은 한국어 교정 전문가입니다. 아래 텍스트에서 오타, 비문, 어색한 표현을 찾아주세요.
-
-    [텍스트]:
-    {text}
-
-    [응답 형식]:
-    반드시 아래와 같은 **JSON 포맷**으로만 응답하세요. 다른 말은 하지 마세요.
-    오류가 없으면 빈 리스트 [] 를 반환하세요.
-
-    [
-      {{
-        "error_sentence": "오류가 포함된 원본 문장 또는 단어 구절 (원본 텍스트와 정확히 일치해야 함)",
-        "correction": "수정 제안 내용",
-        "reason": "수정 이유"
-      }},
-      ...
-    ]
+    섹션별 오류를 하이라이트하여 (분석 종류별 결과 카드 데이터, 미리보기 HTML)을 만듦
+    run(metrics.AnalysisRun)이 있으면 하이라이트/HTML 생성 시간을 단계별로 기록함
+    미리보기에서 위치를 찾은 지적 사항에는 anchor(하이라이트의 HTML id)를 붙여, 결과 카드에서 원문 위치로 이동할 수 있게 함
     """
-    prompt = PromptTemplate.from_template(template)
-    return prompt | llm | StrOutputParser()
-
-def get_logical_error_chain(api_key):
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0, google_api_key=api_key)
-    template = """
-    [역할(Role)]: 전문 팩트체커
-    [텍스트]: {text}
-    [지시사항]: 시간, 장소, 인물, 수치, 인과관계, 모순 검증.
-    [응답 형식]:
-    반드시 아래와 같은 **JSON 포맷**으로만 응답하세요. 다른 말은 하지 마세요.
-    오류가 없으면 빈 리스트 [] 를 반환하세요.
-
-    [
-      {{
-        "error_sentence": "오류가 포함된 원본 문장 또는 단어 구절 (원본 텍스트와 정확히 일치해야 함)",
-        "correction": "수정 제안 내용",
-        "reason": "논리적 모순에 대한 상세 설명"
-      }},
-      ...
-    ]
+    results = {analysis_type: [] for analysis_type in analysis_types}
+    full_highlighted_content = []
+
+    for i, section in enumerate(sections):
+        title = section.get('title', '제목 없음')
+        content = section.get('content', '')
+        failures = section_failures[i]
+
+        try:
+            if len(failures) == len(analysis_types):
+                raise next(iter(failures.values()))
+
+            # 하이라이팅 처리 (모든 체인이 동일한 JSON 구조를 가지므로 공통 사용 가능)
+            with span("highlight", run):
+                highlighted_text, errors_by_type, spans = highlight_categorized(content, section_errors[i], anchor_prefix=f"s{i}")
+                anchors = span_anchors(spans, f"s{i}")
+            safe_highlighted = escape_markdown_special_chars(highlighted_text) # 마크다운 특수 문자가 의도치 않게 렌더링 되어 스타일이 깨지는 것을 방지하기 위한 함수 사용
+
+            for analysis_type, errors in errors_by_type.items():
+                if errors:
+                    errors = [
+                        {**error, "anchor": anchors[(analysis_type, index)]} if (analysis_type, index) in anchors else error
+                        for index, error in enumerate(errors)
+                    ]
+                    results[analysis_type].append({"title": title, "errors": errors})
+
+            # HTML 미리보기 생성
+            with span("render", run):
+                full_highlighted_content.append(build_section_html(title, safe_highlighted))
+            # 일부 분석만 실패한 경우, 성공한 결과는 보여주고 실패 내용은 아래에 표시
+            for error in failures.values():
+                full_highlighted_content.append(f"<p style='color:red;'>⚠️ Error: {error}</p>")
+
+        except Exception as e:
+            full_highlighted_content.append(f"<p style='color:red;'>⚠️ Error: {e}</p>")
+
+    return results, "\n".join(full_highlighted_content)
+
+def store_report(sections, chunks, outputs, analysis_types, run=None, document_hash=None, revision=None):
     """
-    prompt = PromptTemplate.from_template(template)
-    return prompt | llm | StrOutputParser()
-
-def get_english_chain(api_key):
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0, google_api_key=api_key)
-    template = """
-    [역할(Role)]: 수석 비즈니스 영어 에디터 (Reporting Style)
-    [텍스트]: {text}
-    [검증 기준]: 객관성, 간결성, 격식(No contractions/slang), 명확성.
-    [응답 형식]:
-    반드시 아래와 같은 **JSON 포맷**으로만 응답하세요. 다른 말은 하지 마세요.
-    수정할 사항이 없으면 빈 리스트 [] 를 반환하세요.
-
-    [
-      {{
-        "error_sentence": "스타일에 맞지 않는 원본 문장 또는 단어 구절 (원본 텍스트와 정확히 일치해야 함)",
-        "correction": "더 전문적이고 보고서에 적합한 수정 제안 (영어)",
-        "reason": "해당 표현이 보고용 문체로 부적절한 이유 (한국어로 설명)"
-      }},
-      ...
-    ]
+    응답 목록으로 결과 카드/미리보기를 만들어 session_state에 저장 (일반 실행과 백그라운드 작업이 공통으로 사용)
+    (문서 해시, 분석 종류, 응답)이 같으면 만들어 둔 결과를 render cache에서 재사용함 (같은 문서를 다시 분석하거나 다른 세션에서 열 때)
+    revision(revision_tracker.RevisionPlan)이 있으면 재분석하지 않은 섹션에 이전 버전의 지적 사항을 채우고, 결과를 새 개정본으로 저장함
     """
-    prompt = PromptTemplate.from_template(template)
-    return prompt | llm | StrOutputParser()
+    base_id = revision.base_id if revision is not None else None
+    report_key = make_report_key(f"{document_hash}:{base_id}", analysis_types, outputs)
+
+    def build():
+        section_errors, section_failures = collect_section_errors(chunks, outputs, analysis_types, len(sections))
+        revision_summary = None
+        if revision is not None:
+            section_errors, revision_summary = revision.apply(section_errors, section_failures)
+        results, preview_html = build_report(sections, section_errors, section_failures, analysis_types, run)
+        return results, preview_html, section_errors, section_failures, revision_summary
+
+    results, preview_html, section_errors, section_failures, revision_summary = get_render_cache().get(("report", report_key), build)
+    st.session_state.revision_summary = revision_summary
+    if revision is not None:
+        revision.save(get_revision_store(), sections, section_errors, section_failures)
+
+    # 모든 Section을 분석한 결과 저장
+    # 분석 종류마다 결과를 만든 실행이 다를 수 있으므로 (오타만 다시 분석하는 경우 등) 보고서 키도 종류별로 저장
+    for analysis_type in analysis_types:
+        st.session_state[ANALYSIS_TYPES[analysis_type][1]] = results[analysis_type]
+        st.session_state[f"report_key_{analysis_type}"] = report_key
+    # 왼쪽 미리보기 화면도 현재 분석 결과에 맞춰 업데이트
+    st.session_state.highlighted_preview = preview_html
 
 # --- 공통 분석 처리 함수 ---
-def process_analysis(api_key, file_path, chain_func, progress_text, result_key):
+def process_analysis(api_key, document, analysis_types, progress_text,
+                     run_mode="concurrent", max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                     preview_slot=None, live_slot=None, file_name=None, lineage=None):
     """
-    앞에서 만들어진 api_key, 파일 경로와 chain들을 공통으로 받고
+    앞에서 만들어진 api_key, 업로드 문서(parse_cache의 ParsedDocument)와 분석 종류(ANALYSIS_TYPES의 키 목록)를 공통으로 받고
     같은 형식의 결과물을 return할 수 있도록 함수를 구성함
+    섹션은 chunking.build_chunks로 토큰 상한에 맞춰 나누거나 묶어서 요청하고, 응답은 원래 섹션 제목으로 되돌림
+    여러 분석 종류를 한 번에 넘기면, 문서를 한 번만 읽고 각 청크를 모든 체인에 동시에 보낸 뒤
+    카테고리별 색상으로 구분된 하나의 미리보기를 만듦 (통합 분석)
+    run_mode가 "concurrent"이면 요청들을 동시에(max_concurrency개까지) 보내고, 결과는 문서 순서대로 다시 정렬함
+    run_mode가 "background"이면 작업 큐에 넘기고 바로 반환하며, 결과는 작업이 끝난 뒤 attach_background_job에서 불러옴
+    run_mode가 "streaming"이면 응답을 스트리밍으로 받아, 지적 사항이 도착하는 대로 preview_slot(미리보기)과 live_slot(결과 카드)을 갱신함
+    file_name(또는 lineage)이 같은 계열의 이전 개정본이 있으면, 수정되었거나 새로 생긴 섹션만 LLM에 보내고 나머지는 이전 결과를 가져옴
     """
     if not api_key:
         st.error("API Key를 입력해주세요.")
         return
 
-    sections = read_docx(file_path)
+    # 단계별(parse/chunk/llm/highlight/render) 소요 시간 기록 : 관리자 패널과 /metrics, JSON 로그에서 확인
+    # 중간에 끝나거나 예외가 나도 실행 기록이 남도록 항상 finish를 호출함
+    run = start_run("analysis", mode=run_mode, types=",".join(analysis_types), document=document.content_hash[:12])
+    status = "error"
+    try:
+        status = run_analysis(run, api_key, document, analysis_types, progress_text, run_mode, max_concurrency,
+                              preview_slot, live_slot, file_name, lineage)
+    finally:
+        run.finish(status)
+    if status in ("done", "submitted"):
+        st.rerun()
+
+def run_analysis(run, api_key, document, analysis_types, progress_text, run_mode, max_concurrency,
+                 preview_slot, live_slot, file_name, lineage):
+    """process_analysis의 본문. 실행 결과 상태(done/submitted/empty/chain_error)를 반환함"""
+    with span("parse", run):
+        sections = read_document_sections(document) # 같은 문서는 한 번만 파싱 (다른 분석 버튼을 눌러도 재사용)
+    if not sections:
+        st.error("분석할 텍스트가 없습니다. (스캔 이미지로만 된 PDF는 텍스트를 추출할 수 없습니다)")
+        return "empty"
     try:
-        chain = chain_func(api_key)
+        chains = {analysis_type: ANALYSIS_TYPES[analysis_type][0](api_key) for analysis_type in analysis_types}
     except Exception as e:
         st.error(f"체인 생성 실패: {e}")
-        return
+        return "chain_error"
+
+    # 개정본 비교 : 같은 계열의 이전 버전과 섹션을 맞춰 보고, 바뀌지 않은 섹션은 재분석하지 않음
+    revision = None
+    revision_store = get_revision_store()
+    if revision_store is not None and (file_name or lineage):
+        with span("revision", run):
+            revision = plan_revision(revision_store, file_name, document.content_hash, sections, analysis_types, lineage)
+        run.count("carried_sections", len(revision.carried))
+
+    # 섹션을 토큰 상한 기준으로 나누거나 묶은 청크 단위로 요청 (긴 섹션은 분할, 짧은 섹션들은 하나의 요청으로 묶음)
+    with span("chunk", run):
+        chunks = build_chunks(sections, section_indices=revision.sections_to_analyse if revision else None)
+    run.count("sections", len(sections))
+    run.count("chunks", len(chunks))
+
+    # 백그라운드 모드 : 작업 큐에 넘기고 바로 반환 (진행 상황은 attach_background_job에서 조회)
+    if run_mode == "background":
+        st.session_state.job_id = get_job_manager().submit(
+            api_key, document.content_hash, analysis_types, sections, chunks, get_chain, max_concurrency,
+            revision=revision.to_dict() if revision is not None else None,
+        )
+        return "submitted" # LLM 단계는 작업 큐에서 background_job 실행으로 따로 기록됨
+
+    # 체인은 프로세스 전체에서 재사용되므로, 이번 실행의 캐시 적중 수는 실행 전후 차이로 계산
+    cached_chains = [chain for chain in chains.values() if isinstance(chain, CachedChain)]
+    stats_before = [chain.stats() for chain in cached_chains]
 
-    results = []
-    full_highlighted_content = []
-    
     progress_bar = st.progress(0) # 진행률 바 생성(최초 숫자를 괄호 안에 입력)
     status_text = st.empty() # 동적으로 콘텐츠를 업데이트할 수 있는 빈 컨테이너 생성, 추후에 write() 메서드를 통해 텍스트 등을 입력할 수 있음
     status_text.write(progress_text) # 생성된 빈 컨테이너에 progress_text를 입력함
+    # (청크 x 분석 종류) 작업 하나가 끝날 때마다(완료 순서와 무관하게) 진행률 갱신
+    tasks = [(chains[analysis_type], chunk["text"]) for chunk in chunks for analysis_type in analysis_types]
+
+    def on_result(index, response, error, done_count):
+        progress_bar.progress(done_count / max(len(tasks), 1))
+
+    run.count("requests", len(tasks))
+    with quiet_llm_output(), span("llm", run): # "'ascii' codec can't encode characters" 오류를 방지하기 위함. langchain 호출 시 불필요한 출력이 발생하는 경우가 있는데, 이 출력 중 일부가 한글 인코딩 문제를 발생시키는 경우가 있어서, 불필요한 로그를 출력하지 않도록 하여, 한글 인코딩 문제 예방함 (백그라운드 작업도 같은 함수 사용)
+        if run_mode == "streaming":
+            outputs = stream_analysis(tasks, chunks, sections, analysis_types, max_concurrency,
+                                      get_rate_limiter(api_key), on_result, preview_slot, live_slot)
+        else:
+            outputs = run_chain_tasks(
+                tasks,
+                mode=run_mode,
+                max_concurrency=max_concurrency,
+                rate_limiter=get_rate_limiter(api_key),
+                on_result=on_result,
+            )
 
-    for i, section in enumerate(sections):
-        title = section.get('title', '제목 없음')
-        content = section.get('content', '')
-
-        try:
-            with contextlib.redirect_stdout(None): # "'ascii' codec can't encode characters" 오류를 방지하기 위함. langchain 호출 시 불필요한 출력이 발생하는 경우가 있는데, 이 출력 중 일부가 한글 인코딩 문제를 발생시키는 경우가 있어서, 불필요한 로그를 출력하지 않도록 하여, 한글 인코딩 문제 예방함
-                response_json = chain.invoke({"text": content})
-
-            # 하이라이팅 처리 (모든 체인이 동일한 JSON 구조를 가지므로 공통 사용 가능)
-            highlighted_text, errors = highlight_errors(content, response_json)
-            safe_highlighted = escape_markdown_special_chars(highlighted_text) # 마크다운 특수 문자가 의도치 않게 렌더링 되어 스타일이 깨지는 것을 방지하기 위한 함수 사용
-
-            if errors:
-                results.append({"title": title, "errors": errors})
+        # JSON으로 해석할 수 없는 응답의 청크만 다시 요청 (문서 전체를 다시 실행하지 않음)
+        outputs, parse_stats = reask_failed(
+            tasks, outputs,
+            lambda index: get_chain(analysis_types[index % len(analysis_types)], api_key, reask=True),
+            lambda retry_tasks: run_chain_tasks(retry_tasks, max_concurrency=max_concurrency, rate_limiter=get_rate_limiter(api_key)),
+        )
+    record_structured_output(parse_stats, run)
+    st.session_state.parse_stats = parse_stats
+
+    # 결과는 입력(문서) 순서대로 반환되므로, 순차 실행과 동일한 순서로 미리보기/결과를 구성함
+    store_report(sections, chunks, outputs, analysis_types, run, document.content_hash, revision)
+    run.count("failed_requests", sum(1 for _, error in outputs if error is not None))
+    # 캐시 적중률 기록 (변경되지 않은 섹션은 LLM을 다시 호출하지 않음)
+    if cached_chains:
+        stats_after = [chain.stats() for chain in cached_chains]
+        st.session_state.cache_stats = {
+            "hits": sum(after["hits"] - before["hits"] for before, after in zip(stats_before, stats_after)),
+            "misses": sum(after["misses"] - before["misses"] for before, after in zip(stats_before, stats_after)),
+        }
+        run.count("cache_hits", st.session_state.cache_stats["hits"])
+        run.count("cache_misses", st.session_state.cache_stats["misses"])
 
-            # HTML 미리보기 생성
-            section_html = textwrap.dedent(f"""
-                <div style="margin-bottom: 25px;">
-                    <div style="font-size: 16px; font-weight: bold; color: #1f2937; margin-bottom: 8px; border-bottom: 1px solid #e5e7eb; padding-bottom: 4px;">
-                        {title}
-                    </div>
-                    <div style="font-size: 14px; color: #374151;">
-                        {safe_highlighted}
-                    </div>
-                </div>
-            """).strip()
-            full_highlighted_content.append(section_html)
+    status_text.empty()
+    progress_bar.empty()
+    return "done"
 
-        except Exception as e:
-            full_highlighted_content.append(f"<p style='color:red;'>⚠️ Error: {e}</p>")
+def stream_analysis(tasks, chunks, sections, analysis_types, max_concurrency, rate_limiter,
+                    on_result, preview_slot, live_slot):
+    """
+    스트리밍 모드 : 부분 JSON 배열에서 완성된 지적 사항을 꺼내는 즉시 섹션에 배정하고,
+    STREAM_RENDER_INTERVAL마다 미리보기와 결과 카드를 다시 그림
+    반환값은 run_chain_tasks와 같은 [(response, error), ...] 형식 (최종 결과는 전체 응답으로 다시 계산함)
+    """
+    outputs = [None] * len(tasks)
+    parsers = [IncrementalJsonArrayParser() for _ in tasks]
+    live_errors = [{analysis_type: [] for analysis_type in analysis_types} for _ in sections]
+    live_failures = [{} for _ in sections]
+    seen = {analysis_type: set() for analysis_type in analysis_types}
+    done_count = 0
+    dirty = False
+    last_render = 0.0
+
+    def render():
+        results, preview_html = build_report(sections, live_errors, live_failures, analysis_types)
+        if preview_slot is not None:
+            preview_slot.markdown(build_preview_container(preview_html), unsafe_allow_html=True)
+        if live_slot is not None:
+            with live_slot.container():
+                for analysis_type in analysis_types:
+                    if results[analysis_type]:
+                        display_results(results[analysis_type], interactive=False)
+
+    for kind, index, payload in stream_chain_tasks(tasks, max_concurrency, rate_limiter):
+        chunk = chunks[index // len(analysis_types)]
+        analysis_type = analysis_types[index % len(analysis_types)]
+
+        if kind == "chunk":
+            findings = parsers[index].feed(payload)
+            if findings:
+                for section_index, assigned in assign_findings(chunk, findings, seen[analysis_type]).items():
+                    live_errors[section_index][analysis_type].extend(assigned)
+                dirty = True
+        else:
+            if kind == "done":
+                outputs[index] = (payload, None)
+            else:
+                outputs[index] = (None, payload)
+                for segment in chunk["segments"]:
+                    live_failures[segment["section_index"]][analysis_type] = payload
+                dirty = True
+            done_count += 1
+            on_result(index, outputs[index][0], outputs[index][1], done_count)
+
+        if dirty and time.monotonic() - last_render >= STREAM_RENDER_INTERVAL:
+            render()
+            dirty = False
+            last_render = time.monotonic()
+
+    return outputs
+
+# --- 백그라운드 작업 연결 함수 ---
+def attach_background_job(document, api_key, max_concurrency):
+    """
+    이 문서의 백그라운드 작업이 있으면 진행 상황을 보여주고, 끝나면 결과를 불러옴
+    새로고침 등으로 세션이 바뀌어도 같은 문서를 다시 올리면 실행 중인 작업에 다시 연결됨
+    프로세스 재시작으로 멈춘 작업은 API Key가 있으면 마지막으로 끝난 부분부터 이어서 실행함
+    """
+    manager = get_job_manager()
+    job_id = st.session_state.get("job_id")
+    if job_id is None:
+        job = manager.store.latest_job(document.content_hash, statuses=ACTIVE_STATUSES)
+        if job is None:
+            return
+        job_id = st.session_state.job_id = job["id"]
+
+    job = manager.store.get_job(job_id)
+    if job is None:
+        st.session_state.job_id = None
+        return
 
-        progress_bar.progress((i + 1) / len(sections))
+    if job["status"] in ACTIVE_STATUSES:
+        if not manager.is_active(job_id):
+            if not api_key:
+                st.warning("중단된 백그라운드 작업이 있습니다. API Key를 입력하면 마지막으로 끝난 부분부터 이어서 실행합니다.")
+                return
+            manager.resume(job_id, api_key, get_chain, max_concurrency)
+        show_job_progress(job_id)
+        return
 
-    # 모든 Section을 분석한 결과 저장
-    st.session_state[result_key] = results
-    # 왼쪽 미리보기 화면도 현재 분석 결과에 맞춰 업데이트
-    st.session_state.highlighted_preview = "\n".join(full_highlighted_content)
-    
-    status_text.empty()
-    progress_bar.empty()
+    st.session_state.job_id = None
+    if job["status"] == "failed":
+        st.error(f"백그라운드 작업 실패: {job['error']}")
+        return
+    # 작업과 함께 저장된 개정본 비교 결과로 이전 버전의 지적 사항을 채움 (새로고침/다른 세션/재시작 후에도 같은 결과)
+    revision = None
+    revision_store = get_revision_store()
+    if job["revision"] is not None and revision_store is not None:
+        revision = RevisionPlan.from_dict(job["revision"], revision_store)
+    # 저장되지 않은 작업 결과가 있어도 collect_section_errors가 실패하지 않도록 job_queue와 같은 방식으로 채움
+    outputs = [output or (None, RuntimeError("결과 없음")) for output in manager.store.get_outputs(job_id)]
+    store_report(job["sections"], job["chunks"], outputs, job["analysis_types"],
+                 document_hash=job["doc_hash"], revision=revision)
     st.rerun()
 
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def show_job_progress(job_id):
+    """
+    백그라운드 작업의 진행률만 JOB_POLL_INTERVAL마다 다시 그림 (페이지 전체를 다시 실행하거나 스크립트 스레드를 재우지 않음)
+    작업이 끝나면 페이지 전체를 다시 실행하여 attach_background_job에서 결과를 불러옴
+    """
+    job = get_job_manager().store.get_job(job_id)
+    if job is None or job["status"] not in ACTIVE_STATUSES:
+        st.rerun()
+    st.progress(job["completed"] / max(job["total"], 1), text=f"백그라운드 분석 진행 중... ({job['completed']}/{job['total']})")
+
 # --- 결과 카드 출력 헬퍼 함수 ---
-def display_results(results_data):
+def display_results(results_data, analysis_type=None, interactive=True):
+    """
+    결과 카드를 RESULTS_PAGE_SIZE개 섹션 단위로 나누어 현재 페이지만 그림 (섹션은 접힌 상태로 두고 첫 섹션만 펼침)
+    페이지 HTML은 (보고서 키, 분석 종류, 페이지)별로 render cache에 보관되어, rerun마다 다시 만들지 않음
+    interactive=False(스트리밍 중간 화면)이면 페이지 선택 위젯 없이 첫 페이지를 그림
+    """
     if not results_data:
         st.info("검출된 수정 사항이 없습니다.")
         return
 
-    st.info(f"총 {len(results_data)}개의 섹션에서 수정 사항이 발견되었습니다.")
-    for res in results_data:
-        with st.expander(f"📌 {res['title']}", expanded=True):
-            errors = res.get('errors', [])
-            for error in errors:
-                original = error.get('error_sentence', '')
-                correction = error.get('correction', '')
-                reason = error.get('reason', '')
-
-                st.markdown(textwrap.dedent(f"""
-                <div style="background-color: white; border: 1px solid #e5e7eb; border-radius: 8px; padding: 15px; margin-bottom: 10px; box-shadow: 0 1px 3px rgba(0,0,0,0.1);">
-                    <div style="display: flex; align-items: baseline; margin-bottom: 8px;">
-                        <span style="background-color: #fee2e2; color: #991b1b; padding: 2px 6px; border-radius: 4px; font-weight: bold; font-size: 0.95em; text-decoration: line-through; margin-right: 8px;">
-                            {original}
-                        </span>
-                        <span style="color: #6b7280; font-size: 0.9em; margin-right: 8px;">➞</span>
-                        <span style="background-color: #dcfce7; color: #166534; padding: 2px 6px; border-radius: 4px; font-weight: bold; font-size: 0.95em;">
-                            {correction}
-                        </span>
-                    </div>
-                    <div style="font-size: 0.9em; color: #4b5563; background-color: #f9fafb; padding: 8px; border-radius: 6px;">
-                        💡 <b>이유:</b> {reason}
-                    </div>
-                </div>
-                """), unsafe_allow_html=True)
+    finding_count = sum(len(res.get('errors', [])) for res in results_data)
+    st.info(f"총 {len(results_data)}개의 섹션에서 {finding_count}건의 수정 사항이 발견되었습니다.")
+
+    pages = page_count(len(results_data), RESULTS_PAGE_SIZE)
+    page = 1
+    if interactive and pages > 1:
+        page = st.number_input(f"페이지 (총 {pages}쪽)", min_value=1, max_value=pages, value=1, step=1,
+                               key=f"results_page_{analysis_type}")
+    start = (page - 1) * RESULTS_PAGE_SIZE
+    results_page = results_data[start:start + RESULTS_PAGE_SIZE]
+
+    report_key = st.session_state.get(f"report_key_{analysis_type}")
+    if interactive and report_key:
+        page_html = get_render_cache().get(
+            ("results_page", report_key, analysis_type, page, RESULTS_PAGE_SIZE),
+            lambda: build_results_page_html(results_page),
+        )
+    else:
+        page_html = build_results_page_html(results_page)
+    st.markdown(page_html, unsafe_allow_html=True)
+
+
+# --- 개정본 비교 요약 ---
+def display_revision_summary(summary):
+    """이전 버전 대비 재분석한 섹션 수와 신규/유지/해결된 지적 사항 수, 해결된 지적 목록을 보여줌"""
+    if not summary:
+        return
+    previous_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(summary["previous_at"]))
+    st.caption(f"🔁 이전 버전({summary['previous_file']}, {previous_at})과 비교 : 섹션 {summary['sections']}개 중 "
+               f"{summary['reanalysed']}개만 재분석 · 신규 {summary['new']}건 / 유지 {summary['carried']}건 / 해결 {len(summary['resolved'])}건")
+    if summary["resolved"]:
+        with st.expander(f"✅ 해결된 지적 사항 ({len(summary['resolved'])}건)"):
+            st.markdown("".join(
+                f"<div style='font-size: 0.85em; color: #6b7280;'>{ANALYSIS_LABELS.get(finding['analysis_type'], finding['analysis_type'])} · {html.escape(str(finding['title']))}</div>"
+                + build_card_html(finding)
+                for finding in summary["resolved"]
+            ), unsafe_allow_html=True)
+
+
+# --- 관리자 패널 ---
+def display_admin_panel():
+    """최근 분석 실행의 단계별 소요 시간, LLM 호출 지연 시간, 캐시/클라이언트 상태를 보여줌"""
+    metrics = get_metrics()
+    st.header("📊 관리자 패널")
+    if st.button("🔄 새로고침"):
+        st.rerun()
+
+    cache = get_result_cache()
+    col1, col2, col3, col4 = st.columns(4)
+    if cache is not None:
+        cache_stats = cache.stats()
+        col1.metric("결과 캐시 적중률", f"{cache_stats['hit_rate'] * 100:.1f}%", f"{cache_stats['hits']} / {cache_stats['hits'] + cache_stats['misses']}")
+        col2.metric("캐시 항목 수", cache_stats["entries"], f"{cache_stats['bytes'] / 1024 / 1024:.1f} MB")
+    else:
+        col1.metric("결과 캐시", "비활성화")
+    registry_stats = get_client_registry().stats()
+    col3.metric("LLM 클라이언트", registry_stats["clients"])
+    col4.metric("공유 체인", registry_stats["chains"])
+
+    st.subheader("최근 실행 (단계별 소요 시간, 초)")
+    runs = metrics.recent_runs()
+    if runs:
+        st.dataframe(runs, use_container_width=True)
+    else:
+        st.info("아직 기록된 실행이 없습니다.")
+
+    st.subheader("단계 / LLM 호출 / PDF 변환 지연 시간")
+    for title, name in [("단계", "stage_duration_seconds"), ("LLM 호출", "llm_call_seconds"), ("PDF 변환", "conversion_seconds")]:
+        rows = metrics.summary(name)
+        if rows:
+            st.caption(title)
+            st.dataframe(rows, use_container_width=True)
+
+    token_rows = [{**labels, "tokens": value} for labels, value in metrics.counter_values("llm_tokens_total")]
+    if token_rows:
+        st.caption("LLM 토큰 수 (추정)")
+        st.dataframe(token_rows, use_container_width=True)
+
+    with st.expander("Prometheus 형식 (/metrics)"):
+        st.code(metrics.prometheus_text(), language="text")
 
 
 # --- 메인 함수 ---
 def main():
     st.set_page_config(page_title="Committee Agent 통합 플랫폼", layout='wide')
+    start_metrics_server() # METRICS_PORT가 설정된 경우에만 /metrics 서버를 프로세스당 한 번 시작
 
     # 세션 상태 초기화 : session_state는 streamlit이 재실행되어 초기화되더라도 데이터를 유지함
     if "proofreading_results" not in st.session_state: st.session_state.proofreading_results = None
@@ -236,7 +491,9 @@ def main():
 
     st.title("문서 작업 통합 도구 (Correction & Conversion)")
 
-    tab1, tab2 = st.tabs(["📄 문서 복합 분석", "🔄 PDF 일괄 변환"])
+    tab_labels = ["📄 문서 복합 분석", "🔄 PDF 일괄 변환"] + (["📊 관리자"] if ADMIN_PANEL_ENABLED else [])
+    tabs = st.tabs(tab_labels)
+    tab1, tab2 = tabs[0], tabs[1]
 
     with tab1:
         col1, col2 = st.columns([1, 1])
@@ -259,29 +516,35 @@ def main():
                 
                 # Stramlit의 file_uploader는 파일의 내용을 RAM으로 잡고 있는데, python-docx에서는 파일의 경로를 입력해야 해서, 임시 파일을 만들고, 
                 # 그 임시 파일에 업로드 파일의 내용을 넣은뒤, 저장된 임시 파일의 경로를 python-docx에 입력으로 전달하기 위함 
+                # 같은 내용의 파일은 parse_cache에서 임시 파일/미리보기 텍스트/섹션을 재사용하므로, rerun마다 다시 쓰거나 다시 파싱하지 않음
                 
                 suffix = '.docx' if uploaded_file.name.endswith('.docx') else '.pdf'
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    tmp_file_path = tmp_file.name
+                document = get_parse_cache().get(uploaded_file.getvalue(), suffix)
 
                 if suffix == '.docx':
-                    raw_text = read_raw_docx(tmp_file_path) # 위에서 작성한 임시 파일 경로를 입력으로 줌
+                    raw_text = document.get_raw_text(read_raw_docx) # 캐시된 임시 파일 경로를 입력으로 줌
                 else:
-                    raw_text = read_pdf(uploaded_file) # 위에서 작성한 임시 파일 경로를 입력으로 줌
+                    # PDF 미리보기는 앞쪽 일부 페이지만 추출 (전체 텍스트는 요청할 때만 추출하여 캐시)
+                    if st.checkbox(f"전체 텍스트 보기 (기본: 처음 {PDF_PREVIEW_MAX_PAGES}쪽)", key="pdf_full_text"):
+                        raw_text = document.get_value("full_text", lambda path: read_pdf_text(path, max_pages=None))
+                    else:
+                        raw_text = document.get_raw_text(read_pdf_text) # 캐시된 임시 파일 경로를 입력으로 줌
 
                 # AI 분석 결과가 있다면, 분석 결과를 보여주고, 없다면 원문(raw_text)을 그대로 보여줌
                 if st.session_state.highlighted_preview:
                     st.markdown("⬇️ **분석 결과 미리보기 (하이라이트)**")
+                    legend_html = " ".join(
+                        f"<span style='{CATEGORY_STYLES[category]} padding: 2px 6px; border-radius: 4px; font-size: 0.85em;'>{label}</span>"
+                        for category, label in ANALYSIS_LABELS.items()
+                    )
+                    st.markdown(legend_html, unsafe_allow_html=True)
+
+                preview_slot = st.empty() # 스트리밍 모드에서는 분석 중에 이 자리를 실시간으로 갱신함
+                if st.session_state.highlighted_preview:
                     preview_content = st.session_state.highlighted_preview.strip()
-                    container_html = textwrap.dedent(f"""
-                        <div style="height: 600px; overflow-y: scroll; border: 1px solid #dee2e6; padding: 20px; border-radius: 5px; background-color: #ffffff; color: #333333; font-family: sans-serif; font-size: 14px; line-height: 1.6;">
-                            {preview_content}
-                        </div>
-                    """)
-                    st.markdown(container_html, unsafe_allow_html=True)
+                    preview_slot.markdown(build_preview_container(preview_content), unsafe_allow_html=True)
                 else:
-                    st.text_area("내용 미리보기", raw_text, height=600)
+                    preview_slot.text_area("내용 미리보기", raw_text, height=600)
 
         # =========================================================
         # [오른쪽] 2. AI 분석 컨트롤 및 결과
@@ -289,21 +552,56 @@ def main():
         with col2:
             st.subheader("2. AI 분석 실행")
 
-            if uploaded_file and suffix == '.docx':
-                # 3개의 실행 버튼 배치
+            if uploaded_file:
+                # 실행 방식 선택 : 병렬 실행 시 섹션들을 동시에 요청하고, 순차 실행은 기존처럼 한 섹션씩 요청함
+                opt_col1, opt_col2 = st.columns(2)
+                with opt_col1:
+                    run_mode = st.radio("실행 방식", list(RUN_MODE_OPTIONS.keys()), format_func=RUN_MODE_OPTIONS.get, horizontal=True, key="run_mode")
+                with opt_col2:
+                    max_concurrency = st.slider("동시 요청 수", 1, 16, DEFAULT_MAX_CONCURRENCY, key="max_concurrency", disabled=(run_mode == "sequential"))
+
+                # 개정본 비교 : 기본값은 파일명에서 버전 표시를 뗀 이름 (파일명이 크게 바뀐 경우 이전 버전의 계열 이름을 직접 입력)
+                lineage = None
+                if get_revision_store() is not None:
+                    lineage = st.text_input("문서 계열 (이전 버전과 비교하여 바뀐 섹션만 재분석)", lineage_key(uploaded_file.name),
+                                            key=f"lineage_{uploaded_file.name}").strip() or None
+
+                # 3개의 실행 버튼 배치 : 버튼은 요청만 기록하고, 분석은 버튼 아래(전체 폭)에서 실행
+                requested = None
                 btn_col1, btn_col2, btn_col3 = st.columns(3) # col2 안에서 버튼을 가로로 3등분하여 배치
 
                 with btn_col1:
                     if st.button("📝 오타 검수\n(Basic)", use_container_width=True):
-                        process_analysis(openai_api_key, tmp_file_path, get_proofreading_chain, "오타 검수 중...", "proofreading_results")
+                        requested = (["proofreading"], "오타 검수 중...")
                 
                 with btn_col2:
                     if st.button("🧠 논리 검증\n(Logic)", use_container_width=True):
-                        process_analysis(openai_api_key, tmp_file_path, get_logical_error_chain, "논리적 정합성 검증 중...", "logic_results")
+                        requested = (["logic"], "논리적 정합성 검증 중...")
 
                 with btn_col3:
                     if st.button("👔 스타일 교정\n(English)", use_container_width=True):
-                        process_analysis(openai_api_key, tmp_file_path, get_english_chain, "Business Style Tone&Manner 분석 중...", "style_results")
+                        requested = (["style"], "Business Style Tone&Manner 분석 중...")
+
+                # 통합 분석 : 문서를 한 번만 읽고 세 가지 검사를 동시에 실행
+                if st.button("🚀 전체 분석 (오타 + 논리 + 스타일)", use_container_width=True, type="primary"):
+                    requested = (list(ANALYSIS_TYPES.keys()), "오타/논리/스타일 통합 분석 중...")
+
+                live_slot = st.empty() # 스트리밍 모드에서 결과 카드를 실시간으로 보여줄 자리
+                if requested:
+                    analysis_types, progress_text = requested
+                    process_analysis(openai_api_key, document, analysis_types, progress_text, run_mode, max_concurrency,
+                                     preview_slot=preview_slot, live_slot=live_slot,
+                                     file_name=uploaded_file.name, lineage=lineage)
+                attach_background_job(document, openai_api_key, max_concurrency)
+
+                if st.session_state.get("cache_stats"):
+                    stats = st.session_state.cache_stats
+                    st.caption(f"💾 캐시 적중 {stats['hits']}건 / LLM 호출 {stats['misses']}건")
+                parse_stats = st.session_state.get("parse_stats")
+                if parse_stats and (parse_stats["repaired"] or parse_stats["failed"] or parse_stats["reasked"]):
+                    st.caption(f"🧩 응답 {parse_stats['responses']}건 중 형식 복구 {parse_stats['repaired']}건, "
+                               f"재요청 {parse_stats['reasked']}건(성공 {parse_stats['recovered']}건), 해석 실패 {parse_stats['failed']}건")
+                display_revision_summary(st.session_state.get("revision_summary"))
 
                 st.markdown("---")
                 
@@ -312,24 +610,22 @@ def main():
 
                 with res_tab1:
                     if st.session_state.proofreading_results:
-                        display_results(st.session_state.proofreading_results)
+                        display_results(st.session_state.proofreading_results, "proofreading")
                     else:
                         st.info("실행 결과가 없습니다.")
 
                 with res_tab2:
                     if st.session_state.logic_results:
-                        display_results(st.session_state.logic_results)
+                        display_results(st.session_state.logic_results, "logic")
                     else:
                         st.info("실행 결과가 없습니다.")
 
                 with res_tab3:
                     if st.session_state.style_results:
-                        display_results(st.session_state.style_results)
+                        display_results(st.session_state.style_results, "style")
                     else:
                         st.info("실행 결과가 없습니다.")
             
-            elif uploaded_file and suffix != '.docx':
-                st.warning("현재 AI 정밀 분석은 .docx 파일만 지원합니다.")
             else:
                 st.info("왼쪽에서 파일을 먼저 업로드해주세요.")
 
@@ -338,11 +634,27 @@ def main():
         st.header("📂 Word/PPT -> PDF 일괄 변환")
         default_path = os.getcwd()
         target_folder = st.text_input("변환할 파일이 있는 폴더 경로를 입력하세요:", value=default_path)
+        incremental = st.checkbox("증분 변환 (변경된 파일만 변환하고, 원본이 삭제된 PDF는 정리)", value=False)
+        scan_col1, scan_col2, scan_col3 = st.columns([2, 2, 1])
+        with scan_col1:
+            include_text = st.text_input("포함 패턴 (쉼표로 구분)", value=", ".join(DEFAULT_INCLUDE))
+        with scan_col2:
+            exclude_text = st.text_input("제외 패턴 (쉼표로 구분, 예: archive/*, *_old.docx)", value="")
+        with scan_col3:
+            max_depth = st.number_input("하위 폴더 깊이 (-1: 제한 없음)", min_value=-1, value=-1, step=1)
+        convert_workers = st.number_input("동시 변환 작업자 수", min_value=1, max_value=64, value=min(DEFAULT_CONVERT_WORKERS, 64), step=1)
 
         if st.button("일괄 변환 시작", type="primary"):
             st.write("---")
             log_area = st.empty()
-            for msg_type, msg in batch_convert_to_pdf(target_folder):
+            for msg_type, msg in batch_convert_to_pdf(
+                target_folder,
+                max_workers=int(convert_workers),
+                incremental=incremental,
+                include=[p.strip() for p in include_text.split(",") if p.strip()],
+                exclude=[p.strip() for p in exclude_text.split(",") if p.strip()],
+                max_depth=None if max_depth < 0 else int(max_depth),
+            ):
                 if msg_type == "Error": st.error(msg)
                 elif msg_type == "Success": st.success(msg)
                 elif msg_type == "Info": st.info(msg)
@@ -351,5 +663,9 @@ def main():
             st.success("모든 작업이 종료되었습니다.")
             log_area.empty()
 
+    if ADMIN_PANEL_ENABLED:
+        with tabs[2]:
+            display_admin_panel()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,222 @@
+"""
+폴더 단위 문서 일괄 분석 (Streamlit 없이 실행하는 CLI)
+
+사용 예:
+    python batch_analyze.py ./committee_docs ./reports --types proofreading logic style --workers 4
+
+- 폴더(하위 폴더 포함)의 .docx 파일마다 JSON/HTML 보고서를 만들고, 마지막에 summary.json을 저장합니다.
+- 처리 상태는 출력 폴더의 checkpoint.json에 기록되므로, 중단 후 다시 실행하면 끝난 문서는 건너뜁니다.
+  (LLM 요청이나 JSON 해석이 일부 실패한 문서는 partial로 기록되어 다음 실행에서 다시 분석합니다)
+- API Key는 --api-key 또는 환경 변수(.env) GOOGLE_API_KEY로 전달합니다.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from read_docx_util import read_docx
+from chains import CHAIN_BUILDERS, get_chain
+from chunking import build_chunks, collect_section_errors
+from highlighting import highlight_categorized, build_section_html, CATEGORY_STYLES
+from folder_scanner import scan_files
+from conversion_manifest import file_sha256
+from llm_runner import run_chain_tasks, get_rate_limiter, DEFAULT_MAX_CONCURRENCY
+from structured_output import reask_failed
+
+CHECKPOINT_NAME = "checkpoint.json"
+SUMMARY_NAME = "summary.json"
+
+
+def load_checkpoint(output_folder):
+    try:
+        with open(os.path.join(output_folder, CHECKPOINT_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(output_folder, checkpoint):
+    path = os.path.join(output_folder, CHECKPOINT_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def render_html_report(file_name, report):
+    blocks = []
+    for section in report["sections"]:
+        blocks.append(build_section_html(section["title"], section["highlighted"]))
+        for analysis_type, error in section["failures"].items():
+            blocks.append(f"<p style='color:red;'>⚠️ Error ({analysis_type}): {error}</p>")
+    legend = " ".join(
+        f"<span style='{CATEGORY_STYLES.get(analysis_type, '')} padding: 2px 6px; border-radius: 4px;'>{analysis_type}</span>"
+        for analysis_type in report["analysis_types"]
+    )
+    body = "\n".join(blocks)
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+        f"<title>{file_name}</title></head>\n"
+        "<body style='font-family: sans-serif; font-size: 14px; line-height: 1.6; max-width: 960px; margin: 0 auto;'>\n"
+        f"<h1>{file_name}</h1>\n<p>{legend}</p>\n{body}\n</body></html>\n"
+    )
+
+
+def analyze_document(file_path, api_key, analysis_types, max_concurrency):
+    """
+    문서 하나를 분석하여 보고서(dict)를 반환합니다. Streamlit 화면의 분석과 같은 청크/체인/하이라이트 경로를 사용합니다.
+    """
+    sections = read_docx(file_path)
+    chunks = build_chunks(sections)
+    chains = {analysis_type: get_chain(analysis_type, api_key) for analysis_type in analysis_types}
+    tasks = [(chains[analysis_type], chunk["text"]) for chunk in chunks for analysis_type in analysis_types]
+    def run_tasks(task_list):
+        return run_chain_tasks(task_list, max_concurrency=max_concurrency, rate_limiter=get_rate_limiter(api_key))
+
+    outputs = run_tasks(tasks)
+    # JSON으로 해석할 수 없는 응답의 청크만 다시 요청
+    outputs, parse_stats = reask_failed(
+        tasks, outputs, lambda index: get_chain(analysis_types[index % len(analysis_types)], api_key, reask=True), run_tasks
+    )
+
+    section_errors, section_failures = collect_section_errors(chunks, outputs, analysis_types, len(sections))
+    report_sections = []
+    finding_count = 0
+    for section, errors, failures in zip(sections, section_errors, section_failures):
+        highlighted, errors_by_type, _ = highlight_categorized(section.get("content", ""), errors)
+        finding_count += sum(len(found) for found in errors_by_type.values())
+        report_sections.append({
+            "title": section.get("title", "제목 없음"),
+            "findings": errors_by_type,
+            "failures": {analysis_type: str(error) for analysis_type, error in failures.items()},
+            "highlighted": highlighted,
+        })
+
+    return {
+        "analysis_types": analysis_types,
+        "section_count": len(sections),
+        "request_count": len(tasks),
+        "finding_count": finding_count,
+        "failed_requests": sum(1 for _, error in outputs if error is not None),
+        "structured_output": parse_stats,
+        "sections": report_sections,
+    }
+
+
+def run_batch(input_folder, output_folder, api_key, analysis_types, workers=2,
+              max_concurrency=DEFAULT_MAX_CONCURRENCY, include=("*.docx",), exclude=()):
+    """
+    폴더의 문서들을 workers개씩 동시에 분석합니다. 문서마다 끝나는 즉시 보고서와 checkpoint를 저장하고, 요약(dict)을 반환합니다.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    checkpoint = load_checkpoint(output_folder)
+    checkpoint_lock = threading.Lock()
+    key = ",".join(analysis_types)
+    summary = {"analyzed": [], "partial": [], "skipped": [], "failed": []}
+
+    def process(rel_path):
+        input_path = os.path.join(input_folder, rel_path)
+        report_base = os.path.join(output_folder, os.path.splitext(rel_path)[0])
+        os.makedirs(os.path.dirname(report_base) or output_folder, exist_ok=True)
+        started = time.monotonic()
+        report = analyze_document(input_path, api_key, analysis_types, max_concurrency)
+        report["file"] = rel_path
+        report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+
+        with open(report_base + ".json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(report_base + ".html", "w", encoding="utf-8") as f:
+            f.write(render_html_report(rel_path, report))
+        return report
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {}
+        for rel_path in scan_files(input_folder, include, exclude, skip_paths=[output_folder]):
+            content_hash = file_sha256(os.path.join(input_folder, rel_path))
+            done = checkpoint.get(rel_path)
+            # 같은 내용/같은 분석 종류로 모두 성공한 문서만 건너뜀 (partial/failed는 다시 분석)
+            if done and done.get("sha256") == content_hash and done.get("analysis_types") == key and done.get("status") == "done":
+                summary["skipped"].append(rel_path)
+                print(f"[건너뜀] {rel_path}")
+                continue
+            futures[executor.submit(process, rel_path)] = (rel_path, content_hash)
+
+        for future in as_completed(futures):
+            rel_path, content_hash = futures[future]
+            entry = {"sha256": content_hash, "analysis_types": key}
+            try:
+                report = future.result()
+                # 요청 실패(429, 할당량 초과 등)나 해석하지 못한 응답이 있으면 보고서가 일부만 채워진 것이므로 partial로 기록
+                complete = report["failed_requests"] == 0 and report["structured_output"]["failed"] == 0
+                status = "done" if complete else "partial"
+                entry.update(status=status, finding_count=report["finding_count"], failed_requests=report["failed_requests"])
+                summary["analyzed" if complete else "partial"].append({
+                    "file": rel_path, "finding_count": report["finding_count"],
+                    "failed_requests": report["failed_requests"], "elapsed_seconds": report["elapsed_seconds"],
+                    "structured_output": report["structured_output"],
+                })
+                if complete:
+                    print(f"[완료] {rel_path} : 지적 {report['finding_count']}건 ({report['elapsed_seconds']}초)")
+                else:
+                    print(f"[일부 실패] {rel_path} : 실패한 요청 {report['failed_requests']}건, "
+                          f"해석 실패 {report['structured_output']['failed']}건 (다음 실행에서 다시 분석)")
+            except Exception as e:
+                entry.update(status="failed", error=str(e))
+                summary["failed"].append({"file": rel_path, "error": str(e)})
+                print(f"[실패] {rel_path} : {e}")
+            with checkpoint_lock:
+                checkpoint[rel_path] = entry
+                save_checkpoint(output_folder, checkpoint)
+
+    reports = summary["analyzed"] + summary["partial"]
+    summary["totals"] = {
+        "analyzed": len(summary["analyzed"]),
+        "partial": len(summary["partial"]),
+        "json_repaired": sum(item["structured_output"]["repaired"] for item in reports),
+        "json_reasked": sum(item["structured_output"]["reasked"] for item in reports),
+        "json_failed": sum(item["structured_output"]["failed"] for item in reports),
+        "skipped": len(summary["skipped"]),
+        "failed": len(summary["failed"]),
+        "findings": sum(item["finding_count"] for item in reports),
+    }
+    with open(os.path.join(output_folder, SUMMARY_NAME), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def main(argv=None):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description="폴더 단위 문서 일괄 분석 (오타/논리/스타일)")
+    parser.add_argument("input_folder", help="분석할 .docx 파일이 있는 폴더")
+    parser.add_argument("output_folder", help="보고서를 저장할 폴더")
+    parser.add_argument("--types", nargs="+", default=list(CHAIN_BUILDERS.keys()), choices=list(CHAIN_BUILDERS.keys()), help="실행할 분석 종류")
+    parser.add_argument("--workers", type=int, default=2, help="동시에 분석할 문서 수")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="문서 하나당 동시 LLM 요청 수")
+    parser.add_argument("--exclude", nargs="*", default=[], help="제외할 glob 패턴")
+    parser.add_argument("--api-key", default=os.getenv("GOOGLE_API_KEY"), help="Google API Key (기본값: 환경 변수 GOOGLE_API_KEY)")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        print("API Key가 없습니다. --api-key 또는 GOOGLE_API_KEY 환경 변수를 설정해주세요.")
+        return 1
+    if not os.path.isdir(args.input_folder):
+        print(f"폴더를 찾을 수 없습니다: {args.input_folder}")
+        return 1
+
+    summary = run_batch(args.input_folder, args.output_folder, args.api_key, args.types,
+                        workers=args.workers, max_concurrency=args.concurrency, exclude=args.exclude)
+    totals = summary["totals"]
+    print(f"완료: 분석 {totals['analyzed']}개, 일부 실패 {totals['partial']}개, 건너뜀 {totals['skipped']}개, "
+          f"실패 {totals['failed']}개, 지적 {totals['findings']}건")
+    return 0 if not (summary["failed"] or summary["partial"]) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+분석/변환 경로 벤치마크 (가짜 LLM 서버 사용, 결과는 JSON)
+
+사용 예:
+    python benchmark.py                                  # sample_data + 생성한 큰 문서, 결과를 표준 출력으로
+    python benchmark.py --latency 0.2 --output bench.json
+    python benchmark.py --parser unstructured --large-sections 400 --skip-convert
+
+단계별(parse / chunk / llm / highlight / convert)로 벽시계 시간, 처리량, 문서별 p50/p95 지연 시간,
+tracemalloc 기준 최대 메모리를 측정합니다. 커밋마다 결과 JSON을 저장해 두면 성능 변화를 비교할 수 있습니다.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from xml.sax.saxutils import escape
+
+from read_docx_util import read_docx
+from chunking import build_chunks, collect_section_errors
+from highlighting import highlight_categorized
+from chains import MODEL_NAME, PROOFREADING_TEMPLATE, LOGICAL_ERROR_TEMPLATE, ENGLISH_STYLE_TEMPLATE
+from llm_clients import ClientRegistry, FakeHTTPBackend, register_backend
+from llm_runner import run_chain_tasks, DEFAULT_MAX_CONCURRENCY
+from fake_llm_server import start_fake_llm_server
+
+SAMPLE_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data")
+BENCHMARK_TEMPLATES = {
+    "proofreading": PROOFREADING_TEMPLATE,
+    "logic": LOGICAL_ERROR_TEMPLATE,
+    "style": ENGLISH_STYLE_TEMPLATE,
+}
+FILLER_SENTENCE = "회의 자료의 문장은 검토를 위해 반복됩니다. The committee reviewed the quarterly report in detail. "
+
+
+# --- 큰 문서 생성 ---
+def generate_docx(path, sections=200, paragraphs=5, table_every=10):
+    """
+    굵은 제목/본문 문단/표로 이루어진 docx를 zipfile로 직접 만듭니다. (python-docx 없이 생성)
+    """
+    def paragraph(text, bold=False):
+        rpr = "<w:rPr><w:b/></w:rPr>" if bold else ""
+        return f"<w:p><w:r>{rpr}<w:t xml:space=\"preserve\">{escape(text)}</w:t></w:r></w:p>"
+
+    body = []
+    for index in range(sections):
+        body.append(paragraph(f"섹션 제목 {index + 1}", bold=True))
+        for number in range(paragraphs):
+            body.append(paragraph(f"{number + 1}. " + FILLER_SENTENCE * 3))
+        if table_every and index % table_every == 0:
+            rows = "".join(
+                "<w:tr>" + "".join(f"<w:tc>{paragraph(f'R{row}C{col}')}</w:tc>" for col in range(3)) + "</w:tr>"
+                for row in range(3)
+            )
+            body.append(f"<w:tbl>{rows}</w:tbl>")
+
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        + "".join(body) + "</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>'
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("_rels/.rels", rels)
+        archive.writestr("word/document.xml", document)
+    return path
+
+
+# --- 측정 도구 ---
+def percentile(values, q):
+    """최근접 순위(nearest-rank) 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class TimedChain:
+    """체인 호출마다 지연 시간을 기록합니다. (LLM 요청 단위 p50/p95 계산용)"""
+    def __init__(self, chain, latencies):
+        self.chain = chain
+        self.latencies = latencies
+        self._lock = threading.Lock()
+
+    def invoke(self, inputs, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.chain.invoke(inputs, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - started)
+
+
+class StageRecorder:
+    """단계별 누적 시간, 처리 건수, 문서별 소요 시간, 최대 메모리를 모읍니다."""
+    def __init__(self):
+        self.stages = {}
+
+    def measure(self, stage, func, *args, **kwargs):
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        entry = self.stages.setdefault(stage, {"seconds": 0.0, "durations": [], "units": {}, "peak_bytes": 0})
+        entry["seconds"] += elapsed
+        entry["durations"].append(elapsed)
+        entry["peak_bytes"] = max(entry["peak_bytes"], peak)
+        return result
+
+    def count(self, stage, unit, amount):
+        units = self.stages[stage]["units"]
+        units[unit] = units.get(unit, 0) + amount
+
+    def report(self):
+        report = {}
+        for stage, entry in self.stages.items():
+            seconds = entry["seconds"]
+            report[stage] = {
+                "wall_seconds": round(seconds, 6),
+                "runs": len(entry["durations"]),
+                "p50_seconds": round(percentile(entry["durations"], 50), 6),
+                "p95_seconds": round(percentile(entry["durations"], 95), 6),
+                "peak_memory_bytes": entry["peak_bytes"],
+                "counts": entry["units"],
+                "throughput_per_second": {
+                    unit: round(amount / seconds, 3) if seconds > 0 else None for unit, amount in entry["units"].items()
+                },
+            }
+        return report
+
+
+# --- 벤치마크 실행 ---
+def benchmark_analysis(files, recorder, parser, analysis_types, latency, max_concurrency, findings):
+    server, url = start_fake_llm_server(latency=latency, findings=findings)
+    register_backend("bench", lambda: FakeHTTPBackend(url))
+    registry = ClientRegistry()
+    request_latencies = []
+    chains = {
+        analysis_type: TimedChain(
+            registry.get_chain("benchmark", MODEL_NAME, analysis_type, BENCHMARK_TEMPLATES[analysis_type], backend="bench"),
+            request_latencies,
+        )
+        for analysis_type in analysis_types
+    }
+
+    try:
+        for file_path in files:
+            sections = recorder.measure("parse", read_docx, file_path, parser=parser)
+            recorder.count("parse", "documents", 1)
+            recorder.count("parse", "sections", len(sections))
+
+            chunks = recorder.measure("chunk", build_chunks, sections)
+            recorder.count("chunk", "sections", len(sections))
+            recorder.count("chunk", "chunks", len(chunks))
+
+            tasks = [(chains[analysis_type], chunk["text"]) for chunk in chunks for analysis_type in analysis_types]
+            outputs = recorder.measure("llm", run_chain_tasks, tasks, max_concurrency=max_concurrency)
+            recorder.count("llm", "requests", len(tasks))
+            recorder.count("llm", "failed_requests", sum(1 for _, error in outputs if error is not None))
+
+            def highlight_all():
+                section_errors, _ = collect_section_errors(chunks, outputs, analysis_types, len(sections))
+                found = 0
+                for section, errors in zip(sections, section_errors):
+                    _, errors_by_type, _ = highlight_categorized(section.get("content", ""), errors)
+                    found += sum(len(items) for items in errors_by_type.values())
+                return found
+
+            found = recorder.measure("highlight", highlight_all)
+            recorder.count("highlight", "sections", len(sections))
+            recorder.count("highlight", "findings", found)
+    finally:
+        registry.clear()
+        server.shutdown()
+
+    return {
+        "p50_seconds": round(percentile(request_latencies, 50) or 0.0, 6),
+        "p95_seconds": round(percentile(request_latencies, 95) or 0.0, 6),
+        "requests": len(request_latencies),
+        "server_requests": server.request_count,
+    }
+
+
+def benchmark_conversion(files, recorder, workers):
+    """LibreOffice가 있을 때만 batch_convert_to_pdf를 측정합니다. (없으면 None)"""
+    if not (shutil.which("libreoffice") or shutil.which("soffice")):
+        return None
+    from pdf_converter import batch_convert_to_pdf
+
+    work_dir = tempfile.mkdtemp(prefix="bench_convert_")
+    try:
+        for file_path in files:
+            shutil.copy(file_path, work_dir)
+        messages = recorder.measure("convert", lambda: list(batch_convert_to_pdf(work_dir, max_workers=workers)))
+        outputs = glob.glob(os.path.join(work_dir, "pdf_output", "**", "*.pdf"), recursive=True)
+        recorder.count("convert", "documents", len(files))
+        recorder.count("convert", "pdfs", len(outputs))
+        recorder.count("convert", "failed", sum(1 for msg_type, _ in messages if msg_type == "Error"))
+        try:
+            from pdf_reader import count_pages
+            recorder.count("convert", "pages", sum(count_pages(path) for path in outputs))
+        except ImportError:
+            pass
+        return True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="분석/변환 경로 벤치마크")
+    parser.add_argument("files", nargs="*", help="측정할 .docx 파일 (기본값: sample_data/*.docx)")
+    parser.add_argument("--parser", default="fast", choices=["fast", "unstructured"], help="read_docx 파서")
+    parser.add_argument("--types", nargs="+", default=list(BENCHMARK_TEMPLATES.keys()), choices=list(BENCHMARK_TEMPLATES.keys()))
+    parser.add_argument("--latency", type=float, default=0.05, help="가짜 LLM의 요청당 지연 시간(초)")
+    parser.add_argument("--findings", type=int, default=2, help="가짜 LLM이 요청마다 돌려줄 지적 사항 수")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument("--large-docs", type=int, default=2, help="추가로 생성할 큰 문서 수")
+    parser.add_argument("--large-sections", type=int, default=200, help="생성 문서당 섹션 수")
+    parser.add_argument("--convert-workers", type=int, default=None)
+    parser.add_argument("--skip-convert", action="store_true")
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (기본값: 표준 출력)")
+    args = parser.parse_args(argv)
+
+    files = args.files or sorted(glob.glob(os.path.join(SAMPLE_DATA_DIR, "*.docx")))
+    generated_dir = tempfile.mkdtemp(prefix="bench_docs_")
+    try:
+        files = files + [
+            generate_docx(os.path.join(generated_dir, f"generated_{index + 1}.docx"), sections=args.large_sections)
+            for index in range(args.large_docs)
+        ]
+
+        recorder = StageRecorder()
+        tracemalloc.start()
+        started = time.perf_counter()
+        llm_latency = benchmark_analysis(files, recorder, args.parser, args.types, args.latency,
+                                         args.concurrency, args.findings)
+        converted = None if args.skip_convert else benchmark_conversion(files, recorder, args.convert_workers)
+        total_seconds = time.perf_counter() - started
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(generated_dir, ignore_errors=True)
+
+    result = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "parser": args.parser,
+            "analysis_types": args.types,
+            "llm_latency_seconds": args.latency,
+            "max_concurrency": args.concurrency,
+            "documents": [os.path.basename(path) for path in files],
+            "conversion": "measured" if converted else "skipped",
+        },
+        "total_seconds": round(total_seconds, 6),
+        "stages": recorder.report(),
+        "llm_request_latency": llm_latency,
+    }
+    try:
+        import resource
+        # ru_maxrss : Linux는 KB 단위
+        result["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        pass
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
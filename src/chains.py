@@ -0,0 +1,116 @@
+from result_cache import with_result_cache
+from llm_clients import get_client_registry
+from metrics import InstrumentedChain
+from structured_output import parse_structured_response
+
+# --- 체인 생성 함수들 ---
+MODEL_NAME = "gemini-2.0-flash-exp"
+
+PROOFREADING_TEMPLATE = """
+    당신은 한국어 교정 전문가입니다. 아래 텍스트에서 오타, 비문, 어색한 표현을 찾아주세요.
+
+    [텍스트]:
+    {text}
+
+    [응답 형식]:
+    반드시 아래와 같은 **JSON 포맷**으로만 응답하세요. 다른 말은 하지 마세요.
+    오류가 없으면 빈 리스트 [] 를 반환하세요.
+
+    [
+      {{
+        "error_sentence": "오류가 포함된 원본 문장 또는 단어 구절 (원본 텍스트와 정확히 일치해야 함)",
+        "correction": "수정 제안 내용",
+        "reason": "수정 이유"
+      }},
+      ...
+    ]
+    """
+
+LOGICAL_ERROR_TEMPLATE = """
+    [역할(Role)]: 전문 팩트체커
+    [텍스트]: {text}
+    [지시사항]: 시간, 장소, 인물, 수치, 인과관계, 모순 검증.
+    [응답 형식]:
+    반드시 아래와 같은 **JSON 포맷**으로만 응답하세요. 다른 말은 하지 마세요.
+    오류가 없으면 빈 리스트 [] 를 반환하세요.
+
+    [
+      {{
+        "error_sentence": "오류가 포함된 원본 문장 또는 단어 구절 (원본 텍스트와 정확히 일치해야 함)",
+        "correction": "수정 제안 내용",
+        "reason": "논리적 모순에 대한 상세 설명"
+      }},
+      ...
+    ]
+    """
+
+ENGLISH_STYLE_TEMPLATE = """
+    [역할(Role)]: 수석 비즈니스 영어 에디터 (Reporting Style)
+    [텍스트]: {text}
+    [검증 기준]: 객관성, 간결성, 격식(No contractions/slang), 명확성.
+    [응답 형식]:
+    반드시 아래와 같은 **JSON 포맷**으로만 응답하세요. 다른 말은 하지 마세요.
+    수정할 사항이 없으면 빈 리스트 [] 를 반환하세요.
+
+    [
+      {{
+        "error_sentence": "스타일에 맞지 않는 원본 문장 또는 단어 구절 (원본 텍스트와 정확히 일치해야 함)",
+        "correction": "더 전문적이고 보고서에 적합한 수정 제안 (영어)",
+        "reason": "해당 표현이 보고용 문체로 부적절한 이유 (한국어로 설명)"
+      }},
+      ...
+    ]
+    """
+
+# JSON으로 해석할 수 없는 응답을 다시 요청할 때 템플릿 끝에 덧붙이는 지시 (재요청 체인은 별도 캐시 키를 가짐)
+REASK_INSTRUCTION = """
+    [주의]: 이전 응답을 JSON으로 해석할 수 없었습니다. 설명이나 코드 펜스 없이 위 형식의 JSON 배열 하나만 반환하세요.
+    """
+
+def is_valid_response(response):
+    """JSON 지적 사항 목록으로 해석 가능한 응답인지 (해석할 수 없는 응답은 캐시하지 않음)"""
+    return parse_structured_response(response)[1] != "failed"
+
+def build_chain(api_key, chain_type, template, temperature=0):
+    """
+    프롬프트 | LLM | 문자열 파서 체인을 만들고, 결과 캐시(result_cache)를 앞에 붙여 반환합니다.
+    클라이언트와 체인은 llm_clients의 프로세스 전역 저장소에서 (API Key, 모델, temperature, 체인 종류) 단위로 재사용합니다.
+    """
+    registry = get_client_registry()
+    backend = registry.backend()
+    # gemini 이외의 백엔드(가짜 서버 등) 응답이 실제 결과 캐시와 섞이지 않도록 캐시 키의 모델명에 백엔드를 붙임
+    cache_model = MODEL_NAME if backend.name == "gemini" else f"{backend.name}:{MODEL_NAME}"
+    return registry.get_chain(
+        api_key, MODEL_NAME, chain_type, template, temperature=temperature, backend=backend.name,
+        # 실제 LLM 호출(캐시 미스)만 계측되도록 캐시 안쪽에 InstrumentedChain을 둠
+        wrap=lambda chain: with_result_cache(InstrumentedChain(chain, chain_type), chain_type, template, cache_model,
+                                            validate=is_valid_response),
+    )
+
+def get_proofreading_chain(api_key):
+    return build_chain(api_key, "proofreading", PROOFREADING_TEMPLATE)
+
+def get_logical_error_chain(api_key):
+    return build_chain(api_key, "logic", LOGICAL_ERROR_TEMPLATE)
+
+def get_english_chain(api_key):
+    return build_chain(api_key, "style", ENGLISH_STYLE_TEMPLATE)
+
+# 분석 종류별 체인 생성 함수 : 카테고리 이름은 highlighting.CATEGORY_STYLES의 색상과 연결됨
+CHAIN_BUILDERS = {
+    "proofreading": get_proofreading_chain,
+    "logic": get_logical_error_chain,
+    "style": get_english_chain,
+}
+
+CHAIN_TEMPLATES = {
+    "proofreading": PROOFREADING_TEMPLATE,
+    "logic": LOGICAL_ERROR_TEMPLATE,
+    "style": ENGLISH_STYLE_TEMPLATE,
+}
+
+def get_chain(analysis_type, api_key, reask=False):
+    """reask=True이면 JSON 형식만 반환하라는 지시를 덧붙인 재요청용 체인을 반환합니다."""
+    if reask:
+        return build_chain(api_key, analysis_type, CHAIN_TEMPLATES[analysis_type] + REASK_INSTRUCTION)
+    return CHAIN_BUILDERS[analysis_type](api_key)
@@ -0,0 +1,205 @@
+import os
+import re
+import math
+
+from structured_output import parse_structured_response
+
+# --- 청크 설정 (.env 로 조정 가능) ---
+CHUNK_TOKEN_BUDGET = int(os.getenv("LLM_CHUNK_TOKEN_BUDGET", "3000"))          # 요청 하나에 담을 본문 토큰 상한 (프롬프트 템플릿 제외)
+CHUNK_OVERLAP_SENTENCES = int(os.getenv("LLM_CHUNK_OVERLAP_SENTENCES", "1"))   # 긴 섹션을 나눌 때 앞 조각과 겹치게 할 문장 수
+SEGMENT_SEPARATOR = "\n\n"
+
+TABLE_BLOCK_PATTERN = re.compile(r"\[Table Start\].*?\[Table End\]", re.DOTALL) # read_docx가 만든 표 블록은 쪼개지 않음
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?。])\s+")
+
+
+def estimate_tokens(text):
+    """
+    토크나이저 없이 토큰 수를 근사합니다. (영문/숫자 약 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 약 1토큰)
+    """
+    if not text:
+        return 0
+    ascii_count = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_count / 4) + (len(text) - ascii_count)
+
+
+def _split_units(text, budget):
+    """
+    텍스트를 표 블록 / 문단 / 문장 순서로 잘라, 각 조각이 budget 이하가 되도록 나눕니다.
+    반환값: [(조각, 문장 여부)] - 문장 단위로 자른 조각만 겹침(overlap)에 사용됩니다.
+    """
+    units = []
+    position = 0
+    blocks = []
+    for match in TABLE_BLOCK_PATTERN.finditer(text):
+        blocks.append((text[position:match.start()], False))
+        blocks.append((match.group(0), True))
+        position = match.end()
+    blocks.append((text[position:], False))
+
+    for block, is_table in blocks:
+        if is_table:
+            units.append((block, False))
+            continue
+        for paragraph in block.split("\n"):
+            if not paragraph.strip():
+                continue
+            if estimate_tokens(paragraph) <= budget:
+                units.append((paragraph, False))
+                continue
+            for sentence in SENTENCE_END_PATTERN.split(paragraph):
+                if estimate_tokens(sentence) <= budget:
+                    units.append((sentence, True))
+                    continue
+                # 문장 하나가 상한보다 길면 글자 수 기준으로 자름
+                step = max(1, len(sentence) * budget // estimate_tokens(sentence))
+                for start in range(0, len(sentence), step):
+                    units.append((sentence[start:start + step], False))
+    return units
+
+
+def split_text(text, budget=CHUNK_TOKEN_BUDGET, overlap_sentences=CHUNK_OVERLAP_SENTENCES):
+    """
+    상한을 넘는 섹션 본문을 문단/문장 경계에서 나눕니다. 문맥이 끊기지 않도록 앞 조각의 마지막 문장을 다음 조각 앞에 겹쳐 넣습니다.
+    """
+    return [piece for piece, _ in split_text_with_overlap(text, budget, overlap_sentences)]
+
+
+def split_text_with_overlap(text, budget=CHUNK_TOKEN_BUDGET, overlap_sentences=CHUNK_OVERLAP_SENTENCES):
+    """
+    split_text와 같지만 [(조각, 겹친 글자 수)]를 반환합니다.
+    겹친 글자 수는 조각 앞부분 중 앞 조각에서 이어 붙인 문장의 길이입니다. (중복 지적을 이 구간에서만 합치는 데 사용)
+    """
+    if estimate_tokens(text) <= budget:
+        return [(text, 0)]
+
+    pieces = []
+    current = []
+    current_tokens = 0
+    overlap_chars = 0
+    for unit, is_sentence in _split_units(text, budget):
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > budget:
+            pieces.append(("\n".join(u for u, _ in current), overlap_chars))
+            # 겹침: 직전 조각 끝의 문장들을 이어 붙임 (상한을 넘지 않는 범위에서)
+            carried = [item for item in current[-overlap_sentences:] if item[1]] if overlap_sentences > 0 else []
+            carried_tokens = sum(estimate_tokens(u) for u, _ in carried)
+            if carried_tokens + unit_tokens > budget:
+                carried, carried_tokens = [], 0
+            current, current_tokens = carried, carried_tokens
+            overlap_chars = len("\n".join(u for u, _ in carried))
+        current.append((unit, is_sentence))
+        current_tokens += unit_tokens
+    if current:
+        pieces.append(("\n".join(u for u, _ in current), overlap_chars))
+    return pieces
+
+
+def build_chunks(sections, budget=CHUNK_TOKEN_BUDGET, overlap_sentences=CHUNK_OVERLAP_SENTENCES, section_indices=None):
+    """
+    read_docx 섹션 목록을 LLM 요청 단위(청크)로 바꿉니다.
+    - 상한을 넘는 섹션은 split_text로 여러 청크로 나누고
+    - 짧은 섹션들은 상한까지 이웃 섹션과 하나의 청크로 묶습니다.
+    반환값: [{"text": 요청 본문, "segments": [{"section_index", "start", "end", "overlap_end"}]}]
+    segments는 청크 본문의 어느 구간이 어느 섹션에서 왔는지 기록하여, 응답을 원래 섹션으로 되돌릴 때 사용합니다.
+    start ~ overlap_end는 앞 조각에서 겹쳐 넣은 문장 구간입니다. (겹침이 없으면 overlap_end == start)
+    section_indices를 주면 그 섹션들만 청크로 만듭니다. (개정본 비교 시 수정된 섹션만 재분석, section_index는 원래 번호 유지)
+    """
+    chunks = []
+    current = None
+
+    def flush():
+        if current and current["segments"]:
+            chunks.append(current)
+
+    if section_indices is None:
+        section_indices = range(len(sections))
+    for section_index in section_indices:
+        content = sections[section_index].get("content", "")
+        if not content.strip():
+            continue # 본문이 없는 섹션(제목만 있는 섹션 등)은 빈 요청이 되지 않도록 보내지 않음
+        for piece, overlap_chars in split_text_with_overlap(content, budget, overlap_sentences):
+            piece_tokens = estimate_tokens(piece)
+            if current is None or current["tokens"] + piece_tokens > budget:
+                flush()
+                current = {"text": "", "segments": [], "tokens": 0}
+            if current["text"]:
+                current["text"] += SEGMENT_SEPARATOR
+            start = len(current["text"])
+            current["text"] += piece
+            current["segments"].append({"section_index": section_index, "start": start, "end": len(current["text"]),
+                                        "overlap_end": start + overlap_chars})
+            current["tokens"] += piece_tokens
+    flush()
+
+    for chunk in chunks:
+        chunk.pop("tokens", None)
+    return chunks
+
+
+def _locate(text, target):
+    index = text.find(target)
+    if index >= 0:
+        return index
+    # 공백/줄바꿈 차이는 무시하고 다시 검색
+    pattern = re.escape(target).replace(r"\ ", r"\s+")
+    match = re.search(pattern, text)
+    return match.start() if match else -1
+
+
+def assign_findings(chunk, findings, seen=None):
+    """
+    청크 하나에 대한 지적 사항(findings)을 error_sentence 위치를 기준으로 원래 섹션에 배정합니다.
+    반환값: {section_index: [finding, ...]}
+    앞 조각에서 겹쳐 넣은 구간(segment의 start ~ overlap_end)에 있는 지적이 앞 조각에서 이미 나왔다면 중복으로 보고 뺍니다.
+    그 밖의 구간에서는 같은 실수가 여러 번 나와도 모두 남깁니다. (여러 청크에 걸쳐 비교하려면 청크 순서대로 같은 seen 집합을 넘김)
+    """
+    assigned = {}
+    seen = set() if seen is None else seen
+    segments = chunk["segments"]
+
+    for finding in findings:
+        target = str(finding.get("error_sentence", "")).strip()
+        segment = segments[0]
+        offset = _locate(chunk["text"], target) if target else -1
+        for candidate in segments:
+            if candidate["start"] <= offset < candidate["end"]:
+                segment = candidate
+                break
+        section_index = segment["section_index"]
+
+        key = (section_index, target, str(finding.get("correction", "")))
+        in_overlap = segment["start"] <= offset < segment.get("overlap_end", segment["start"])
+        if in_overlap and key in seen:
+            continue
+        seen.add(key)
+        assigned.setdefault(section_index, []).append(finding)
+
+    return assigned
+
+
+def collect_section_errors(chunks, outputs, analysis_types, section_count):
+    """
+    (청크 x 분석 종류) 응답의 지적 사항을 error_sentence 위치에 따라 원래 섹션으로 되돌림
+    반환값: (섹션별 {분석 종류: 오류 목록}, 섹션별 {분석 종류: 예외})
+    """
+    section_errors = [{analysis_type: [] for analysis_type in analysis_types} for _ in range(section_count)]
+    section_failures = [{} for _ in range(section_count)]
+    seen = {analysis_type: set() for analysis_type in analysis_types}
+    for task_index, (response_json, error) in enumerate(outputs):
+        chunk = chunks[task_index // len(analysis_types)]
+        analysis_type = analysis_types[task_index % len(analysis_types)]
+        if error is not None:
+            for section_index in {segment["section_index"] for segment in chunk["segments"]}:
+                section_failures[section_index][analysis_type] = error
+            continue
+        findings, status = parse_structured_response(response_json)
+        if status == "failed":
+            # 해석할 수 없는 응답은 빈 결과로 숨기지 않고 실패로 표시 (해당 섹션만 다시 분석할 수 있도록)
+            for section_index in {segment["section_index"] for segment in chunk["segments"]}:
+                section_failures[section_index][analysis_type] = ValueError("응답을 JSON으로 해석할 수 없습니다.")
+            continue
+        assigned = assign_findings(chunk, findings, seen[analysis_type])
+        for section_index, findings in assigned.items():
+            section_errors[section_index][analysis_type].extend(findings)
+    return section_errors, section_failures
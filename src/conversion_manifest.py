@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+
+# 증분 변환 기록 파일 (pdf_output 폴더 안에 저장)
+MANIFEST_NAME = ".convert_manifest.json"
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(output_folder):
+    """
+    {원본 상대경로: {"size", "mtime", "sha256", "output"}} 형태의 기록을 읽습니다. 없거나 깨져 있으면 빈 기록을 반환합니다.
+    """
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_folder, manifest):
+    # 중간에 중단되어도 기록 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def make_entry(source_path, output_path, sha256=None):
+    stat = os.stat(source_path)
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": sha256 or file_sha256(source_path),
+        "output": output_path,
+    }
+
+
+def is_up_to_date(entry, source_path, output_path):
+    """
+    변환 결과가 최신인지 판단합니다.
+    (1) 기록된 크기/수정시각이 같고 PDF가 있으면 최신
+    (2) 크기/수정시각이 달라도 내용 해시가 같으면 최신 (파일 복사 등으로 mtime만 바뀐 경우)
+    (3) 기록이 없더라도 PDF가 원본보다 나중에 만들어졌으면 최신
+    반환값: (최신 여부, 갱신할 기록 또는 None)
+    """
+    if not os.path.exists(output_path):
+        return False, None
+
+    stat = os.stat(source_path)
+    if entry:
+        if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+            return True, None
+        sha256 = file_sha256(source_path)
+        if entry.get("sha256") == sha256:
+            return True, make_entry(source_path, output_path, sha256)
+        return False, None
+
+    if os.path.getmtime(output_path) >= stat.st_mtime:
+        return True, make_entry(source_path, output_path)
+    return False, None
+
+
+def remove_stale_outputs(manifest, source_root):
+    """
+    원본 파일이 source_root에서 삭제된 기록을 지우고, 해당 PDF도 삭제합니다. 삭제한 원본 경로 목록을 반환합니다.
+    (탐색 깊이/제외 패턴 때문에 이번에 탐색하지 않은 파일은 삭제된 것으로 보지 않음)
+    """
+    stale = {
+        source: manifest.pop(source)
+        for source in list(manifest.keys())
+        if not os.path.exists(os.path.join(source_root, source))
+    }
+    outputs_in_use = {entry.get("output") for entry in manifest.values()}
+    for entry in stale.values():
+        output_path = entry.get("output")
+        # 같은 이름의 PDF를 다른 원본(예: a.docx 삭제, a.pptx 유지)이 쓰고 있으면 남겨둠
+        if output_path and output_path not in outputs_in_use and os.path.exists(output_path):
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+    return list(stale.keys())
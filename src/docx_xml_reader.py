@@ -0,0 +1,148 @@
+import html
+import zipfile
+import xml.etree.ElementTree as ET
+
+# WordprocessingML 네임스페이스
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+P_TAG = W_NS + "p"
+TBL_TAG = W_NS + "tbl"
+TR_TAG = W_NS + "tr"
+TC_TAG = W_NS + "tc"
+R_TAG = W_NS + "r"
+HYPERLINK_TAG = W_NS + "hyperlink"
+TXBX_TAG = W_NS + "txbxContent"
+VAL_ATTR = W_NS + "val"
+
+# 런(w:r) 안에서 텍스트로 바뀌는 요소 (python-docx의 run.text와 같은 규칙)
+RUN_TEXT_TAGS = {
+    W_NS + "t": None,
+    W_NS + "tab": "\t",
+    W_NS + "br": "\n",
+    W_NS + "cr": "\n",
+    W_NS + "noBreakHyphen": "-",
+}
+FALSE_VALUES = ("0", "false", "off")
+
+
+def _is_on(rpr, tag):
+    """rPr에 직접 지정된 굵게(b)/기울임(i) 여부. (스타일에서 상속된 서식은 보지 않음)"""
+    if rpr is None:
+        return False
+    element = rpr.find(W_NS + tag)
+    if element is None:
+        return False
+    return element.get(VAL_ATTR, "true").lower() not in FALSE_VALUES
+
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        if child.tag in RUN_TEXT_TAGS:
+            replacement = RUN_TEXT_TAGS[child.tag]
+            parts.append(child.text or "" if replacement is None else replacement)
+    return "".join(parts)
+
+
+def _paragraph_runs(paragraph):
+    """문단의 직접 하위 런과 하이퍼링크 안의 런을 순서대로 돌려줍니다. (텍스트 상자 안의 문단은 제외)"""
+    for child in paragraph:
+        if child.tag == R_TAG:
+            yield child
+        elif child.tag == HYPERLINK_TAG:
+            for run in child:
+                if run.tag == R_TAG:
+                    yield run
+
+
+def _paragraph_element(paragraph):
+    """
+    문단 하나를 UnstructuredWordDocumentLoader 요소와 같은 형태(dict)로 바꿉니다.
+    굵게/기울임 런은 unstructured와 같은 규칙으로 emphasized_text_contents/tags에 모읍니다.
+    """
+    texts = []
+    emphasized_contents = []
+    emphasized_tags = []
+    for run in _paragraph_runs(paragraph):
+        text = _run_text(run)
+        texts.append(text)
+        stripped = text.strip()
+        if not stripped:
+            continue
+        rpr = run.find(W_NS + "rPr")
+        if _is_on(rpr, "b"):
+            emphasized_contents.append(stripped)
+            emphasized_tags.append("b")
+        if _is_on(rpr, "i"):
+            emphasized_contents.append(stripped)
+            emphasized_tags.append("i")
+    return {
+        "category": "Paragraph",
+        "content": "".join(texts).strip(),
+        "emphasized_text_contents": emphasized_contents,
+        "emphasized_text_tags": emphasized_tags,
+    }
+
+
+def _cell_text(cell):
+    lines = []
+    for paragraph in cell.iter(P_TAG):
+        lines.append("".join(_run_text(run) for run in _paragraph_runs(paragraph)).strip())
+    return "\n".join(line for line in lines if line)
+
+
+def _table_element(table):
+    """표를 <table> HTML로 바꿉니다. 가로 병합(gridSpan)은 colspan, 세로 병합의 이어지는 칸은 빈 칸으로 둡니다."""
+    rows_html = []
+    cell_texts = []
+    for row in table.iter(TR_TAG):
+        cells_html = []
+        for cell in row.findall(TC_TAG):
+            tcpr = cell.find(W_NS + "tcPr")
+            span = 1
+            continued = False
+            if tcpr is not None:
+                grid_span = tcpr.find(W_NS + "gridSpan")
+                if grid_span is not None:
+                    span = int(grid_span.get(VAL_ATTR, "1") or 1)
+                v_merge = tcpr.find(W_NS + "vMerge")
+                continued = v_merge is not None and v_merge.get(VAL_ATTR, "continue") == "continue"
+            text = "" if continued else _cell_text(cell)
+            if text:
+                cell_texts.append(text)
+            colspan = f' colspan="{span}"' if span > 1 else ""
+            cells_html.append(f"<td{colspan}>{html.escape(text)}</td>")
+        rows_html.append("<tr>" + "".join(cells_html) + "</tr>")
+    return {
+        "category": "Table",
+        "content": " ".join(cell_texts).strip(),
+        "text_as_html": "<table>" + "".join(rows_html) + "</table>",
+    }
+
+
+def iter_docx_elements(file):
+    """
+    word/document.xml을 iterparse로 한 번 훑으면서, 본문 최상위 문단/표를 문서 순서대로 yield 합니다.
+    처리한 요소는 바로 비우므로, 큰 문서도 전체 XML 트리를 메모리에 올리지 않습니다.
+    """
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml_file:
+        stack = []
+        for event, element in ET.iterparse(xml_file, events=("start", "end")):
+            if event == "start":
+                stack.append(element.tag)
+                continue
+            stack.pop()
+            if element.tag == P_TAG:
+                # 표 안의 문단, 텍스트 상자 안의 문단은 각각 표/바깥 문단에서 처리
+                if P_TAG in stack or TBL_TAG in stack or TXBX_TAG in stack:
+                    continue
+                item = _paragraph_element(element)
+                element.clear()
+                if item["content"]:
+                    yield item
+            elif element.tag == TBL_TAG:
+                if TBL_TAG in stack or P_TAG in stack:
+                    continue
+                item = _table_element(element)
+                element.clear()
+                if item["content"]:
+                    yield item
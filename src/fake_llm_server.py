@@ -0,0 +1,114 @@
+"""
+로컬 가짜 LLM 서버 (테스트/벤치마크용, LLM_BACKEND=fake 와 함께 사용)
+
+사용 예:
+    python fake_llm_server.py --port 8765 --latency 0.5 --findings 1
+
+- POST /v1/generate : {"prompt", "text", ...} -> {"text": JSON 배열 응답}
+- POST /v1/stream   : 같은 응답을 한 줄에 {"text": 조각} 하나씩 chunked 전송
+응답은 입력 텍스트의 앞 문장들을 error_sentence로 삼은 지적 사항 배열이므로, 하이라이트/섹션 배정 경로까지 그대로 거칩니다.
+"""
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SENTENCE_PATTERN = re.compile(r"[^.!?。\n]+[.!?。]?")
+STREAM_PIECE_CHARS = 40 # 스트리밍 응답을 이 글자 수 단위로 나누어 보냄
+
+
+def make_findings(text, count):
+    findings = []
+    for match in SENTENCE_PATTERN.finditer(text or ""):
+        sentence = match.group(0).strip()
+        if len(sentence) < 5 or sentence.startswith("[Table"):
+            continue
+        findings.append({"error_sentence": sentence, "correction": sentence, "reason": "fake finding"})
+        if len(findings) >= count:
+            break
+    return findings
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive 연결 유지
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        try:
+            payload = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+
+        server = self.server
+        with server.stats_lock:
+            server.request_count += 1
+        if server.latency > 0:
+            time.sleep(server.latency)
+        answer = json.dumps(make_findings(payload.get("text", ""), server.findings), ensure_ascii=False)
+
+        if self.path == "/v1/generate":
+            self._send_json(200, {"text": answer})
+        elif self.path == "/v1/stream":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(answer), STREAM_PIECE_CHARS):
+                line = (json.dumps({"text": answer[start:start + STREAM_PIECE_CHARS]}, ensure_ascii=False) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_fake_llm_server(host="127.0.0.1", port=0, latency=0.0, findings=1):
+    """
+    가짜 LLM 서버를 백그라운드 스레드에서 시작하고 (server, base_url)을 반환합니다. port=0이면 빈 포트를 사용합니다.
+    종료는 server.shutdown()
+    """
+    server = ThreadingHTTPServer((host, port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.findings = findings
+    server.request_count = 0
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 가짜 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="요청마다 지연시킬 시간(초)")
+    parser.add_argument("--findings", type=int, default=1, help="요청마다 돌려줄 지적 사항 수")
+    args = parser.parse_args(argv)
+
+    server, url = start_fake_llm_server(args.host, args.port, args.latency, args.findings)
+    print(f"가짜 LLM 서버 실행 중: {url} (종료: Ctrl+C)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
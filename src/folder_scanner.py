@@ -0,0 +1,57 @@
+import os
+import fnmatch
+
+# 기본 변환 대상 확장자
+DEFAULT_INCLUDE = ("*.docx", "*.doc", "*.pptx", "*.ppt")
+
+
+def _matches(rel_path, name, patterns):
+    """
+    패턴은 파일 이름(예: "*.docx") 또는 상대 경로(예: "archive/*", "**/draft_*")에 대해 대소문자 구분 없이 비교합니다.
+    """
+    rel_path = rel_path.replace(os.sep, "/").lower()
+    name = name.lower()
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(rel_path, pattern):
+            return True
+    return False
+
+
+def scan_files(root, include=DEFAULT_INCLUDE, exclude=(), max_depth=None, skip_paths=()):
+    """
+    os.scandir 기반으로 root 아래를 재귀 탐색하며, 조건에 맞는 파일의 (root 기준) 상대 경로를 찾는 즉시 yield 합니다.
+    전체 목록을 먼저 만들지 않으므로, 항목이 매우 많은 폴더에서도 첫 파일을 바로 처리할 수 있습니다.
+
+    include: 포함할 glob 패턴 목록 / exclude: 제외할 glob 패턴 목록 (폴더에 걸리면 하위 전체를 건너뜀)
+    max_depth: None이면 깊이 제한 없음, 0이면 root 바로 아래 파일만
+    skip_paths: 탐색하지 않을 폴더의 절대 경로 (예: 변환 결과 폴더)
+    """
+    skip_paths = {os.path.abspath(path) for path in skip_paths}
+    stack = [(root, 0)]
+
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue # 권한 없음 등은 건너뜀
+
+        subdirectories = []
+        with entries:
+            for entry in entries:
+                rel_path = os.path.relpath(entry.path, root)
+                if exclude and _matches(rel_path, entry.name, exclude):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if (max_depth is None or depth < max_depth) and os.path.abspath(entry.path) not in skip_paths:
+                            subdirectories.append(entry.path)
+                    elif entry.is_file() and not entry.name.startswith('~$') and _matches(rel_path, entry.name, include):
+                        yield rel_path
+                except OSError:
+                    continue
+
+        # 스택이므로 역순으로 넣어야 발견한 순서대로 탐색됨
+        for subdirectory in reversed(subdirectories):
+            stack.append((subdirectory, depth + 1))
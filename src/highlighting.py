@@ -1,48 +1,207 @@
-import json
 import re
+import textwrap
+import bisect
+import functools
 
-def highlight_errors(original_text, analysis_result_json):
+from structured_output import parse_structured_response
+
+# 분석 종류(카테고리)별 하이라이트 색상 : 통합 분석 시 어떤 검사에서 나온 지적인지 색으로 구분
+CATEGORY_STYLES = {
+    "proofreading": "background-color: #ffdce0; color: #d8000c;", # 오타/비문 (빨강)
+    "logic": "background-color: #fff4cc; color: #8a5300;",        # 논리/팩트 (주황)
+    "style": "background-color: #dbeafe; color: #1e40af;",        # 영어 스타일 (파랑)
+}
+DEFAULT_CATEGORY = "proofreading"
+BASE_HIGHLIGHT_STYLE = "font-weight: bold; padding: 2px 4px; border-radius: 4px;"
+
+TAG_PATTERN = re.compile(r"<[^<>]*>") # 원문에 포함된 표(HTML) 태그 : 태그 내부는 하이라이트 대상에서 제외
+
+
+def _highlight_open_tag(category=DEFAULT_CATEGORY, anchor=None):
+    style = CATEGORY_STYLES.get(category, CATEGORY_STYLES[DEFAULT_CATEGORY])
+    anchor_attr = f" id='{anchor}'" if anchor else ""
+    return f"<span{anchor_attr} style='{style} {BASE_HIGHLIGHT_STYLE}'>"
+
+
+def finding_anchor(anchor_prefix, category, index):
+    """결과 카드에서 미리보기의 하이라이트 위치로 이동할 때 쓰는 HTML id (밑줄/# 없이 만듦)"""
+    return f"{anchor_prefix}-{category}-{index}"
+
+
+def span_anchors(spans, anchor_prefix):
+    """합쳐진 구간 목록에서 {(카테고리, index): HTML id}를 만듭니다. (원문에서 위치를 찾지 못한 지적은 포함되지 않음)"""
+    return {
+        (category, index): finding_anchor(anchor_prefix, category, index)
+        for span in spans for category, index in span["members"]
+    }
+
+
+def parse_analysis_result(analysis_result_json):
     """
-    원본 텍스트에서 error_sentence를 찾아 빨간색 배경 처리를 합니다.
+    LLM 응답(JSON 문자열)을 오류 목록(list)으로 변환합니다.
+    앞뒤 설명 문장, 끝의 쉼표, 잘린 배열은 structured_output에서 복구하며, 끝내 해석할 수 없으면 빈 리스트를 반환합니다.
+    """
+    return parse_structured_response(analysis_result_json)[0]
+
+
+@functools.lru_cache(maxsize=4096)
+def _fuzzy_pattern(target):
+    """
+    공백/줄바꿈을 유연하게 매칭하는 정규식을 만들어 재사용합니다. (예: "안녕 하세요" -> "안녕\s+하세요")
     """
-    highlighted_text = original_text
+    return re.compile(r"\s+".join(re.escape(word) for word in target.split()))
+
 
-    try:
-        # 1. JSON 전처리
-        clean_json = analysis_result_json.replace("```json", "").replace("```", "").strip()
-        errors = json.loads(clean_json)
+class _SpanIndex:
+    """이미 차지한 구간(하이라이트/태그)을 시작 위치 순으로 보관하여, 새 후보 구간과 겹치는지 빠르게 확인합니다."""
+    def __init__(self, ranges=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(ranges):
+            self.add(start, end)
 
-        if not isinstance(errors, list):
-            return original_text, []
+    def overlaps(self, start, end):
+        i = bisect.bisect_left(self.starts, end)
+        # start가 end보다 앞인 구간 중 바로 앞 구간만 확인하면 됨 (구간들은 서로 겹치지 않음)
+        return i > 0 and self.ends[i - 1] > start
+
+    def add(self, start, end):
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+
+def find_spans(original_text, errors_by_category):
+    """
+    1단계: 지적 사항마다 원문에서의 (start, end) 위치를 하나씩 찾습니다.
+    - 정확히 일치하는 위치를 먼저 찾고, 없으면 공백을 유연하게 매칭하는 정규식으로 찾습니다.
+    - 같은 문구가 여러 번 나오면, 아직 다른 지적이 차지하지 않은 첫 위치를 사용합니다. (모든 위치를 칠하지 않음)
+    - 원문에 포함된 HTML 태그 내부는 매칭하지 않습니다.
+    errors_by_category: {카테고리: 오류 목록}
+    반환값: [{"start", "end", "category", "index"}] (index는 해당 카테고리 오류 목록에서의 순서), 시작 위치 순
+    """
+    tags = _SpanIndex((m.start(), m.end()) for m in TAG_PATTERN.finditer(original_text))
+    claimed = _SpanIndex()
+    spans = []
 
-        for error in errors:
-            target = error.get("error_sentence", "").strip()
+    def is_free(start, end):
+        return end > start and not tags.overlaps(start, end) and not claimed.overlaps(start, end)
 
+    for category, errors in errors_by_category.items():
+        for index, error in enumerate(errors):
+            target = str(error.get("error_sentence", "")).strip()
             if not target:
                 continue
 
-            # 2. 단순 replace 시도
-            if target in highlighted_text:
-                replacement = f"<span style='background-color: #ffdce0; color: #d8000c; font-weight: bold; padding: 2px 4px; border-radius: 4px;'>{target}</span>"
-                highlighted_text = highlighted_text.replace(target, replacement)
+            found = None
+            position = original_text.find(target)
+            while position >= 0:
+                if is_free(position, position + len(target)):
+                    found = (position, position + len(target))
+                    break
+                position = original_text.find(target, position + 1)
 
-            # 3. [보완] 단순 매칭 실패 시, 공백/줄바꿈을 유연하게 처리하여 검색
-            else:
-                # target의 특수문자를 이스케이프하고, 공백을 유연한 정규식 패턴(\s+)으로 변경
-                # 예: "안녕 하세요" -> "안녕\s+하세요" (줄바꿈이나 여러 공백도 매칭됨)
-                import re
-                escaped_target = re.escape(target)
-                pattern = escaped_target.replace(r"\ ", r"\s+")
+            if found is None:
+                for match in _fuzzy_pattern(target).finditer(original_text):
+                    if is_free(match.start(), match.end()):
+                        found = (match.start(), match.end())
+                        break
 
-                # HTML 태그로 감싸기 위한 정규식 치환
-                replacement = f"<span style='background-color: #ffdce0; color: #d8000c; font-weight: bold; padding: 2px 4px; border-radius: 4px;'>\g<0></span>"
+            if found is None:
+                # 이미 다른 지적이 차지한 위치와 겹치더라도, 문구 자체는 존재하면 병합 단계에서 합침
+                position = original_text.find(target)
+                if position >= 0 and not tags.overlaps(position, position + len(target)):
+                    found = (position, position + len(target))
 
-                # 원본 텍스트가 이미 HTML 태그 등으로 오염되지 않았다고 가정하고 수행
-                highlighted_text = re.sub(pattern, replacement, highlighted_text)
+            if found is not None:
+                if not claimed.overlaps(*found):
+                    claimed.add(*found)
+                spans.append({"start": found[0], "end": found[1], "category": category, "index": index})
 
-        return highlighted_text, errors
+    spans.sort(key=lambda span: (span["start"], -span["end"]))
+    return spans
 
-    except json.JSONDecodeError:
-        return original_text, []
-    except Exception:
+
+def merge_spans(spans):
+    """
+    2단계: 겹치는 구간을 하나로 합칩니다. 합쳐진 구간의 색상은 가장 먼저 시작하는(같으면 더 긴) 지적의 카테고리를 따릅니다.
+    반환값: [{"start", "end", "category", "members": [(카테고리, index), ...]}]
+    """
+    merged = []
+    for span in sorted(spans, key=lambda span: (span["start"], -span["end"])):
+        if merged and span["start"] < merged[-1]["end"]:
+            merged[-1]["end"] = max(merged[-1]["end"], span["end"])
+            merged[-1]["members"].append((span["category"], span["index"]))
+        else:
+            merged.append({
+                "start": span["start"],
+                "end": span["end"],
+                "category": span["category"],
+                "members": [(span["category"], span["index"])],
+            })
+    return merged
+
+
+def render_spans(original_text, spans, anchor_prefix=None):
+    """
+    3단계: 합쳐진 구간 목록을 따라 원문을 한 번만 훑으며 HTML을 만듭니다.
+    anchor_prefix가 있으면 각 지적 위치에 id를 붙여, 결과 카드에서 링크로 이동할 수 있게 합니다.
+    (여러 지적이 합쳐진 구간은 첫 지적의 id를 구간에 붙이고, 나머지는 빈 <a id>로 같은 위치에 둠)
+    """
+    parts = []
+    position = 0
+    for span in spans:
+        parts.append(original_text[position:span["start"]])
+        anchor = None
+        if anchor_prefix:
+            anchors = [finding_anchor(anchor_prefix, category, index) for category, index in span["members"]]
+            anchor = anchors[0]
+            parts.extend(f"<a id='{extra}'></a>" for extra in anchors[1:])
+        parts.append(_highlight_open_tag(span["category"], anchor))
+        parts.append(original_text[span["start"]:span["end"]])
+        parts.append("</span>")
+        position = span["end"]
+    parts.append(original_text[position:])
+    return "".join(parts)
+
+
+def highlight_errors(original_text, analysis_result_json):
+    """
+    원본 텍스트에서 error_sentence를 찾아 빨간색 배경 처리를 합니다.
+    """
+    errors = parse_analysis_result(analysis_result_json)
+    if not errors:
         return original_text, []
+    spans = merge_spans(find_spans(original_text, {DEFAULT_CATEGORY: errors}))
+    return render_spans(original_text, spans), errors
+
+
+def highlight_categorized(original_text, analysis_results, anchor_prefix=None):
+    """
+    여러 분석 결과를 한 번에 하이라이트합니다.
+    analysis_results: {카테고리: LLM 응답 JSON 문자열 또는 이미 파싱된 오류 목록}
+    반환값: (하이라이트된 텍스트, {카테고리: 오류 목록}, 합쳐진 구간 목록)
+
+    위치를 먼저 모두 찾은 뒤 한 번에 HTML을 만들기 때문에, 앞에서 삽입한 <span> 태그 내부가 다시 매칭되는 일이 없습니다.
+    구간 목록(merge_spans 결과)은 다른 화면(결과 카드 링크 등)에서 재사용할 수 있습니다. (anchor_prefix는 render_spans 참고)
+    """
+    errors_by_category = {
+        category: result if isinstance(result, list) else parse_analysis_result(result)
+        for category, result in analysis_results.items()
+    }
+    spans = merge_spans(find_spans(original_text, errors_by_category))
+    return render_spans(original_text, spans, anchor_prefix), errors_by_category, spans
+
+
+def build_section_html(title, safe_highlighted):
+    """섹션 제목과 하이라이트된 본문으로 미리보기용 HTML 블록을 만듭니다."""
+    return textwrap.dedent(f"""
+        <div style="margin-bottom: 25px;">
+            <div style="font-size: 16px; font-weight: bold; color: #1f2937; margin-bottom: 8px; border-bottom: 1px solid #e5e7eb; padding-bottom: 4px;">
+                {title}
+            </div>
+            <div style="font-size: 14px; color: #374151;">
+                {safe_highlighted}
+            </div>
+        </div>
+    """).strip()
@@ -0,0 +1,77 @@
+"""
+모듈 import 시간 측정 스크립트 (콜드 스타트 확인용)
+
+사용 예:
+    python import_benchmark.py                  # 기본 모듈 목록을 각각 5회 측정
+    python import_benchmark.py app chains -n 10  # 지정한 모듈만 측정
+    python import_benchmark.py --top 15          # python -X importtime 기준 가장 느린 import 15개도 출력
+
+모듈마다 새 프로세스에서 import하므로, 이미 로드된 모듈의 영향 없이 첫 로딩 시간을 측정합니다.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+DEFAULT_MODULES = ["app", "read_docx_util", "chains", "pdf_converter", "batch_analyze"]
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MEASURE_CODE = (
+    "import time, json; started = time.perf_counter(); import {module}; "
+    "print(json.dumps(time.perf_counter() - started))"
+)
+
+
+def measure_import(module, repeat=5):
+    """새 인터프리터에서 module을 repeat번 import하여 소요 시간(초) 목록을 반환합니다. 실패하면 오류 메시지를 반환합니다."""
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE_CODE.format(module=module)],
+            cwd=SRC_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import 실패"
+        timings.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return timings, None
+
+
+def slowest_imports(module, top=10):
+    """python -X importtime 출력에서 누적 시간이 가장 긴 import를 (누적 μs, 모듈명) 목록으로 반환합니다."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if parts[1].isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모듈 import 시간 측정")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="모듈당 측정 횟수")
+    parser.add_argument("--top", type=int, default=0, help="가장 느린 import를 몇 개까지 보여줄지 (0이면 생략)")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        timings, error = measure_import(module, args.repeat)
+        if error:
+            print(f"{module:<20} 실패: {error}")
+            continue
+        print(f"{module:<20} 중앙값 {statistics.median(timings) * 1000:8.1f} ms  (최소 {min(timings) * 1000:.1f} / 최대 {max(timings) * 1000:.1f})")
+        if args.top:
+            for cumulative, name in slowest_imports(module, args.top):
+                print(f"    {cumulative / 1000:8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
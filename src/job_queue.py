@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_runner import run_chain_tasks, get_rate_limiter, quiet_llm_output, DEFAULT_MAX_CONCURRENCY
+from metrics import start_run, span, record_structured_output
+from structured_output import reask_failed
+
+# --- 백그라운드 작업 설정 (.env 로 조정 가능) ---
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(".cache", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2")) # 동시에 실행할 수 있는 분석 작업(문서) 수
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def chunk_hash(chunks):
+    """작업의 청크 구성(본문과 섹션 배정)을 나타내는 해시"""
+    return hashlib.sha256(json.dumps(chunks, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _revision_json(revision):
+    return json.dumps(revision, ensure_ascii=False, sort_keys=True) if revision is not None else None
+
+
+class JobStore:
+    """
+    분석 작업과 (청크 x 분석 종류) 단위 결과를 SQLite에 저장합니다.
+    결과는 끝나는 즉시 저장되므로, 프로세스가 재시작되어도 마지막으로 끝난 작업 다음부터 이어서 실행할 수 있습니다.
+    """
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    doc_hash TEXT,
+                    analysis_types TEXT,
+                    status TEXT,
+                    sections TEXT,
+                    chunks TEXT,
+                    total INTEGER,
+                    completed INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at REAL,
+                    updated_at REAL,
+                    chunk_hash TEXT,
+                    revision TEXT
+                )
+            """)
+            # 이전 버전에서 만든 DB에는 chunk_hash/revision 열이 없으므로 추가
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("chunk_hash", "revision"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT,
+                    task_index INTEGER,
+                    response TEXT,
+                    error TEXT,
+                    PRIMARY KEY (job_id, task_index)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_doc ON jobs(doc_hash, created_at)")
+
+    @contextlib.contextmanager
+    def _connection(self):
+        # sqlite3 연결의 with 문은 commit/rollback만 하고 연결을 닫지 않으므로, 끝나면 직접 닫음
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _row_to_job(self, row):
+        if row is None:
+            return None
+        keys = ["id", "doc_hash", "analysis_types", "status", "sections", "chunks", "total", "completed", "error", "created_at", "updated_at", "chunk_hash", "revision"]
+        job = dict(zip(keys, row))
+        for key in ("analysis_types", "sections", "chunks"):
+            job[key] = json.loads(job[key])
+        job["revision"] = json.loads(job["revision"]) if job["revision"] else None
+        return job
+
+    def create_job(self, doc_hash, analysis_types, sections, chunks, revision=None):
+        """revision은 개정본 비교 결과(RevisionPlan.to_dict())이며, 결과를 보여줄 때 이전 버전의 지적 사항을 채우는 데 씀"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, doc_hash, analysis_types, status, sections, chunks, total, completed, created_at, updated_at, chunk_hash, revision) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, 0, ?, ?, ?, ?)",
+                (job_id, doc_hash, json.dumps(analysis_types), json.dumps(sections, ensure_ascii=False),
+                 json.dumps(chunks, ensure_ascii=False), len(chunks) * len(analysis_types), now, now, chunk_hash(chunks),
+                 _revision_json(revision)),
+            )
+        return job_id
+
+    def get_job(self, job_id):
+        with self._connection() as conn:
+            return self._row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def latest_job(self, doc_hash, analysis_types=None, statuses=None, chunks=None, revision=False):
+        """revision을 넘기면(None 포함) 같은 개정본 비교 결과로 만든 작업만 찾음"""
+        query = "SELECT * FROM jobs WHERE doc_hash = ?"
+        params = [doc_hash]
+        if analysis_types is not None:
+            query += " AND analysis_types = ?"
+            params.append(json.dumps(analysis_types))
+        if chunks is not None:
+            query += " AND chunk_hash = ?"
+            params.append(chunk_hash(chunks))
+        if revision is not False:
+            query += " AND revision IS ?"
+            params.append(_revision_json(revision))
+        if statuses:
+            query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        query += " ORDER BY created_at DESC LIMIT 1"
+        with self._connection() as conn:
+            return self._row_to_job(conn.execute(query, params).fetchone())
+
+    def set_status(self, job_id, status, error=None):
+        with self._connection() as conn:
+            conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?", (status, error, time.time(), job_id))
+
+    def save_result(self, job_id, task_index, response, error=None):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, task_index, response, error) VALUES (?, ?, ?, ?)",
+                (job_id, task_index, response, error),
+            )
+            conn.execute(
+                "UPDATE jobs SET completed = (SELECT COUNT(*) FROM job_results WHERE job_id = ?), updated_at = ? WHERE id = ?",
+                (job_id, time.time(), job_id),
+            )
+
+    def pending_tasks(self, job_id):
+        job = self.get_job(job_id)
+        with self._connection() as conn:
+            finished = {row[0] for row in conn.execute("SELECT task_index FROM job_results WHERE job_id = ?", (job_id,))}
+        return [index for index in range(job["total"]) if index not in finished]
+
+    def get_outputs(self, job_id):
+        """run_chain_tasks와 같은 [(response, error), ...] 형식으로 결과를 반환합니다. (아직 없는 작업은 None)"""
+        job = self.get_job(job_id)
+        outputs = [None] * job["total"]
+        with self._connection() as conn:
+            for task_index, response, error in conn.execute(
+                "SELECT task_index, response, error FROM job_results WHERE job_id = ?", (job_id,)
+            ):
+                outputs[task_index] = (response, RuntimeError(error) if error else None)
+        return outputs
+
+
+class JobManager:
+    """
+    Streamlit 스크립트 스레드와 별개로 분석 작업을 실행하는 프로세스 전역 작업자 풀.
+    화면을 새로고침하거나 다른 위젯을 조작해도 작업은 계속 실행되며, 페이지는 job_id로 진행 상황을 조회합니다.
+    """
+    def __init__(self, store, workers=JOB_WORKERS):
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def is_active(self, job_id):
+        with self._lock:
+            return job_id in self._active
+
+    def submit(self, api_key, doc_hash, analysis_types, sections, chunks, chain_factory,
+               max_concurrency=DEFAULT_MAX_CONCURRENCY, revision=None):
+        """
+        같은 문서/분석 종류/청크 구성의 작업이 이미 대기 중이거나 실행 중이면 새로 만들지 않고 그 작업에 연결합니다.
+        (개정본 비교로 일부 섹션만 분석하는 작업과 전체 분석 작업은 청크 구성이 다르므로 서로 연결되지 않고,
+         비교한 이전 개정본이 다른 작업끼리도 연결되지 않음)
+        revision(RevisionPlan.to_dict())은 작업과 함께 저장되어, 어느 세션에서 결과를 열어도 같은 비교 결과를 씀
+        chain_factory(analysis_type, api_key, reask=False)는 분석 종류별 체인을 만드는 함수입니다. (reask=True는 JSON 재요청용 체인)
+        """
+        existing = self.store.latest_job(doc_hash, analysis_types, ACTIVE_STATUSES, chunks, revision)
+        if existing is not None:
+            self.resume(existing["id"], api_key, chain_factory, max_concurrency)
+            return existing["id"]
+
+        job_id = self.store.create_job(doc_hash, analysis_types, sections, chunks, revision)
+        self.resume(job_id, api_key, chain_factory, max_concurrency)
+        return job_id
+
+    def resume(self, job_id, api_key, chain_factory, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """이 프로세스에서 실행 중이 아닌 작업을 (남은 작업만) 다시 실행합니다. (재시작 후 이어하기)"""
+        with self._lock:
+            if job_id in self._active:
+                return False
+            self._active.add(job_id)
+        self.executor.submit(self._run, job_id, api_key, chain_factory, max_concurrency)
+        return True
+
+    def _run(self, job_id, api_key, chain_factory, max_concurrency):
+        run = None
+        try:
+            job = self.store.get_job(job_id)
+            self.store.set_status(job_id, "running")
+            analysis_types = job["analysis_types"]
+            chains = {analysis_type: chain_factory(analysis_type, api_key) for analysis_type in analysis_types}
+            tasks = [(chains[analysis_type], chunk["text"]) for chunk in job["chunks"] for analysis_type in analysis_types]
+            pending = self.store.pending_tasks(job_id)
+            run = start_run("background_job", job=job_id[:8], types=",".join(analysis_types))
+            run.count("requests", len(pending))
+
+            # 작업 하나가 끝날 때마다 바로 저장 (중단되더라도 끝난 부분은 다시 요청하지 않음)
+            def on_result(index, response, error, done_count):
+                self.store.save_result(job_id, pending[index], response, str(error) if error is not None else None)
+
+            # 화면에서 실행할 때와 같이 langchain/SDK의 표준 출력을 버림
+            with quiet_llm_output(), span("llm", run):
+                run_chain_tasks(
+                    [tasks[index] for index in pending],
+                    mode="concurrent",
+                    max_concurrency=max_concurrency,
+                    rate_limiter=get_rate_limiter(api_key),
+                    on_result=on_result,
+                )
+                # JSON으로 해석할 수 없는 응답만 다시 요청하고, 복구된 결과는 덮어써서 저장
+                outputs = [output or (None, RuntimeError("결과 없음")) for output in self.store.get_outputs(job_id)]
+                fixed, parse_stats = reask_failed(
+                    tasks, outputs,
+                    lambda index: chain_factory(analysis_types[index % len(analysis_types)], api_key, reask=True),
+                    lambda retry_tasks: run_chain_tasks(retry_tasks, max_concurrency=max_concurrency,
+                                                        rate_limiter=get_rate_limiter(api_key)),
+                )
+                for index, (before, after) in enumerate(zip(outputs, fixed)):
+                    if after is not before:
+                        self.store.save_result(job_id, index, after[0])
+            record_structured_output(parse_stats, run)
+            self.store.set_status(job_id, "done")
+            run.finish("done")
+        except Exception as e:
+            self.store.set_status(job_id, "failed", str(e))
+            if run is not None:
+                run.finish("failed")
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """Streamlit rerun/세션과 무관하게 프로세스 전체에서 하나의 JobManager를 공유합니다."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(JobStore())
+        return _manager
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+# --- LLM 클라이언트 설정 (.env 로 조정 가능) ---
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")                      # gemini | fake (로컬 가짜 LLM 서버)
+LLM_FAKE_URL = os.getenv("LLM_FAKE_URL", "http://127.0.0.1:8765")      # fake 백엔드가 호출할 서버 주소
+LLM_CLIENT_IDLE_SECONDS = float(os.getenv("LLM_CLIENT_IDLE_SECONDS", "1800")) # 이 시간 동안 쓰이지 않은 클라이언트/체인은 정리
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "1") != "0"                 # Gemini JSON 모드(response_mime_type) 사용 여부
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+LLM_HTTP_MAX_IDLE = int(os.getenv("LLM_HTTP_MAX_IDLE", "16"))            # 클라이언트당 보관할 유휴 keep-alive 연결 수
+
+
+class LLMBackend:
+    """
+    LLM 백엔드 인터페이스.
+    create_client는 (API Key, 모델, temperature)마다 한 번만 호출되고, 만든 클라이언트는 여러 체인/세션이 함께 사용합니다.
+    build_chain이 반환하는 체인은 invoke({"text": ...}) -> str, stream({"text": ...}) -> 문자열 조각을 지원해야 합니다.
+    """
+    name = None
+
+    def create_client(self, api_key, model, temperature):
+        raise NotImplementedError
+
+    def build_chain(self, client, template):
+        raise NotImplementedError
+
+    def close_client(self, client):
+        pass
+
+
+class GeminiBackend(LLMBackend):
+    """ChatGoogleGenerativeAI 기반 LangChain 체인 (클라이언트를 재사용하면 내부 HTTP/gRPC 연결도 재사용됨)"""
+    name = "gemini"
+
+    def create_client(self, api_key, model, temperature):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        options = {"response_mime_type": "application/json"} if LLM_JSON_MODE else {}
+        return ChatGoogleGenerativeAI(model=model, temperature=temperature, google_api_key=api_key, **options)
+
+    def build_chain(self, client, template):
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+        return PromptTemplate.from_template(template) | client | StrOutputParser()
+
+
+class LLMHTTPError(RuntimeError):
+    """HTTP 백엔드의 오류 응답 : llm_runner.is_retryable_error가 status_code로 재시도 여부를 판별합니다."""
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+
+
+class FakeHTTPClient:
+    """
+    로컬 가짜 LLM 서버(fake_llm_server.py)를 호출하는 클라이언트.
+    HTTP/1.1 keep-alive 연결을 풀에 보관하여, 요청(및 작업 스레드)이 바뀌어도 연결을 새로 맺지 않고 재사용합니다.
+    """
+    def __init__(self, base_url, model, temperature, timeout=LLM_HTTP_TIMEOUT, max_idle=LLM_HTTP_MAX_IDLE):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.model = model
+        self.temperature = temperature
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _request(self, path, payload):
+        """응답과 사용한 연결을 반환합니다. 응답을 끝까지 읽은 뒤 _release로 연결을 돌려줘야 합니다."""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                # 서버가 유휴 연결을 닫은 경우 한 번만 새 연결로 다시 시도
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                message = response.read().decode("utf-8", "replace")
+                self._release(conn)
+                raise LLMHTTPError(response.status, message)
+            return response, conn
+
+    def generate(self, prompt, text):
+        response, conn = self._request("/v1/generate", self._payload(prompt, text))
+        data = response.read()
+        self._release(conn)
+        return json.loads(data.decode("utf-8"))["text"]
+
+    def stream(self, prompt, text):
+        response, conn = self._request("/v1/stream", self._payload(prompt, text))
+        # 서버는 한 줄에 {"text": 조각} 하나씩 보냄 (chunked 전송)
+        finished = False
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    finished = True
+                    break
+                line = line.strip()
+                if line:
+                    yield json.loads(line.decode("utf-8"))["text"]
+        finally:
+            # 중간에 멈춘 스트림의 연결은 남은 데이터가 있으므로 재사용하지 않음
+            if finished:
+                self._release(conn)
+            else:
+                conn.close()
+
+    def _payload(self, prompt, text):
+        return {"model": self.model, "temperature": self.temperature, "prompt": prompt, "text": text}
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class FakeChain:
+    """FakeHTTPClient용 체인 : LangChain 체인과 같은 invoke/stream 인터페이스를 제공합니다."""
+    def __init__(self, client, template):
+        self.client = client
+        self.template = template
+
+    def _prompt(self, inputs):
+        # 템플릿의 {{ }}는 str.format에서 { }로 바뀌므로 PromptTemplate과 같은 결과가 됨
+        return self.template.format(**inputs)
+
+    def invoke(self, inputs, *args, **kwargs):
+        return self.client.generate(self._prompt(inputs), inputs.get("text", ""))
+
+    def stream(self, inputs, *args, **kwargs):
+        yield from self.client.stream(self._prompt(inputs), inputs.get("text", ""))
+
+
+class FakeHTTPBackend(LLMBackend):
+    name = "fake"
+
+    def __init__(self, base_url=LLM_FAKE_URL):
+        self.base_url = base_url
+
+    def create_client(self, api_key, model, temperature):
+        return FakeHTTPClient(self.base_url, model, temperature)
+
+    def build_chain(self, client, template):
+        return FakeChain(client, template)
+
+    def close_client(self, client):
+        client.close()
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeHTTPBackend,
+}
+
+def register_backend(name, factory):
+    """새 백엔드를 등록합니다. factory()는 LLMBackend 인스턴스를 반환해야 합니다."""
+    BACKENDS[name] = factory
+
+
+class ClientRegistry:
+    """
+    프로세스 전역 LLM 클라이언트/체인 저장소.
+    클라이언트는 (백엔드, API Key 해시, 모델, temperature), 체인은 여기에 (체인 종류, 템플릿 해시)를 더한 키로 공유하므로,
+    버튼을 누를 때마다 또는 세션마다 클라이언트를 새로 만들지 않습니다.
+    LLM_CLIENT_IDLE_SECONDS 동안 쓰이지 않은 항목은 다음 조회 때 정리됩니다.
+    """
+    def __init__(self, idle_seconds=LLM_CLIENT_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._backends = {}
+        self._clients = {}  # key -> [client, backend, last_used]
+        self._chains = {}   # key -> [chain, client_key, last_used]
+        self._lock = threading.RLock()
+
+    def backend(self, name=None):
+        name = name or LLM_BACKEND
+        with self._lock:
+            if name not in self._backends:
+                if name not in BACKENDS:
+                    raise ValueError(f"알 수 없는 LLM 백엔드: {name}")
+                self._backends[name] = BACKENDS[name]()
+            return self._backends[name]
+
+    def get_client(self, api_key, model, temperature=0, backend=None):
+        backend = self.backend(backend)
+        key = (backend.name, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest(), model, temperature)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = [backend.create_client(api_key, model, temperature), backend, now]
+                self._clients[key] = entry
+            entry[2] = now
+            return key, entry[0]
+
+    def get_chain(self, api_key, model, chain_type, template, temperature=0, backend=None, wrap=None):
+        """
+        체인을 반환합니다. wrap(chain)이 있으면 처음 만들 때 한 번 적용한 결과(예: 결과 캐시)를 저장합니다.
+        """
+        with self._lock:
+            client_key, client = self.get_client(api_key, model, temperature, backend)
+            key = client_key + (chain_type, hashlib.sha256(template.encode("utf-8")).hexdigest())
+            entry = self._chains.get(key)
+            if entry is None:
+                chain = self.backend(client_key[0]).build_chain(client, template)
+                entry = [wrap(chain) if wrap else chain, client_key, 0.0]
+                self._chains[key] = entry
+            entry[2] = time.monotonic()
+            return entry[0]
+
+    def _evict_idle(self, now):
+        if self.idle_seconds <= 0:
+            return
+        for key, entry in list(self._chains.items()):
+            if now - entry[2] > self.idle_seconds:
+                del self._chains[key]
+        in_use = {entry[1] for entry in self._chains.values()}
+        for key, (client, backend, last_used) in list(self._clients.items()):
+            if key not in in_use and now - last_used > self.idle_seconds:
+                del self._clients[key]
+                try:
+                    backend.close_client(client)
+                except Exception:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            for client, backend, _ in self._clients.values():
+                try:
+                    backend.close_client(client)
+                except Exception:
+                    pass
+            self._clients.clear()
+            self._chains.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._clients), "chains": len(self._chains)}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_client_registry():
+    """Streamlit rerun/세션과 무관하게 프로세스 전체에서 하나의 ClientRegistry를 공유합니다."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+        return _registry
@@ -0,0 +1,248 @@
+import os
+import re
+import sys
+import time
+import random
+import hashlib
+import queue
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- 실행 설정 (.env 로 조정 가능) ---
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))       # 동시에 보낼 최대 요청 수
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")) # Gemini 할당량에 맞춘 분당 요청 수 (0이면 제한 없음)
+DEFAULT_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))               # 429/5xx 발생 시 재시도 횟수
+RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))          # 첫 재시도 대기 시간(초), 이후 2배씩 증가
+RETRY_MAX_DELAY = 30.0
+
+RUN_MODES = {
+    "concurrent": "병렬 실행",
+    "sequential": "순차 실행",
+    "streaming": "스트리밍 (실시간 표시)",
+}
+
+# 재시도 대상: 할당량 초과(429)와 서버 측 일시 오류(5xx)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_GRPC_CODES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL"}
+# google.api_core.exceptions 등의 예외 클래스 이름 (SDK를 import하지 않고 MRO의 이름으로 비교)
+RETRYABLE_EXCEPTION_NAMES = {
+    "TooManyRequests", "ResourceExhausted", "InternalServerError", "BadGateway",
+    "ServiceUnavailable", "GatewayTimeout", "DeadlineExceeded", "RateLimitError",
+}
+# 상태 코드를 속성으로 주지 않는 예외를 위한 마지막 수단 : 제공자가 쓰는 오류 문구만 확인 (숫자만으로는 판별하지 않음)
+RETRYABLE_MESSAGE_PATTERN = re.compile(
+    r"RESOURCE_EXHAUSTED|\bUNAVAILABLE\b|DEADLINE_EXCEEDED|rate limit exceeded|too many requests|quota exceeded",
+    re.IGNORECASE,
+)
+
+class RateLimiter:
+    """
+    분당 요청 수를 넘지 않도록 호출 간격을 일정하게 맞춥니다.
+    여러 스레드(및 여러 Streamlit 세션)가 하나의 인스턴스를 공유할 수 있습니다.
+    """
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(api_key, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+    """
+    API Key 단위로 공유되는 RateLimiter를 반환합니다.
+    Streamlit은 rerun마다 app.py를 다시 실행하므로, 할당량 상태는 이 모듈에 보관합니다.
+    """
+    key = (hashlib.sha256((api_key or "").encode("utf-8")).hexdigest(), requests_per_minute)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(requests_per_minute)
+        return _rate_limiters[key]
+
+
+def _status_of(error):
+    """예외의 HTTP/gRPC 상태 (code, status_code 속성 또는 error.response.status_code)"""
+    for value in (getattr(error, "code", None), getattr(error, "status_code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if callable(value):
+            continue
+        if value is not None:
+            return value
+    return None
+
+
+def is_retryable_error(error):
+    """
+    google api_core / langchain 예외에서 429, 5xx 여부를 판별합니다.
+    상태 코드 속성 → 예외 종류 → (둘 다 없을 때만) 제공자의 오류 문구 순으로 확인합니다.
+    """
+    status = _status_of(error)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+    if getattr(status, "name", None) in RETRYABLE_GRPC_CODES: # grpc.StatusCode
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in RETRYABLE_EXCEPTION_NAMES for cls in type(error).__mro__):
+        return True
+    return bool(RETRYABLE_MESSAGE_PATTERN.search(str(error)))
+
+class _NullWriter:
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+_quiet_lock = threading.Lock()
+_quiet_depth = 0
+_saved_stdout = None
+
+@contextlib.contextmanager
+def quiet_llm_output():
+    """
+    LLM 호출 중 langchain/SDK가 표준 출력에 쓰는 내용을 버립니다. ("'ascii' codec can't encode characters" 오류 예방)
+    화면(app.py)과 백그라운드 작업(job_queue)이 함께 사용하며, sys.stdout은 프로세스 전체에서 하나이므로
+    여러 스레드가 동시에 사용해도 마지막 사용자가 끝날 때 원래 stdout으로 한 번만 되돌립니다.
+    (contextlib.redirect_stdout을 겹쳐 쓰면 먼저 끝난 쪽이 다른 쪽의 대체 출력을 복원하여 stdout을 잃을 수 있음)
+    """
+    global _quiet_depth, _saved_stdout
+    with _quiet_lock:
+        if _quiet_depth == 0:
+            _saved_stdout = sys.stdout
+            sys.stdout = _NullWriter()
+        _quiet_depth += 1
+    try:
+        yield
+    finally:
+        with _quiet_lock:
+            _quiet_depth -= 1
+            if _quiet_depth == 0:
+                sys.stdout = _saved_stdout
+                _saved_stdout = None
+
+
+def invoke_with_retry(chain, inputs, rate_limiter=None, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    chain.invoke를 호출하되, 재시도 가능한 오류는 지수 백오프(+지터)로 다시 시도합니다.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return chain.invoke(inputs)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+def run_chain_tasks(tasks, mode="concurrent", max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                    rate_limiter=None, max_retries=DEFAULT_MAX_RETRIES, on_result=None):
+    """
+    tasks: [(chain, text), ...] 목록을 실행하고, 결과를 입력 순서 그대로 반환합니다.
+    반환값: [(response, error), ...]  -> 성공 시 error는 None, 실패 시 response는 None
+
+    on_result(index, response, error, done_count)는 작업 하나가 끝날 때마다
+    호출한 스레드(Streamlit 스크립트 스레드)에서 실행되므로, 진행률 표시 등에 사용할 수 있습니다.
+    """
+    results = [None] * len(tasks)
+
+    def call(chain, text):
+        return invoke_with_retry(chain, {"text": text}, rate_limiter, max_retries)
+
+    if mode == "sequential" or max_concurrency <= 1:
+        for i, (chain, text) in enumerate(tasks):
+            try:
+                results[i] = (call(chain, text), None)
+            except Exception as e:
+                results[i] = (None, e)
+            if on_result:
+                on_result(i, results[i][0], results[i][1], i + 1)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {executor.submit(call, chain, text): i for i, (chain, text) in enumerate(tasks)}
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = (future.result(), None)
+            except Exception as e:
+                results[i] = (None, e)
+            if on_result:
+                on_result(i, results[i][0], results[i][1], done_count)
+
+    return results
+
+
+def stream_with_retry(chain, inputs, rate_limiter=None, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    chain.stream의 조각들을 그대로 yield 합니다.
+    첫 조각이 오기 전의 재시도 가능한 오류만 백오프 후 다시 시도합니다. (이미 일부를 내보낸 뒤에는 재시도하지 않음)
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        started = False
+        try:
+            for piece in chain.stream(inputs):
+                started = True
+                yield piece
+            return
+        except Exception as e:
+            if started or attempt >= max_retries or not is_retryable_error(e):
+                raise
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+def stream_chain_tasks(tasks, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate_limiter=None,
+                       max_retries=DEFAULT_MAX_RETRIES):
+    """
+    tasks: [(chain, text), ...]를 동시에(max_concurrency개까지) 스트리밍 호출하고, 도착하는 순서대로 이벤트를 yield 합니다.
+    - ("chunk", index, 텍스트 조각)
+    - ("done", index, 전체 응답 텍스트)
+    - ("error", index, 예외)
+    이벤트는 호출한 스레드(Streamlit 스크립트 스레드)에서 소비되므로, 받는 즉시 화면을 갱신할 수 있습니다.
+    """
+    events = queue.Queue()
+
+    def call(index, chain, text):
+        pieces = []
+        try:
+            for piece in stream_with_retry(chain, {"text": text}, rate_limiter, max_retries):
+                pieces.append(piece)
+                events.put(("chunk", index, piece))
+            events.put(("done", index, "".join(pieces)))
+        except Exception as e:
+            events.put(("error", index, e))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        for index, (chain, text) in enumerate(tasks):
+            executor.submit(call, index, chain, text)
+
+        finished = 0
+        while finished < len(tasks):
+            event = events.get()
+            if event[0] in ("done", "error"):
+                finished += 1
+            yield event
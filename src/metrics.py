@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import threading
+import contextlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chunking import estimate_tokens
+
+# --- 계측 설정 (.env 로 조정 가능) ---
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))          # Prometheus /metrics 포트 (0이면 사용 안 함)
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "")        # 구간/실행 기록을 JSON Lines로 남길 파일 (비우면 사용 안 함)
+METRICS_RECENT_RUNS = int(os.getenv("METRICS_RECENT_RUNS", "50")) # 관리자 패널에 보관할 최근 실행 수
+METRICS_PREFIX = "committee_"
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RECENT_SAMPLES = 1000 # 백분위 계산용으로 보관할 최근 측정값 수 (지표/라벨별)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * q // 100) - 1)]
+
+
+class MetricsRegistry:
+    """
+    카운터와 히스토그램(소요 시간)을 프로세스 메모리에 모읍니다.
+    Prometheus 텍스트 형식으로 내보내거나, 관리자 패널에서 최근 측정값의 p50/p95를 볼 수 있습니다.
+    """
+    def __init__(self, recent_runs=METRICS_RECENT_RUNS):
+        self._counters = {}    # (name, label_key) -> 값
+        self._histograms = {}  # (name, label_key) -> {"buckets": [...], "sum": float, "count": int, "recent": deque}
+        self._runs = deque(maxlen=recent_runs)
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0, "recent": deque(maxlen=RECENT_SAMPLES)}
+                self._histograms[key] = entry
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+            entry["recent"].append(value)
+
+    def summary(self, name):
+        """지표 하나의 라벨별 {count, avg, p50, p95} 목록 (관리자 패널용)"""
+        rows = []
+        with self._lock:
+            items = [(label_key, entry["count"], entry["sum"], list(entry["recent"]))
+                     for (metric, label_key), entry in self._histograms.items() if metric == name]
+        for label_key, count, total, recent in items:
+            row = dict(label_key)
+            row.update({
+                "count": count,
+                "avg_seconds": round(total / count, 4) if count else None,
+                "p50_seconds": round(_percentile(recent, 50), 4) if recent else None,
+                "p95_seconds": round(_percentile(recent, 95), 4) if recent else None,
+            })
+            rows.append(row)
+        return rows
+
+    def counter_values(self, name):
+        with self._lock:
+            return [(dict(label_key), value) for (metric, label_key), value in self._counters.items() if metric == name]
+
+    def add_run(self, run):
+        with self._lock:
+            self._runs.append(run)
+
+    def recent_runs(self):
+        with self._lock:
+            return [run.to_dict() for run in reversed(self._runs)]
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(entry, buckets=list(entry["buckets"]))) for key, entry in self._histograms.items())
+
+        typed = set()
+        for (name, label_key), value in counters:
+            full_name = METRICS_PREFIX + name
+            if full_name not in typed:
+                lines.append(f"# TYPE {full_name} counter")
+                typed.add(full_name)
+            lines.append(f"{full_name}{_format_labels(label_key)} {value}")
+
+        for (name, label_key), entry in histograms:
+            full_name = METRICS_PREFIX + name
+            if full_name not in typed:
+                lines.append(f"# TYPE {full_name} histogram")
+                typed.add(full_name)
+            for bound, count in zip(DURATION_BUCKETS, entry["buckets"]):
+                lines.append(f"{full_name}_bucket{_format_labels(label_key, [('le', bound)])} {count}")
+            lines.append(f"{full_name}_bucket{_format_labels(label_key, [('le', '+Inf')])} {entry['count']}")
+            lines.append(f"{full_name}_sum{_format_labels(label_key)} {entry['sum']}")
+            lines.append(f"{full_name}_count{_format_labels(label_key)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = MetricsRegistry()
+_log_lock = threading.Lock()
+
+def get_metrics():
+    return _metrics
+
+
+def log_event(event, **fields):
+    """METRICS_LOG_PATH가 설정되어 있으면 한 줄짜리 JSON 기록을 추가합니다."""
+    if not METRICS_LOG_PATH:
+        return
+    record = {"ts": round(time.time(), 3), "event": event, **fields}
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _log_lock:
+        directory = os.path.dirname(METRICS_LOG_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(METRICS_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class AnalysisRun:
+    """
+    분석 한 번(문서 하나 x 분석 종류들)의 단계별 소요 시간과 건수를 모읍니다.
+    finish()를 호출하면 최근 실행 목록(관리자 패널)과 JSON 로그에 남습니다.
+    """
+    def __init__(self, kind, **attrs):
+        self.kind = kind
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.total_seconds = None
+        self.stages = {}
+        self.counts = {}
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def finish(self, status="done"):
+        self.total_seconds = time.perf_counter() - self._started
+        self.attrs["status"] = status
+        _metrics.observe("run_duration_seconds", self.total_seconds, kind=self.kind, status=status)
+        _metrics.add_run(self)
+        log_event("run", **self.to_dict())
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+                "total_seconds": round(self.total_seconds, 3) if self.total_seconds is not None else None,
+                **self.attrs,
+                **{f"{stage}_seconds": round(seconds, 3) for stage, seconds in self.stages.items()},
+                **self.counts,
+            }
+
+
+def start_run(kind, **attrs):
+    return AnalysisRun(kind, **attrs)
+
+
+@contextlib.contextmanager
+def span(stage, run=None, **labels):
+    """
+    with span("parse", run): ... 형태로 구간 소요 시간을 측정합니다.
+    stage_duration_seconds 히스토그램에 기록하고, run이 있으면 그 실행의 단계별 합계에도 더합니다.
+    """
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _metrics.observe("stage_duration_seconds", elapsed, stage=stage, status=status, **labels)
+        if run is not None:
+            run.add(stage, elapsed)
+        log_event("span", stage=stage, seconds=round(elapsed, 4), status=status, **labels)
+
+
+def record_conversion(engine, success, seconds, file_name=None):
+    """파일 하나의 PDF 변환 결과를 기록합니다. (engine: daemon | subprocess)"""
+    status = "ok" if success else "error"
+    _metrics.observe("conversion_seconds", seconds, engine=engine, status=status)
+    _metrics.inc("conversions_total", engine=engine, status=status)
+    log_event("conversion", engine=engine, status=status, seconds=round(seconds, 4), file=file_name)
+
+
+def record_structured_output(stats, run=None):
+    """structured_output.reask_failed의 집계(정상/복구/실패/재요청 수)를 지표와 실행 기록에 더합니다."""
+    for status in ("ok", "repaired", "failed"):
+        if stats.get(status):
+            _metrics.inc("structured_output_total", stats[status], status=status)
+    if stats.get("reasked"):
+        _metrics.inc("structured_reasks_total", stats["reasked"], outcome="sent")
+        _metrics.inc("structured_reasks_total", stats.get("recovered", 0), outcome="recovered")
+    if run is not None:
+        for name in ("repaired", "failed", "reasked", "recovered"):
+            if stats.get(name):
+                run.count(f"json_{name}", stats[name])
+
+
+class InstrumentedChain:
+    """
+    실제 LLM 호출(캐시 뒤쪽)을 감싸 호출별 지연 시간과 입출력 토큰 수(추정)를 기록합니다.
+    invoke/stream 인터페이스는 감싼 체인과 같습니다.
+    """
+    def __init__(self, chain, chain_type):
+        self.chain = chain
+        self.chain_type = chain_type
+
+    def _record(self, started, status, text, response=None):
+        elapsed = time.perf_counter() - started
+        _metrics.observe("llm_call_seconds", elapsed, chain_type=self.chain_type, status=status)
+        _metrics.inc("llm_calls_total", chain_type=self.chain_type, status=status)
+        _metrics.inc("llm_tokens_total", estimate_tokens(text), chain_type=self.chain_type, direction="in")
+        if response:
+            _metrics.inc("llm_tokens_total", estimate_tokens(response), chain_type=self.chain_type, direction="out")
+        log_event("llm_call", chain_type=self.chain_type, seconds=round(elapsed, 4), status=status)
+
+    def invoke(self, inputs, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.chain.invoke(inputs, *args, **kwargs)
+        except Exception:
+            self._record(started, "error", inputs.get("text", ""))
+            raise
+        self._record(started, "ok", inputs.get("text", ""), response if isinstance(response, str) else None)
+        return response
+
+    def stream(self, inputs, *args, **kwargs):
+        started = time.perf_counter()
+        pieces = []
+        status = "error"
+        try:
+            for piece in self.chain.stream(inputs, *args, **kwargs):
+                if not pieces:
+                    _metrics.observe("llm_first_token_seconds", time.perf_counter() - started, chain_type=self.chain_type)
+                pieces.append(piece)
+                yield piece
+            status = "ok"
+        except GeneratorExit:
+            # 사용하는 쪽이 중간에 generator를 닫은 경우 (받은 부분까지 기록)
+            status = "cancelled"
+            raise
+        finally:
+            self._record(started, status, inputs.get("text", ""), "".join(pieces))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = _metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """
+    Prometheus가 수집할 수 있도록 http://host:port/metrics 를 엽니다. (프로세스당 한 번, port가 0이면 열지 않음)
+    Streamlit은 rerun마다 app.py를 다시 실행하므로, 서버 상태는 이 모듈에 보관합니다.
+    """
+    global _server
+    if port <= 0:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
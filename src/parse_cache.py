@@ -0,0 +1,108 @@
+import os
+import weakref
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+# --- 파싱 캐시 설정 (.env 로 조정 가능) ---
+PARSE_CACHE_MAX_ENTRIES = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "16"))
+PARSE_CACHE_MAX_MB = float(os.getenv("PARSE_CACHE_MAX_MB", "256"))
+
+
+class ParsedDocument:
+    """
+    업로드된 파일 하나에 대한 캐시 항목.
+    임시 파일은 한 번만 만들고, 미리보기 텍스트(raw_text)와 섹션(read_docx 결과)은 처음 요청될 때 한 번만 계산합니다.
+    임시 파일은 이 객체를 가진 곳이 모두 없어질 때(또는 프로세스 종료 시) 삭제되므로,
+    캐시에서 제거된 뒤에도 아직 이 문서를 쓰고 있는 세션/분석은 파일을 계속 읽을 수 있습니다.
+    """
+    def __init__(self, content_hash, file_bytes, suffix):
+        self.content_hash = content_hash
+        self.suffix = suffix
+        self.size = len(file_bytes)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+            tmp_file.write(file_bytes)
+            self.file_path = tmp_file.name
+        self._raw_text = None
+        self._sections = None
+        self._values = {}
+        self._lock = threading.Lock()
+        self._remove_file = weakref.finalize(self, _remove_file, self.file_path)
+
+    def get_raw_text(self, reader):
+        with self._lock:
+            if self._raw_text is None:
+                self._raw_text = reader(self.file_path)
+            return self._raw_text
+
+    def get_sections(self, reader):
+        with self._lock:
+            if self._sections is None:
+                self._sections = reader(self.file_path)
+            return self._sections
+
+    def get_value(self, name, reader):
+        """미리보기/섹션 외에 파일에서 계산한 값(예: PDF 전체 텍스트)을 이름별로 한 번만 계산하여 보관합니다."""
+        with self._lock:
+            if name not in self._values:
+                self._values[name] = reader(self.file_path)
+            return self._values[name]
+
+    def cleanup(self):
+        """임시 파일을 바로 삭제합니다. (이후 이 객체로는 파일을 읽을 수 없음)"""
+        self._remove_file()
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ParseCache:
+    """
+    업로드 내용의 해시(sha256)를 키로 하는 LRU 캐시.
+    항목 수 또는 원본 파일 크기 합계가 상한을 넘으면 가장 오래 사용하지 않은 문서부터 제거합니다.
+    제거한 문서의 임시 파일은 그 문서를 쓰고 있는 곳이 없어질 때 삭제됩니다. (ParsedDocument 참고)
+    """
+    def __init__(self, max_entries=PARSE_CACHE_MAX_ENTRIES, max_bytes=int(PARSE_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, file_bytes, suffix):
+        content_hash = hashlib.sha256(file_bytes).hexdigest()
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                self._entries.move_to_end(content_hash)
+                return entry
+
+            entry = ParsedDocument(content_hash, file_bytes, suffix)
+            self._entries[content_hash] = entry
+            self._total_bytes += entry.size
+            self._evict()
+            return entry
+
+    def _evict(self):
+        # 방금 추가한 항목(가장 최근)은 남겨둠
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+# Streamlit은 rerun마다 app.py를 다시 실행하지만, import된 모듈은 유지되므로 캐시를 이 모듈에 둠
+# 남은 임시 파일은 프로세스 종료 시 weakref.finalize가 정리함
+_parse_cache = ParseCache()
+
+def get_parse_cache():
+    return _parse_cache
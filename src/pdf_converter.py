@@ -1,16 +1,39 @@
 import os
+import shutil
+import tempfile
 import subprocess
 import sys
+import queue
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from folder_scanner import scan_files, DEFAULT_INCLUDE
+from metrics import record_conversion
+from conversion_manifest import load_manifest, save_manifest, make_entry, is_up_to_date, remove_stale_outputs
 
-def convert_to_pdf_linux(input_path, output_folder):
+# 동시에 실행할 LibreOffice 변환 프로세스 수 (.env, 0 또는 미설정 시 CPU 코어 수)
+DEFAULT_CONVERT_WORKERS = int(os.getenv("PDF_CONVERT_WORKERS", "0")) or os.cpu_count() or 1
+MANIFEST_SAVE_EVERY = 20 # 증분 모드에서 N개 변환마다 변환 기록 저장
+
+def convert_to_pdf_linux(input_path, output_folder, profile_dir=None):
     """
     LibreOffice를 사용하여 단일 파일을 PDF로 변환합니다.
+    profile_dir을 지정하면 해당 폴더를 LibreOffice 사용자 프로필로 사용합니다.
+    (여러 프로세스가 같은 프로필을 쓰면 프로필 잠금 때문에 동시에 실행되지 않음)
     """
+    started = time.perf_counter()
+    success, message = _run_libreoffice(input_path, output_folder, profile_dir)
+    record_conversion("subprocess", success, time.perf_counter() - started, os.path.basename(input_path))
+    return success, message
+
+def _run_libreoffice(input_path, output_folder, profile_dir=None):
     try:
         # libreoffice 명령어가 설치되어 있는지 확인이 필요하지만,
         # 여기서는 설치되었다고 가정하고 실행합니다.
-        cmd = [
-            'libreoffice',
+        cmd = ['libreoffice']
+        if profile_dir:
+            cmd.append(f'-env:UserInstallation={Path(profile_dir).absolute().as_uri()}')
+        cmd += [
             '--headless',
             '--convert-to', 'pdf',
             input_path,
@@ -29,9 +52,30 @@ def convert_to_pdf_linux(input_path, output_folder):
     except Exception as e:
         return False, str(e)
 
-def batch_convert_to_pdf(target_folder):
+def convert_to_pdf(input_path, output_folder, profile_dir=None, slot=0):
+    """
+    상주 soffice 데몬(soffice_daemon)으로 변환하고, 데몬을 사용할 수 없으면 기존 subprocess 방식으로 변환합니다.
+    """
+    # soffice_daemon(및 UNO 작업자 탐색)은 실제로 변환할 때만 불러옴 (앱 시작 시간 단축)
+    from soffice_daemon import convert_with_daemon
+    started = time.perf_counter()
+    result = convert_with_daemon(input_path, output_folder, slot)
+    if result is not None:
+        record_conversion("daemon", result[0], time.perf_counter() - started, os.path.basename(input_path))
+        return result
+    return convert_to_pdf_linux(input_path, output_folder, profile_dir)
+
+def batch_convert_to_pdf(target_folder, max_workers=None, incremental=False,
+                         include=DEFAULT_INCLUDE, exclude=(), max_depth=None):
     """
-    지정된 폴더 내의 Word, PPT 파일을 모두 찾아 PDF로 변환합니다.
+    지정된 폴더(및 하위 폴더) 내의 Word, PPT 파일을 찾아 PDF로 변환합니다.
+    폴더를 탐색하면서 찾은 파일을 바로 변환 작업자에게 넘기므로, 전체 목록이 완성되기 전에 첫 변환이 시작됩니다.
+    결과는 pdf_output 아래에 원본과 같은 폴더 구조로 저장됩니다.
+    max_workers개의 LibreOffice 프로세스가 각자 별도의 프로필로 동시에 변환하며,
+    변환이 끝나는 순서대로 ("Progress"/"Success"/"Error", 메시지)를 yield 합니다.
+    incremental=True이면 pdf_output의 변환 기록(manifest)과 비교하여 새로 추가되거나 바뀐 파일만 변환하고,
+    원본이 삭제된 PDF는 정리합니다.
+    include/exclude: glob 패턴 목록, max_depth: 하위 폴더 탐색 깊이 (None이면 제한 없음, 0이면 현재 폴더만)
     """
     if not os.path.exists(target_folder):
         yield "Error", f"폴더를 찾을 수 없습니다: {target_folder}"
@@ -42,22 +86,93 @@ def batch_convert_to_pdf(target_folder):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
-    extensions = ('.docx', '.doc', '.pptx', '.ppt')
-    files = [f for f in os.listdir(target_folder) if f.lower().endswith(extensions) and not f.startswith('~$')]
+    def output_path_for(rel_path):
+        return os.path.join(output_folder, os.path.splitext(rel_path)[0] + ".pdf")
 
-    if not files:
-        yield "Info", "변환할 지원 파일(.docx, .pptx 등)이 없습니다."
-        return
+    manifest = load_manifest(output_folder) if incremental else {}
+    max_workers = max(1, max_workers or DEFAULT_CONVERT_WORKERS)
+    yield "Info", f"{max_workers}개 작업자로 변환을 시작합니다. 결과 저장 경로: {output_folder}"
+
+    # 작업자 수만큼 (데몬 slot 번호, LibreOffice 프로필 폴더)를 만들어 두고, 변환할 때마다 빌려 쓰고 반납함
+    slots = queue.Queue()
+    profile_dirs = [tempfile.mkdtemp(prefix="lo_profile_") for _ in range(max_workers)]
+    for slot, profile_dir in enumerate(profile_dirs):
+        slots.put((slot, profile_dir))
+
+    def convert(rel_path):
+        input_path = os.path.join(target_folder, rel_path)
+        output_dir = os.path.dirname(output_path_for(rel_path))
+        os.makedirs(output_dir, exist_ok=True)
+        slot, profile_dir = slots.get()
+        try:
+            success, msg = convert_to_pdf(input_path, output_dir, profile_dir, slot)
+        finally:
+            slots.put((slot, profile_dir))
+        # 증분 모드에서는 변환 기록(해시 포함)을 작업자 스레드에서 미리 계산
+        entry = make_entry(input_path, output_path_for(rel_path)) if success and incremental else None
+        return success, msg, entry
 
-    yield "Info", f"총 {len(files)}개의 파일을 변환합니다. 결과 저장 경로: {output_folder}"
+    scanned = set()
+    counts = {"submitted": 0, "done": 0, "success": 0, "skipped": 0}
+    pending = {}
 
-    for file in files:
-        input_path = os.path.join(target_folder, file)
-        yield "Progress", f"변환 중: {file}..."
+    def collect(block):
+        # 끝난 변환 결과를 yield (block=True이면 하나 이상 끝날 때까지 대기)
+        if not pending:
+            return
+        done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            rel_path = pending.pop(future)
+            success, msg, entry = future.result()
+            counts["done"] += 1
+            if success:
+                counts["success"] += 1
+                if entry:
+                    manifest[rel_path] = entry
+                yield "Success", f"[성공] {rel_path}"
+            else:
+                yield "Error", f"[실패] {rel_path} : {msg}"
+            yield "Progress", f"변환 중... ({counts['done']}/{counts['submitted']})"
 
-        success, msg = convert_to_pdf_linux(input_path, output_folder)
+            # 중간에 중단되더라도 변환된 파일은 다음 실행에서 건너뛸 수 있도록 주기적으로 기록
+            if incremental and counts["done"] % MANIFEST_SAVE_EVERY == 0:
+                save_manifest(output_folder, manifest)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for rel_path in scan_files(target_folder, include, exclude, max_depth, skip_paths=[output_folder]):
+                scanned.add(rel_path)
+                if incremental:
+                    up_to_date, updated_entry = is_up_to_date(manifest.get(rel_path), os.path.join(target_folder, rel_path), output_path_for(rel_path))
+                    if up_to_date:
+                        counts["skipped"] += 1
+                        if updated_entry:
+                            manifest[rel_path] = updated_entry
+                        continue
+
+                pending[executor.submit(convert, rel_path)] = rel_path
+                counts["submitted"] += 1
+                yield "Progress", f"변환 중: {rel_path}..."
+
+                # 대기 중인 작업이 작업자 수의 2배를 넘지 않도록 조절 (메모리 사용량 제한)
+                yield from collect(block=len(pending) >= max_workers * 2)
+
+            while pending:
+                yield from collect(block=True)
+    finally:
+        if incremental:
+            save_manifest(output_folder, manifest)
+        for profile_dir in profile_dirs:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    if incremental:
+        # 원본이 삭제된 PDF 정리
+        removed = remove_stale_outputs(manifest, target_folder)
+        save_manifest(output_folder, manifest)
+        yield "Info", f"증분 변환: 최신 상태라 건너뛴 파일 {counts['skipped']}개, 원본이 삭제되어 정리한 PDF {len(removed)}개"
+
+    if not scanned:
+        yield "Info", "변환할 지원 파일(.docx, .pptx 등)이 없습니다."
+        return
 
-        if success:
-            yield "Success", f"[성공] {file}"
-        else:
-            yield "Error", f"[실패] {file} : {msg}"
+    yield "Info", f"총 {counts['submitted']}개 파일 변환 완료 (성공 {counts['success']}개, 실패 {counts['submitted'] - counts['success']}개)"
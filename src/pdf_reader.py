@@ -0,0 +1,92 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# --- PDF 텍스트 추출 설정 (.env 로 조정 가능) ---
+PDF_PREVIEW_MAX_PAGES = int(os.getenv("PDF_PREVIEW_MAX_PAGES", "20"))       # 미리보기에서 추출할 최대 페이지 수
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or (os.cpu_count() or 1) # 페이지 추출 프로세스 수
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))     # 이 페이지 수 이상일 때만 프로세스 풀 사용
+
+
+def _open_reader(file_path):
+    # PyPDF2는 PDF를 처음 읽을 때 불러옴
+    from PyPDF2 import PdfReader
+    return PdfReader(file_path)
+
+
+def count_pages(file_path):
+    return len(_open_reader(file_path).pages)
+
+
+def iter_pdf_pages(file_path, start=0, stop=None):
+    """
+    PDF 페이지 텍스트를 (페이지 번호, 텍스트) 형태로 한 장씩 yield 합니다.
+    필요한 페이지까지만 읽으므로, 미리보기처럼 앞부분만 쓰는 경우 뒤쪽 페이지는 추출하지 않습니다.
+    """
+    yield from _iter_reader_pages(_open_reader(file_path), start, stop)
+
+
+def _iter_reader_pages(reader, start=0, stop=None):
+    total = len(reader.pages)
+    stop = total if stop is None else min(stop, total)
+    for index in range(start, stop):
+        yield index, reader.pages[index].extract_text() or ""
+
+
+def _extract_page_range(args):
+    """프로세스 풀 작업 단위 : 각 프로세스가 파일을 직접 열어 [start, stop) 페이지 텍스트를 추출합니다."""
+    file_path, start, stop = args
+    return [text for _, text in iter_pdf_pages(file_path, start, stop)]
+
+
+def extract_pdf_pages(file_path, max_pages=None, workers=PDF_EXTRACT_WORKERS):
+    """
+    (페이지별 텍스트 목록, 전체 페이지 수)를 반환합니다. (max_pages가 있으면 앞에서부터 그 수만큼만)
+    추출할 페이지가 PDF_PARALLEL_MIN_PAGES 이상이면 연속된 페이지 구간으로 나누어 여러 프로세스에서 동시에 추출합니다.
+    Streamlit 서버는 여러 스레드(SQLite, HTTP, LLM 작업자)가 돌고 있어 fork한 자식이 물려받은 lock에서 멈출 수 있으므로,
+    작업 프로세스는 spawn으로 새로 시작합니다.
+    """
+    reader = _open_reader(file_path)
+    total = len(reader.pages)
+    stop = total if max_pages is None else min(max_pages, total)
+    if workers <= 1 or stop < PDF_PARALLEL_MIN_PAGES:
+        return [text for _, text in _iter_reader_pages(reader, 0, stop)], total
+
+    workers = min(workers, stop)
+    step = -(-stop // workers) # 올림 나눗셈
+    ranges = [(file_path, start, min(start + step, stop)) for start in range(0, stop, step)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pages = []
+            for texts in executor.map(_extract_page_range, ranges): # map은 구간 순서대로 결과를 돌려줌
+                pages.extend(texts)
+            return pages, total
+    except Exception:
+        # 프로세스를 만들 수 없는 환경 등에서는 순차 추출로 대체
+        return [text for _, text in _iter_reader_pages(reader, 0, stop)], total
+
+
+def read_pdf_text(file_path, max_pages=PDF_PREVIEW_MAX_PAGES):
+    """
+    미리보기용 텍스트를 반환합니다. max_pages=None이면 전체 페이지를 추출합니다.
+    문자열을 반복해서 이어 붙이지 않고 페이지 목록을 한 번에 join 합니다.
+    """
+    pages, total = extract_pdf_pages(file_path, max_pages)
+    text = "\n".join(pages)
+    if len(pages) < total:
+        text += f"\n\n... (전체 {total}쪽 중 처음 {len(pages)}쪽만 표시)"
+    return text
+
+
+def read_pdf_sections(file_path):
+    """
+    PDF를 분석용 섹션 목록({"title", "content"})으로 변환합니다. 페이지 하나가 섹션 하나이며, 빈 페이지는 건너뜁니다.
+    (짧은 페이지들은 chunking.build_chunks에서 하나의 요청으로 묶임)
+    """
+    sections = []
+    pages, _ = extract_pdf_pages(file_path)
+    for index, text in enumerate(pages):
+        content = text.strip()
+        if content:
+            sections.append({"title": f"Page {index + 1}", "content": content})
+    return sections
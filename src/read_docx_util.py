@@ -1,25 +1,69 @@
-import nltk
-from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+import os
+import threading
 
-nltk.download('punkt')
+from docx_xml_reader import iter_docx_elements
+
+# docx 파서 선택 (.env 로 조정 가능)
+# - "unstructured": UnstructuredWordDocumentLoader(hi_res) 사용 (기존 방식)
+# - "fast": word/document.xml을 직접 읽는 경량 파서 (docx_xml_reader)
+DOCX_PARSERS = ("unstructured", "fast")
+DEFAULT_DOCX_PARSER = os.getenv("DOCX_PARSER", "unstructured")
+
+_punkt_lock = threading.Lock()
+_punkt_ready = False
+
+def _ensure_punkt():
+  """
+  unstructured가 쓰는 nltk punkt 데이터가 없을 때만 한 번 내려받습니다.
+  (import 시점에는 네트워크에 접근하지 않음 / Docker 이미지는 빌드 단계에서 미리 설치)
+  """
+  global _punkt_ready
+  with _punkt_lock:
+    if _punkt_ready:
+      return
+    import nltk
+    try:
+      nltk.data.find('tokenizers/punkt')
+    except LookupError:
+      nltk.download('punkt')
+    _punkt_ready = True
+
+
+def _unstructured_elements(file):
+  # unstructured/nltk는 로딩이 느리므로 이 파서를 처음 사용할 때 불러옴
+  _ensure_punkt()
+  from langchain_community.document_loaders import UnstructuredWordDocumentLoader
 
-def read_docx(file):
   loader = UnstructuredWordDocumentLoader(
       file,
       mode='elements', # 요소 단위 분할
       strategy='hi_res' # 표 구조 인식 활성화
   )
-  raw_docs = loader.load()
+  for doc in loader.load():
+    yield {
+        "category": doc.metadata.get("category"),
+        "content": doc.page_content.strip(),
+        "emphasized_text_contents": doc.metadata.get("emphasized_text_contents", []),
+        "emphasized_text_tags": doc.metadata.get("emphasized_text_tags", []),
+        "text_as_html": doc.metadata.get("text_as_html", ""),
+    }
+
+
+def group_sections(elements):
+  """
+  요소 목록(문단/표)을 굵은 제목 기준으로 {"title", "content"} 섹션으로 묶습니다.
+  두 파서가 같은 규칙을 쓰도록 요소 형식을 맞춘 뒤 이 함수 하나로 묶습니다.
+  """
   grouped_sections = []
   current_section_title = "Introduction"
   current_text_buffer = []
 
-  for doc in raw_docs:
-    category = doc.metadata.get("category")
-    content = doc.page_content.strip()
+  for element in elements:
+    category = element.get("category")
+    content = element.get("content", "")
 
-    emphasized_contents = doc.metadata.get("emphasized_text_contents",[])
-    emphasized_tags = doc.metadata.get("emphasized_text_tags", [])
+    emphasized_contents = element.get("emphasized_text_contents") or []
+    emphasized_tags = element.get("emphasized_text_tags") or []
     is_real_title = False
 
     if 'b' in emphasized_tags:
@@ -28,7 +72,7 @@ def read_docx(file):
         is_real_title = True
 
     if category == "Table":
-      html_content = doc.metadata.get("text_as_html","")
+      html_content = element.get("text_as_html", "")
       if not html_content:
         html_content = f"<div>{content}</div>"
       formatted_table = f"\n[Table Start]\n{html_content}\n[Table End]\n"
@@ -53,3 +97,11 @@ def read_docx(file):
             "content": "\n".join(current_text_buffer)
         })
   return grouped_sections
+
+
+def read_docx(file, parser=None):
+  """parser: "unstructured" 또는 "fast" (기본값: DOCX_PARSER 환경 변수)"""
+  parser = parser or DEFAULT_DOCX_PARSER
+  if parser == "fast":
+    return group_sections(iter_docx_elements(file))
+  return group_sections(_unstructured_elements(file))
@@ -0,0 +1,130 @@
+import os
+import sys
+import html
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- 결과 화면 렌더링 설정 (.env 로 조정 가능) ---
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "10"))              # 결과 카드 한 페이지에 보여줄 섹션 수
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "256")) # 만들어 둔 HTML 조각을 보관할 최대 개수
+RENDER_CACHE_MAX_MB = float(os.getenv("RENDER_CACHE_MAX_MB", "128"))         # 보관한 HTML 조각/결과의 메모리 합계 상한
+
+# 개정본 비교 결과 표시 (revision_tracker가 붙이는 revision_status별 배지)
+REVISION_BADGES = {
+    "new": ("🆕 신규", "#dbeafe", "#1e40af"),
+    "carried": ("↩️ 유지", "#f3f4f6", "#374151"),
+}
+
+
+def make_report_key(document_hash, analysis_types, outputs):
+    """
+    (문서 해시, 분석 종류, LLM 응답 목록)으로 보고서 키를 만듭니다.
+    같은 문서라도 응답이 바뀌면(재분석, 재요청 등) 키가 바뀌므로 이전 HTML이 잘못 재사용되지 않습니다.
+    """
+    responses = [response for response, _ in outputs]
+    payload = json.dumps([document_hash, list(analysis_types), responses], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def page_count(item_count, page_size=RESULTS_PAGE_SIZE):
+    return max(1, -(-item_count // page_size))
+
+
+def build_card_html(error):
+    """
+    지적 사항 하나의 카드 HTML. 미리보기에서 위치를 찾은 지적은 해당 하이라이트로 이동하는 링크를 붙입니다.
+    이전 버전과 비교한 결과(revision_status)가 있으면 신규/유지 배지를 붙입니다.
+    """
+    original = html.escape(str(error.get('error_sentence', '')))
+    correction = html.escape(str(error.get('correction', '')))
+    reason = html.escape(str(error.get('reason', '')))
+    anchor = error.get("anchor")
+    link = f"<a href='#{anchor}' style='font-size: 0.85em; margin-left: auto;'>📍 원문 위치</a>" if anchor else ""
+    badge = ""
+    if error.get("revision_status") in REVISION_BADGES:
+        label, background, color = REVISION_BADGES[error["revision_status"]]
+        badge = f"<span style='background-color: {background}; color: {color}; padding: 1px 6px; border-radius: 4px; font-size: 0.8em; margin-right: 8px;'>{label}</span>"
+    # 빈 줄이 들어가면 마크다운이 HTML 블록을 끊으므로 한 줄씩 이어 붙임
+    return "".join([
+        "<div style='background-color: white; border: 1px solid #e5e7eb; border-radius: 8px; padding: 15px; margin-bottom: 10px; box-shadow: 0 1px 3px rgba(0,0,0,0.1);'>",
+        "<div style='display: flex; align-items: baseline; margin-bottom: 8px;'>",
+        badge,
+        f"<span style='background-color: #fee2e2; color: #991b1b; padding: 2px 6px; border-radius: 4px; font-weight: bold; font-size: 0.95em; text-decoration: line-through; margin-right: 8px;'>{original}</span>",
+        "<span style='color: #6b7280; font-size: 0.9em; margin-right: 8px;'>➞</span>",
+        f"<span style='background-color: #dcfce7; color: #166534; padding: 2px 6px; border-radius: 4px; font-weight: bold; font-size: 0.95em;'>{correction}</span>",
+        link,
+        "</div>",
+        f"<div style='font-size: 0.9em; color: #4b5563; background-color: #f9fafb; padding: 8px; border-radius: 6px;'>💡 <b>이유:</b> {reason}</div>",
+        "</div>",
+    ])
+
+
+def build_results_page_html(results_page, open_first=True):
+    """
+    섹션별 결과 카드를 하나의 HTML로 만듭니다. 섹션은 접힌 <details>로 두고(첫 섹션만 펼침),
+    지적 사항마다 Streamlit 요소를 만들지 않으므로 화면을 다시 그릴 때 전송량과 요소 수가 페이지 크기로 제한됩니다.
+    """
+    blocks = []
+    for position, result in enumerate(results_page):
+        errors = result.get("errors", [])
+        open_attr = " open" if open_first and position == 0 else ""
+        blocks.append(
+            f"<details{open_attr} style='margin-bottom: 8px;'>"
+            f"<summary style='cursor: pointer; font-weight: bold; padding: 6px 0;'>📌 {html.escape(str(result['title']))} ({len(errors)}건)</summary>"
+            + "".join(build_card_html(error) for error in errors)
+            + "</details>"
+        )
+    return "".join(blocks)
+
+
+def estimate_size(value):
+    """캐시 항목이 차지하는 메모리(바이트)의 대략적인 값 (문자열/리스트/dict를 따라가며 합산)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class RenderCache:
+    """
+    만들어 둔 HTML 조각(미리보기, 결과 카드 페이지)을 키별로 보관하는 LRU 캐시.
+    Streamlit rerun이나 다른 세션에서 같은 보고서를 다시 그릴 때 HTML을 다시 만들지 않습니다.
+    보고서 항목은 미리보기 HTML 전체와 섹션별 결과를 담아 수 MB가 될 수 있으므로,
+    항목 수 또는 크기 합계(max_bytes)가 상한을 넘으면 가장 오래 사용하지 않은 항목부터 제거합니다.
+    """
+    def __init__(self, max_entries=RENDER_CACHE_MAX_ENTRIES, max_bytes=int(RENDER_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, builder):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = builder()
+        size = estimate_size(value)
+        with self._lock:
+            self._total_bytes += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._entries.move_to_end(key)
+            # 방금 추가한 항목(가장 최근)은 남겨둠
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+        return value
+
+
+# Streamlit은 rerun마다 app.py를 다시 실행하지만, import된 모듈은 유지되므로 캐시를 이 모듈에 둠
+_render_cache = RenderCache()
+
+def get_render_cache():
+    return _render_cache
@@ -0,0 +1,219 @@
+import os
+import time
+import sqlite3
+import contextlib
+import hashlib
+import threading
+
+# --- 캐시 설정 (.env 로 조정 가능) ---
+CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") != "0"
+CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(".cache", "llm_results.sqlite3"))
+CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_DAYS", "30")) * 24 * 60 * 60
+CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_BYTES = int(float(os.getenv("RESULT_CACHE_MAX_MB", "200")) * 1024 * 1024)
+EVICT_EVERY_N_PUTS = 100 # 매 저장마다 정리하지 않고, N번 저장할 때마다 한 번씩 만료/용량 정리
+
+
+def sha256_text(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def make_cache_key(chain_type, template, model_name, text):
+    """
+    (체인 종류, 프롬프트 템플릿 해시, 모델명, 섹션 텍스트 해시)로 캐시 키를 만듭니다.
+    프롬프트나 모델이 바뀌면 키도 바뀌므로 이전 결과가 잘못 재사용되지 않습니다.
+    """
+    parts = [chain_type, sha256_text(template), model_name, sha256_text(text)]
+    return sha256_text("\x1f".join(parts))
+
+
+class ResultCache:
+    """
+    LLM 응답(JSON 문자열)을 SQLite에 저장하는 내용 기반(content-addressed) 캐시.
+    TTL이 지난 항목과, 최대 개수/용량을 넘는 오래된(최근 사용 기준) 항목은 자동으로 정리됩니다.
+    """
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS,
+                 max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    chain_type TEXT,
+                    response TEXT,
+                    size INTEGER,
+                    created_at REAL,
+                    accessed_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+
+    @contextlib.contextmanager
+    def _connection(self):
+        # 스레드마다 별도 연결을 사용 (sqlite3 연결은 스레드 간 공유하지 않음)
+        # sqlite3 연결의 with 문은 commit/rollback만 하고 연결을 닫지 않으므로, 끝나면 직접 닫음
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute("SELECT response, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                with self._lock:
+                    self.hits += 1
+                return row[0]
+            if row:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, chain_type, response):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, chain_type, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, chain_type, response, len(response.encode("utf-8")), now, now),
+            )
+        with self._lock:
+            self._puts += 1
+            should_evict = self._puts % EVICT_EVERY_N_PUTS == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """TTL 만료 항목을 지우고, 개수/용량 상한을 넘으면 가장 오래 사용되지 않은 항목부터 지웁니다."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+            removed = 0
+            freed = 0
+            for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed_at ASC").fetchall():
+                if count - removed <= self.max_entries and total - freed <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                removed += 1
+                freed += size or 0
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM results")
+
+    def stats(self):
+        with self._connection() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+class CachedChain:
+    """
+    get_*_chain이 만든 체인 앞에 위치하여, 같은 (체인/프롬프트/모델/텍스트) 조합은 캐시된 응답을 돌려줍니다.
+    체인과 동일하게 invoke({"text": ...})로 호출하며, 이 인스턴스 단위의 hit/miss도 따로 집계합니다.
+    validate(response)가 있으면 True인 응답만 저장합니다. (형식이 깨진 응답이 캐시되어 계속 재사용되는 것을 막음)
+    """
+    def __init__(self, chain, cache, chain_type, template, model_name, validate=None):
+        self.chain = chain
+        self.cache = cache
+        self.chain_type = chain_type
+        self.template = template
+        self.model_name = model_name
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _should_store(self, response):
+        return isinstance(response, str) and (self.validate is None or self.validate(response))
+
+    def _key(self, inputs):
+        return make_cache_key(self.chain_type, self.template, self.model_name, inputs.get("text", ""))
+
+    def invoke(self, inputs, *args, **kwargs):
+        key = self._key(inputs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached
+
+        response = self.chain.invoke(inputs, *args, **kwargs)
+        with self._lock:
+            self.misses += 1
+        if self._should_store(response):
+            self.cache.put(key, self.chain_type, response)
+        return response
+
+    def stream(self, inputs, *args, **kwargs):
+        """캐시에 있으면 저장된 응답을 한 번에, 없으면 체인의 스트리밍 조각을 그대로 내보낸 뒤 전체 응답을 저장합니다."""
+        key = self._key(inputs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            yield cached
+            return
+
+        pieces = []
+        for piece in self.chain.stream(inputs, *args, **kwargs):
+            pieces.append(piece)
+            yield piece
+        with self._lock:
+            self.misses += 1
+        response = "".join(pieces)
+        if self._should_store(response):
+            self.cache.put(key, self.chain_type, response)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_result_cache():
+    """프로세스 전체에서 공유하는 ResultCache를 반환합니다. (비활성화 시 None)"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def with_result_cache(chain, chain_type, template, model_name, validate=None):
+    """캐시가 활성화되어 있으면 CachedChain으로 감싸고, 아니면 체인을 그대로 반환합니다."""
+    cache = get_result_cache()
+    if cache is None:
+        return chain
+    return CachedChain(chain, cache, chain_type, template, model_name, validate)
@@ -0,0 +1,354 @@
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import contextlib
+import hashlib
+import difflib
+import threading
+
+# --- 개정본 추적 설정 (.env 로 조정 가능) ---
+REVISION_TRACKING = os.getenv("REVISION_TRACKING", "1") != "0"
+REVISION_DB_PATH = os.getenv("REVISION_DB_PATH", os.path.join(".cache", "revisions.sqlite3"))
+REVISION_MATCH_THRESHOLD = float(os.getenv("REVISION_MATCH_THRESHOLD", "0.6")) # 이 유사도 이상이면 이전 버전의 같은 섹션(수정됨)으로 봄
+REVISION_KEEP_PER_LINEAGE = int(os.getenv("REVISION_KEEP_PER_LINEAGE", "20"))  # 문서 계열마다 보관할 개정본 수
+REVISION_STRIP_DATE_SUFFIX = os.getenv("REVISION_STRIP_DATE_SUFFIX", "0") != "0"  # 파일명 끝의 날짜(_20240105)도 버전 표시로 볼지 여부
+
+# 파일명 끝의 버전 표시 : 구분자(_ - 공백 .) 뒤에 오는 경우만 인정 (chapter3/chapter4, report2 같은 이름은 서로 다른 문서로 봄)
+# 예: 보고서_v2, 보고서 ver1.1, 보고서-rev3, 보고서(1), 보고서_최종
+VERSION_SUFFIX_PATTERN = re.compile(
+    r"(?:[\s_\-.]+(?:v|ver|rev|r)\.?\d+(?:\.\d+)*|\s*\(\d+\)|[\s_\-.]+(?:final|최종|수정본|수정|개정))$",
+    re.IGNORECASE,
+)
+# 날짜 접미사 (예: 회의록_20240105) : 날짜가 서로 다른 문서(회차별 회의록 등)를 구분하는 경우가 많으므로 기본으로는 떼지 않음
+DATE_SUFFIX_PATTERN = re.compile(r"[\s_\-.]+\d{4}[\-.]?\d{2}[\-.]?\d{2}$")
+
+
+def lineage_key(file_name):
+    """
+    파일명에서 확장자와 끝의 버전 표시를 떼어 문서 계열 키를 만듭니다.
+    '위원회_보고서_v3.docx'와 '위원회_보고서_최종(1).docx'는 같은 계열('위원회_보고서')이 됩니다.
+    날짜 접미사는 REVISION_STRIP_DATE_SUFFIX=1일 때만 뗍니다. (계열이 맞지 않으면 화면에서 직접 지정)
+    """
+    name = os.path.splitext(os.path.basename(file_name or ""))[0].strip().lower()
+    patterns = [VERSION_SUFFIX_PATTERN] + ([DATE_SUFFIX_PATTERN] if REVISION_STRIP_DATE_SUFFIX else [])
+    while True:
+        stripped = name
+        for pattern in patterns:
+            stripped = pattern.sub("", stripped).strip()
+        if stripped == name or not stripped:
+            return name
+        name = stripped
+
+
+def _normalize(text):
+    return " ".join((text or "").split())
+
+
+def section_fingerprint(section):
+    return hashlib.sha256(f"{_normalize(section.get('title'))}\x1f{_normalize(section.get('content'))}".encode("utf-8")).hexdigest()
+
+
+def finding_key(finding):
+    """같은 지적인지 비교하는 키 (공백 차이는 무시)"""
+    return (_normalize(finding.get("error_sentence")), _normalize(finding.get("correction")))
+
+
+def align_sections(old_sections, new_sections, threshold=REVISION_MATCH_THRESHOLD):
+    """
+    새 버전의 섹션을 이전 버전의 섹션과 짝짓습니다.
+    1) 제목/본문이 같은 섹션(공백 차이 무시)은 unchanged
+    2) 남은 섹션끼리는 제목/본문 유사도(difflib)가 threshold 이상인 쌍을 유사도 순으로 짝지어 changed
+    3) 짝이 없는 새 섹션은 new, 짝이 없는 이전 섹션은 삭제된 것으로 봄
+    반환값: ([{"status", "previous_index", "similarity"}] (새 섹션 순서), 삭제된 이전 섹션 index 목록)
+    """
+    alignment = [{"status": "new", "previous_index": None, "similarity": 0.0} for _ in new_sections]
+    unmatched_old = {}
+    for old_index, section in enumerate(old_sections):
+        unmatched_old.setdefault(section_fingerprint(section), []).append(old_index)
+
+    remaining_new = []
+    for new_index, section in enumerate(new_sections):
+        candidates = unmatched_old.get(section_fingerprint(section))
+        if candidates:
+            alignment[new_index] = {"status": "unchanged", "previous_index": candidates.pop(0), "similarity": 1.0}
+        else:
+            remaining_new.append(new_index)
+    remaining_old = sorted(index for indices in unmatched_old.values() for index in indices)
+
+    # 수정된 섹션 찾기 : 남은 섹션 수가 적으므로(보통 수정된 섹션만 남음) 모든 쌍을 비교해도 부담이 작음
+    pairs = []
+    for new_index in remaining_new:
+        new_title = _normalize(new_sections[new_index].get("title"))
+        new_content = _normalize(new_sections[new_index].get("content"))
+        for old_index in remaining_old:
+            old_title = _normalize(old_sections[old_index].get("title"))
+            matcher = difflib.SequenceMatcher(None, old_title, new_title, autojunk=False)
+            title_similarity = matcher.ratio()
+            matcher = difflib.SequenceMatcher(None, _normalize(old_sections[old_index].get("content")), new_content, autojunk=False)
+            # 상한 값으로 먼저 걸러서, 확실히 다른 섹션은 ratio()를 계산하지 않음
+            if (title_similarity + 2 * matcher.real_quick_ratio()) / 3 < threshold:
+                continue
+            if (title_similarity + 2 * matcher.quick_ratio()) / 3 < threshold:
+                continue
+            similarity = (title_similarity + 2 * matcher.ratio()) / 3
+            if similarity >= threshold:
+                pairs.append((similarity, new_index, old_index))
+
+    used_new, used_old = set(), set()
+    for similarity, new_index, old_index in sorted(pairs, key=lambda pair: (-pair[0], pair[1], pair[2])):
+        if new_index in used_new or old_index in used_old:
+            continue
+        used_new.add(new_index)
+        used_old.add(old_index)
+        alignment[new_index] = {"status": "changed", "previous_index": old_index, "similarity": round(similarity, 3)}
+
+    removed = [old_index for old_index in remaining_old if old_index not in used_old]
+    return alignment, removed
+
+
+class RevisionStore:
+    """
+    문서 계열(lineage)별 개정본(섹션과 섹션별 지적 사항)을 SQLite에 저장합니다.
+    findings는 섹션마다 {분석 종류: 오류 목록}이며, 분석에 실패한 종류는 빠져 있으므로 다음 버전에서 그대로 가져오지 않고 다시 분석합니다.
+    """
+    def __init__(self, path=REVISION_DB_PATH, keep_per_lineage=REVISION_KEEP_PER_LINEAGE):
+        self.path = path
+        self.keep_per_lineage = keep_per_lineage
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS revisions (
+                    id TEXT PRIMARY KEY,
+                    lineage TEXT,
+                    file_name TEXT,
+                    doc_hash TEXT,
+                    analysis_types TEXT,
+                    sections TEXT,
+                    findings TEXT,
+                    created_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_revisions_lineage ON revisions(lineage, created_at)")
+
+    @contextlib.contextmanager
+    def _connection(self):
+        # sqlite3 연결의 with 문은 commit/rollback만 하고 연결을 닫지 않으므로, 끝나면 직접 닫음
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _row_to_revision(self, row):
+        if row is None:
+            return None
+        keys = ["id", "lineage", "file_name", "doc_hash", "analysis_types", "sections", "findings", "created_at"]
+        revision = dict(zip(keys, row))
+        for key in ("analysis_types", "sections", "findings"):
+            revision[key] = json.loads(revision[key])
+        return revision
+
+    def get(self, revision_id):
+        with self._connection() as conn:
+            return self._row_to_revision(conn.execute("SELECT * FROM revisions WHERE id = ?", (revision_id,)).fetchone())
+
+    def latest(self, lineage, analysis_types, exclude_doc_hash=None):
+        """같은 계열에서 요청한 분석 종류를 모두 포함하는 가장 최근 개정본 (같은 내용의 파일은 제외)"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT * FROM revisions WHERE lineage = ? AND doc_hash != ? ORDER BY created_at DESC",
+                (lineage, exclude_doc_hash or ""),
+            ).fetchall()
+        for row in rows:
+            revision = self._row_to_revision(row)
+            if set(analysis_types) <= set(revision["analysis_types"]):
+                return revision
+        return None
+
+    def save(self, lineage, file_name, doc_hash, analysis_types, sections, findings):
+        """같은 계열/문서/분석 종류의 개정본이 이미 있으면 덮어쓰고, 오래된 개정본은 keep_per_lineage개만 남깁니다."""
+        now = time.time()
+        types_json = json.dumps(sorted(analysis_types))
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT id FROM revisions WHERE lineage = ? AND doc_hash = ? AND analysis_types = ?",
+                (lineage, doc_hash, types_json),
+            ).fetchone()
+            revision_id = row[0] if row else uuid.uuid4().hex
+            conn.execute(
+                "INSERT OR REPLACE INTO revisions (id, lineage, file_name, doc_hash, analysis_types, sections, findings, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (revision_id, lineage, file_name, doc_hash, types_json,
+                 json.dumps(sections, ensure_ascii=False), json.dumps(findings, ensure_ascii=False), now),
+            )
+            conn.execute(
+                "DELETE FROM revisions WHERE lineage = ? AND id NOT IN "
+                "(SELECT id FROM revisions WHERE lineage = ? ORDER BY created_at DESC LIMIT ?)",
+                (lineage, lineage, self.keep_per_lineage),
+            )
+        return revision_id
+
+
+class RevisionPlan:
+    """
+    한 번의 분석에 대한 개정본 비교 결과.
+    sections_to_analyse에 있는 (수정되었거나 새로 생긴) 섹션만 LLM에 보내고,
+    나머지 섹션은 이전 버전의 지적 사항을 그대로 가져옵니다. (apply)
+    """
+    def __init__(self, lineage, file_name, doc_hash, analysis_types, sections, previous=None):
+        self.lineage = lineage
+        self.file_name = file_name
+        self.doc_hash = doc_hash
+        self.analysis_types = list(analysis_types)
+        self.previous = previous
+        # 보고서 render cache 키에 쓰임 (같은 개정본이 다시 저장되면 키도 바뀜)
+        self.base_id = f"{previous['id']}@{previous['created_at']}" if previous else None
+        self.removed = []
+        if previous is None:
+            self.alignment = [{"status": "new", "previous_index": None, "similarity": 0.0} for _ in sections]
+        else:
+            self.alignment, self.removed = align_sections(previous["sections"], sections)
+
+        self.carried = {}
+        for index, aligned in enumerate(self.alignment):
+            if aligned["status"] != "unchanged":
+                continue
+            previous_findings = previous["findings"][aligned["previous_index"]]
+            # 이전 버전에서 분석에 실패한 종류가 있으면 가져오지 않고 다시 분석
+            if all(analysis_type in previous_findings for analysis_type in self.analysis_types):
+                self.carried[index] = {analysis_type: previous_findings[analysis_type] for analysis_type in self.analysis_types}
+        self.sections_to_analyse = [index for index in range(len(sections)) if index not in self.carried]
+
+    def to_dict(self):
+        """백그라운드 작업에 함께 저장할 수 있는 형태 (이전 개정본은 id만 저장하고, 가져올 지적 사항은 그대로 저장)"""
+        return {
+            "lineage": self.lineage,
+            "file_name": self.file_name,
+            "doc_hash": self.doc_hash,
+            "analysis_types": self.analysis_types,
+            "base_revision_id": self.previous["id"] if self.previous else None,
+            "base_id": self.base_id,
+            "alignment": self.alignment,
+            "removed": self.removed,
+            "carried": {str(index): findings for index, findings in self.carried.items()},
+            "sections_to_analyse": self.sections_to_analyse,
+        }
+
+    @classmethod
+    def from_dict(cls, data, store=None):
+        """
+        to_dict()로 저장한 비교 결과를 다시 만듭니다. (섹션 비교는 다시 하지 않음)
+        이전 개정본은 store에서 id로 읽으며, 그 사이 삭제되었으면 지적 사항만 채우고 비교 요약은 만들지 않습니다.
+        """
+        plan = cls.__new__(cls)
+        plan.lineage = data["lineage"]
+        plan.file_name = data["file_name"]
+        plan.doc_hash = data["doc_hash"]
+        plan.analysis_types = list(data["analysis_types"])
+        plan.base_id = data["base_id"]
+        plan.alignment = data["alignment"]
+        plan.removed = data["removed"]
+        # JSON에서는 dict 키가 문자열이 되므로 섹션 index로 되돌림
+        plan.carried = {int(index): findings for index, findings in data["carried"].items()}
+        plan.sections_to_analyse = data["sections_to_analyse"]
+        plan.previous = None
+        if store is not None and data["base_revision_id"]:
+            plan.previous = store.get(data["base_revision_id"])
+        return plan
+
+    def _previous_findings(self, previous_index, analysis_type):
+        return self.previous["findings"][previous_index].get(analysis_type, [])
+
+    def apply(self, section_errors, section_failures):
+        """
+        분석한 섹션의 결과에 가져온 지적 사항을 합치고, 지적 사항마다 revision_status(new/carried)를 붙입니다.
+        반환값: (합쳐진 섹션별 {분석 종류: 오류 목록}, 요약 dict 또는 None(이전 버전 없음))
+        요약의 resolved는 이전 버전에는 있었지만 새 버전에서 사라진 지적 사항입니다. (섹션이 삭제된 경우 포함)
+        """
+        merged = []
+        for index, errors in enumerate(section_errors):
+            if index in self.carried:
+                errors = {analysis_type: [dict(finding) for finding in findings] for analysis_type, findings in self.carried[index].items()}
+            merged.append(errors)
+        if self.previous is None:
+            return merged, None
+
+        summary = {
+            "previous_file": self.previous["file_name"],
+            "previous_at": self.previous["created_at"],
+            "sections": len(section_errors),
+            "reanalysed": len(self.sections_to_analyse),
+            "carried_sections": len(self.carried),
+            "new": 0, "carried": 0, "resolved": [],
+        }
+        for index, errors in enumerate(merged):
+            aligned = self.alignment[index]
+            for analysis_type, findings in errors.items():
+                previous = []
+                if aligned["previous_index"] is not None:
+                    previous = self._previous_findings(aligned["previous_index"], analysis_type)
+                previous_keys = {finding_key(finding) for finding in previous}
+                current_keys = set()
+                for finding in findings:
+                    key = finding_key(finding)
+                    current_keys.add(key)
+                    finding["revision_status"] = "carried" if key in previous_keys else "new"
+                    summary[finding["revision_status"]] += 1
+                # 이번에 분석에 실패한 섹션은 지적이 사라진 것인지 알 수 없으므로 해결로 표시하지 않음
+                if analysis_type in section_failures[index]:
+                    continue
+                for finding in previous:
+                    if finding_key(finding) not in current_keys:
+                        summary["resolved"].append({**finding, "analysis_type": analysis_type, "title": self._title(index)})
+        for previous_index in self.removed:
+            title = self.previous["sections"][previous_index].get("title", "제목 없음")
+            for analysis_type in self.analysis_types:
+                for finding in self._previous_findings(previous_index, analysis_type):
+                    summary["resolved"].append({**finding, "analysis_type": analysis_type, "title": f"{title} (삭제된 섹션)"})
+        return merged, summary
+
+    def _title(self, index):
+        aligned = self.alignment[index]
+        return self.previous["sections"][aligned["previous_index"]].get("title", "제목 없음")
+
+    def save(self, store, sections, section_errors, section_failures):
+        """이번 결과를 새 개정본으로 저장 (화면 표시용 anchor/revision_status는 빼고, 실패한 분석 종류는 저장하지 않음)"""
+        findings = [
+            {
+                analysis_type: [
+                    {key: value for key, value in finding.items() if key not in ("anchor", "revision_status")}
+                    for finding in errors.get(analysis_type, [])
+                ]
+                for analysis_type in self.analysis_types if analysis_type not in failures
+            }
+            for errors, failures in zip(section_errors, section_failures)
+        ]
+        return store.save(self.lineage, self.file_name, self.doc_hash, self.analysis_types, sections, findings)
+
+
+def plan_revision(store, file_name, doc_hash, sections, analysis_types, lineage=None):
+    """같은 계열의 가장 최근 개정본과 섹션을 비교하여 RevisionPlan을 만듭니다. (lineage를 지정하지 않으면 파일명으로 정함)"""
+    lineage = lineage or lineage_key(file_name)
+    previous = store.latest(lineage, analysis_types, exclude_doc_hash=doc_hash)
+    return RevisionPlan(lineage, file_name, doc_hash, analysis_types, sections, previous)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_revision_store():
+    """프로세스 전체에서 공유하는 RevisionStore를 반환합니다. (비활성화 시 None)"""
+    global _store
+    if not REVISION_TRACKING:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = RevisionStore()
+        return _store
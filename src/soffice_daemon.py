@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import uuid
+import queue
+import atexit
+import shutil
+import signal
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+# --- 데몬 설정 (.env 로 조정 가능) ---
+SOFFICE_DAEMON_ENABLED = os.getenv("SOFFICE_DAEMON", "1") != "0"
+# UNO(python3-uno)를 import할 수 있는 파이썬. 비워 두면 현재 파이썬 → /usr/bin/python3 → LibreOffice 내장 파이썬 순으로 찾음
+SOFFICE_UNO_PYTHON = os.getenv("SOFFICE_UNO_PYTHON", "")
+SOFFICE_START_TIMEOUT = 40   # 작업자 기동(soffice 기동 + UNO 연결)을 기다리는 시간(초)
+HEALTH_CHECK_TIMEOUT = 5     # 상태 확인 호출이 이 시간 안에 응답하지 않으면 멈춘 것으로 간주
+CONVERT_TIMEOUT = 60         # 파일 하나당 변환 타임아웃 (subprocess 방식과 동일)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "soffice_uno_worker.py")
+UNO_PYTHON_CANDIDATES = [sys.executable, "/usr/bin/python3", "/usr/lib/libreoffice/program/python", "/opt/libreoffice/program/python"]
+
+
+def _soffice_binary():
+    return shutil.which('soffice') or shutil.which('libreoffice')
+
+
+_uno_python = None
+_uno_python_checked = False
+_uno_python_lock = threading.Lock()
+
+def find_uno_python():
+    """
+    UNO를 import할 수 있는 파이썬 실행 파일을 찾습니다. (한 번만 확인하고 결과를 보관)
+    apt의 python3-uno는 시스템 파이썬용이므로, 앱의 파이썬에서 import되지 않아도 /usr/bin/python3로 작업자를 실행할 수 있습니다.
+    """
+    global _uno_python, _uno_python_checked
+    with _uno_python_lock:
+        if not _uno_python_checked:
+            _uno_python_checked = True
+            candidates = [SOFFICE_UNO_PYTHON] if SOFFICE_UNO_PYTHON else UNO_PYTHON_CANDIDATES
+            for candidate in candidates:
+                if not candidate or not os.path.exists(candidate):
+                    continue
+                try:
+                    result = subprocess.run([candidate, "-c", "import uno"], stdout=subprocess.DEVNULL,
+                                            stderr=subprocess.DEVNULL, timeout=30)
+                except (OSError, subprocess.TimeoutExpired):
+                    continue
+                if result.returncode == 0:
+                    _uno_python = candidate
+                    break
+        return _uno_python
+
+
+def is_daemon_available():
+    return SOFFICE_DAEMON_ENABLED and _soffice_binary() is not None and find_uno_python() is not None
+
+
+class SofficeDaemon:
+    """
+    상주 headless soffice 프로세스 하나를 관리합니다.
+    UNO 호출은 soffice_uno_worker.py(UNO를 import할 수 있는 파이썬)가 하고, 이 클래스는 표준 입출력으로 요청/응답을 주고받습니다.
+    soffice는 작업자의 자식이며, 이 프로세스에서만 쓰는 이름의 UNO 파이프로 접속하므로
+    다른 앱 프로세스나 이전 실행에서 남은 soffice에 잘못 연결되지 않습니다. (고정 포트를 쓰지 않음)
+    응답이 없거나 프로세스가 죽으면 작업자/soffice를 프로세스 그룹째 종료하고 다음 요청 시 다시 시작합니다.
+    """
+    def __init__(self, slot):
+        self.slot = slot
+        self.profile_dir = None
+        self.process = None
+        self._replies = None
+        self._lock = threading.Lock() # 한 데몬에는 한 번에 하나의 변환만 요청
+
+    def start(self):
+        if self.profile_dir is None:
+            self.profile_dir = tempfile.mkdtemp(prefix=f"soffice_daemon_{self.slot}_")
+        pipe_name = f"committee_soffice_{os.getpid()}_{self.slot}_{uuid.uuid4().hex[:8]}"
+        cmd = [find_uno_python(), WORKER_SCRIPT, "--soffice", _soffice_binary(),
+               "--pipe-name", pipe_name, "--profile", self.profile_dir]
+        # 새 세션으로 띄워서, 멈췄을 때 작업자와 soffice를 프로세스 그룹째 종료할 수 있게 함
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        text=True, encoding="utf-8", start_new_session=True)
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, args=(self.process, self._replies), daemon=True).start()
+
+        reply = self._wait_reply(SOFFICE_START_TIMEOUT)
+        if not reply or not reply.get("ready"):
+            self.stop()
+            raise RuntimeError(f"soffice 데몬을 시작하지 못했습니다. (slot {self.slot})")
+
+    @staticmethod
+    def _read_replies(process, replies):
+        for line in process.stdout:
+            try:
+                replies.put(json.loads(line))
+            except ValueError:
+                continue
+        replies.put(None) # 작업자 종료
+
+    def _wait_reply(self, timeout):
+        """응답 한 줄을 기다림. 시간 초과면 TimeoutError, 작업자가 끝났으면 None"""
+        try:
+            return self._replies.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError
+
+    def _request(self, request, timeout):
+        self.process.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+        self.process.stdin.flush()
+        reply = self._wait_reply(timeout)
+        if reply is None:
+            raise RuntimeError("soffice 작업자가 종료되었습니다.")
+        return reply
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close() # 작업자가 soffice를 정상 종료하도록 먼저 입력을 닫음
+            self.process.wait(timeout=HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            pass
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL) # 남아 있는 soffice까지 함께 종료
+        except (OSError, AttributeError):
+            pass
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            pass
+        self.process = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def is_healthy(self):
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            return bool(self._request({"cmd": "ping"}, HEALTH_CHECK_TIMEOUT).get("ok"))
+        except Exception:
+            return False
+
+    def convert(self, input_path, output_folder, timeout=CONVERT_TIMEOUT):
+        """
+        (성공 여부, 메시지)를 반환합니다. 변환이 timeout 안에 끝나지 않으면 데몬을 재시작하고 "Timeout"을 반환합니다.
+        """
+        with self._lock:
+            if not self.is_healthy():
+                self.restart()
+            request = {"cmd": "convert", "input": str(Path(input_path).absolute()), "output_folder": str(Path(output_folder).absolute())}
+            try:
+                reply = self._request(request, timeout)
+                return bool(reply.get("ok")), reply.get("message", "")
+            except TimeoutError:
+                self.restart()
+                return False, "Timeout"
+            except Exception as e:
+                self.stop()
+                return False, str(e)
+
+
+_daemons = {}
+_daemons_lock = threading.Lock()
+
+def get_daemon(slot=0):
+    """
+    작업자(slot)별 데몬을 반환합니다. 모듈 단위로 보관하므로 여러 Streamlit 세션과 여러 번의 일괄 변환에서 재사용됩니다.
+    """
+    with _daemons_lock:
+        if slot not in _daemons:
+            _daemons[slot] = SofficeDaemon(slot)
+        return _daemons[slot]
+
+
+def convert_with_daemon(input_path, output_folder, slot=0, timeout=CONVERT_TIMEOUT):
+    """
+    데몬으로 변환을 시도합니다. 데몬을 사용할 수 없거나 기동에 실패하면 None을 반환하여
+    호출한 쪽이 subprocess 방식으로 대신 변환하도록 합니다.
+    """
+    if not is_daemon_available():
+        return None
+    try:
+        return get_daemon(slot).convert(input_path, output_folder, timeout)
+    except Exception:
+        return None
+
+
+def shutdown_daemons():
+    with _daemons_lock:
+        for daemon in _daemons.values():
+            daemon.stop()
+            if daemon.profile_dir:
+                shutil.rmtree(daemon.profile_dir, ignore_errors=True)
+        _daemons.clear()
+
+atexit.register(shutdown_daemons)
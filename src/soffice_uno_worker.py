@@ -0,0 +1,126 @@
+"""
+상주 soffice 데몬의 UNO 클라이언트 (soffice_daemon.py가 UNO를 import할 수 있는 파이썬으로 실행함)
+
+앱의 파이썬(예: Docker 이미지의 /usr/local/bin/python3.9)에서는 apt의 python3-uno를 import할 수 없으므로,
+UNO 호출은 이 스크립트를 시스템 파이썬(/usr/bin/python3)으로 띄워서 처리합니다.
+
+- 시작하면 headless soffice를 자식 프로세스로 띄우고, 이 프로세스만 아는 이름의 UNO 파이프로 접속한 뒤 {"ready": true}를 출력
+- 이후 표준 입력으로 한 줄에 요청 하나씩 받아 한 줄로 응답
+    {"cmd": "convert", "input": 경로, "output_folder": 폴더}  -> {"ok": bool, "message": str}
+    {"cmd": "ping"}                                            -> {"ok": true}
+- 표준 입력이 닫히면 soffice를 종료하고 끝냄 (시간 초과 시에는 soffice_daemon이 프로세스 그룹 전체를 종료)
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+import uno
+from com.sun.star.beans import PropertyValue
+
+SOFFICE_START_TIMEOUT = 30 # soffice 기동 후 UNO 연결이 될 때까지 기다리는 시간(초)
+
+PDF_EXPORT_FILTERS = {
+    '.docx': 'writer_pdf_Export',
+    '.doc': 'writer_pdf_Export',
+    '.pptx': 'impress_pdf_Export',
+    '.ppt': 'impress_pdf_Export',
+}
+
+
+def _property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def _reply(data):
+    sys.stdout.write(json.dumps(data, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def start_soffice(soffice, pipe_name, profile_dir):
+    connection = f"pipe,name={pipe_name};urp;StarOffice.ComponentContext"
+    cmd = [
+        soffice,
+        f'-env:UserInstallation={Path(profile_dir).as_uri()}',
+        '--headless', '--invisible', '--nologo', '--norestore', '--nodefault',
+        f'--accept={connection}',
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local_context)
+    deadline = time.monotonic() + SOFFICE_START_TIMEOUT
+    while True:
+        try:
+            context = resolver.resolve(f"uno:{connection}")
+            return process, context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        except Exception:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("soffice를 시작하지 못했습니다.")
+            time.sleep(0.5)
+
+
+def convert(desktop, input_path, output_folder):
+    input_file = Path(input_path).absolute()
+    filter_name = PDF_EXPORT_FILTERS.get(input_file.suffix.lower(), 'writer_pdf_Export')
+    document = desktop.loadComponentFromURL(
+        input_file.as_uri(), "_blank", 0,
+        (_property("Hidden", True), _property("ReadOnly", True)),
+    )
+    if document is None:
+        raise RuntimeError("문서를 열 수 없습니다.")
+    try:
+        output_url = Path(output_folder, input_file.stem + ".pdf").absolute().as_uri()
+        document.storeToURL(output_url, (_property("FilterName", filter_name),))
+    finally:
+        document.close(True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="soffice UNO 변환 작업자")
+    parser.add_argument("--soffice", required=True)
+    parser.add_argument("--pipe-name", required=True)
+    parser.add_argument("--profile", required=True)
+    args = parser.parse_args(argv)
+
+    try:
+        process, desktop = start_soffice(args.soffice, args.pipe_name, args.profile)
+    except Exception as e:
+        _reply({"ready": False, "message": str(e)})
+        return 1
+    _reply({"ready": True})
+
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if request.get("cmd") == "ping":
+                desktop.getFrames()
+                _reply({"ok": True})
+                continue
+            try:
+                convert(desktop, request["input"], request["output_folder"])
+                _reply({"ok": True, "message": "Success"})
+            except Exception as e:
+                if process.poll() is not None:
+                    raise
+                _reply({"ok": False, "message": str(e)})
+    finally:
+        try:
+            desktop.terminate()
+        except Exception:
+            pass
+        if process.poll() is None:
+            process.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
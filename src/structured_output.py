@@ -0,0 +1,162 @@
+import os
+import re
+import json
+
+# --- 구조화 응답 설정 (.env 로 조정 가능) ---
+STRUCTURED_MAX_REASKS = int(os.getenv("STRUCTURED_MAX_REASKS", "1")) # JSON으로 해석할 수 없는 응답을 다시 요청하는 횟수
+
+FENCE_PATTERN = re.compile(r"```(?:json)?", re.IGNORECASE)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([\]}])")
+
+
+class IncrementalJsonArrayParser:
+    """
+    스트리밍으로 도착하는 LLM 응답(JSON 배열)을 조금씩 받아, 완성된 객체({...})를 도착하는 즉시 꺼냅니다.
+    ```json 코드 펜스나 배열 앞뒤의 설명 문장은 무시합니다.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0      # 다음에 검사할 buffer 위치
+        self.in_array = False
+        self.depth = 0         # 배열 안에서의 {} 중첩 깊이
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+
+    def feed(self, text):
+        """새로 도착한 텍스트를 추가하고, 이번에 완성된 객체 목록을 반환합니다."""
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+
+        for i in range(self.position, len(buffer)):
+            ch = buffer[i]
+            if not self.in_array:
+                if ch == "[":
+                    self.in_array = True
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+
+            if ch == '"':
+                if self.depth > 0:
+                    self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.object_start = i
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        obj = json.loads(buffer[self.object_start:i + 1])
+                        if isinstance(obj, dict):
+                            completed.append(obj)
+                    except ValueError:
+                        pass
+                    self.object_start = None
+
+        self.position = len(buffer)
+        return completed
+
+
+def _as_findings(data):
+    """
+    json.loads 결과에서 지적 사항 목록을 꺼냅니다.
+    ({"errors": [...]}처럼 한 번 감싼 형태와, 배열 없이 지적 사항 객체 하나만 보낸 형태도 허용)
+    """
+    if isinstance(data, dict) and "error_sentence" in data:
+        return [data]
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        if len(lists) != 1:
+            return None
+        data = lists[0]
+    if not isinstance(data, list):
+        return None
+    return [item for item in data if isinstance(item, dict)]
+
+
+def parse_structured_response(text):
+    """
+    LLM 응답을 지적 사항 목록으로 바꾸고 (목록, 상태)를 반환합니다.
+    상태: "ok" (그대로 해석됨) / "repaired" (코드 펜스 밖 설명, 끝의 쉼표, 잘린 배열 등을 고쳐서 해석) / "failed" (해석 불가)
+    """
+    if not isinstance(text, str):
+        return [], "failed"
+    clean = FENCE_PATTERN.sub("", text).strip()
+    try:
+        findings = _as_findings(json.loads(clean))
+        if findings is not None:
+            return findings, "ok"
+    except ValueError:
+        pass
+
+    # 1) 배열 앞뒤의 설명 문장 제거  2) 끝에 남은 쉼표 제거
+    start, end = clean.find("["), clean.rfind("]")
+    if start != -1 and end > start:
+        candidate = clean[start:end + 1]
+        for attempt in (candidate, TRAILING_COMMA_PATTERN.sub(r"\1", candidate)):
+            try:
+                findings = _as_findings(json.loads(attempt))
+                if findings is not None:
+                    return findings, "repaired"
+            except ValueError:
+                pass
+
+    # 3) 잘리거나 중간이 깨진 배열 : 완성된 객체만 복구
+    if start != -1:
+        findings = IncrementalJsonArrayParser().feed(clean)
+        if findings:
+            return findings, "repaired"
+
+    # 4) 배열 없이 객체 하나만 설명 문장과 함께 보낸 경우
+    start, end = clean.find("{"), clean.rfind("}")
+    if start != -1 and end > start:
+        candidate = clean[start:end + 1]
+        for attempt in (candidate, TRAILING_COMMA_PATTERN.sub(r"\1", candidate)):
+            try:
+                findings = _as_findings(json.loads(attempt))
+                if findings is not None:
+                    return findings, "repaired"
+            except ValueError:
+                pass
+    return [], "failed"
+
+
+def reask_failed(tasks, outputs, reask_chain_for, run_tasks, max_reasks=STRUCTURED_MAX_REASKS):
+    """
+    JSON으로 해석할 수 없는 응답의 작업만 다시 요청합니다. (문서 전체를 다시 실행하지 않음)
+    tasks/outputs: run_chain_tasks의 입력/출력, reask_chain_for(작업 번호): 재요청에 사용할 체인,
+    run_tasks(tasks): 작업 목록을 실행하여 [(response, error), ...]를 반환하는 함수
+    반환값: (고쳐진 outputs, {"responses", "ok", "repaired", "failed", "reasked", "recovered"} 집계)
+    """
+    outputs = list(outputs)
+    reasked = set()
+    recovered = 0
+    for _ in range(max(0, max_reasks)):
+        failed = [index for index, (response, error) in enumerate(outputs)
+                  if error is None and parse_structured_response(response)[1] == "failed"]
+        if not failed:
+            break
+        retried = run_tasks([(reask_chain_for(index), tasks[index][1]) for index in failed])
+        for index, result in zip(failed, retried):
+            reasked.add(index)
+            if result[1] is None and parse_structured_response(result[0])[1] != "failed":
+                outputs[index] = result
+                recovered += 1
+
+    stats = {"responses": 0, "ok": 0, "repaired": 0, "failed": 0, "reasked": len(reasked), "recovered": recovered}
+    for response, error in outputs:
+        if error is not None:
+            continue
+        stats["responses"] += 1
+        stats[parse_structured_response(response)[1]] += 1
+    return outputs, stats
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# src/의 모듈은 패키지가 아니라 이름으로 바로 import하므로 (app.py와 같은 방식) 경로에 추가
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
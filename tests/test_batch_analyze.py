@@ -0,0 +1,49 @@
+import os
+import json
+import shutil
+
+import batch_analyze
+import read_docx_util
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(batch_analyze.__file__)), "sample_data", "korean-ko.docx")
+
+
+class FlakyChain:
+    """처음 실행에서는 모든 요청이 실패하고 (할당량 초과 등), 그 뒤에는 빈 결과를 돌려주는 가짜 체인"""
+    def __init__(self, outage):
+        self.outage = outage
+        self.calls = 0
+
+    def invoke(self, inputs, *args, **kwargs):
+        self.calls += 1
+        if self.outage["on"]:
+            raise ValueError("quota outage")
+        return "[]"
+
+
+def test_partially_failed_document_is_retried(tmp_path, monkeypatch):
+    input_folder = tmp_path / "docs"
+    output_folder = tmp_path / "reports"
+    input_folder.mkdir()
+    shutil.copy(SAMPLE, input_folder / "doc.docx")
+
+    outage = {"on": True}
+    chain = FlakyChain(outage)
+    # unstructured는 nltk 데이터를 내려받아야 하므로 빠른 파서로 읽음
+    monkeypatch.setattr(read_docx_util, "DEFAULT_DOCX_PARSER", "fast")
+    monkeypatch.setattr(batch_analyze, "get_chain", lambda analysis_type, api_key, reask=False: chain)
+
+    summary = batch_analyze.run_batch(str(input_folder), str(output_folder), "key", ["proofreading"], workers=1)
+    assert [item["file"] for item in summary["partial"]] == ["doc.docx"]
+    assert summary["analyzed"] == [] and summary["totals"]["partial"] == 1
+    with open(output_folder / batch_analyze.CHECKPOINT_NAME, encoding="utf-8") as f:
+        assert json.load(f)["doc.docx"]["status"] == "partial"
+
+    outage["on"] = False
+    calls_before = chain.calls
+    summary = batch_analyze.run_batch(str(input_folder), str(output_folder), "key", ["proofreading"], workers=1)
+    assert chain.calls > calls_before
+    assert summary["skipped"] == [] and [item["file"] for item in summary["analyzed"]] == ["doc.docx"]
+
+    summary = batch_analyze.run_batch(str(input_folder), str(output_folder), "key", ["proofreading"], workers=1)
+    assert summary["skipped"] == ["doc.docx"]
@@ -0,0 +1,69 @@
+"""
+docx 파서 비교 ("unstructured" vs "fast") : src/sample_data/*.docx
+
+섹션 수와 제목은 그대로 비교하고, 본문은 표 HTML 태그와 공백 차이를 없앤 뒤 비교합니다.
+(두 파서의 <table> 마크업 형식은 조금 다를 수 있으므로 셀 텍스트 기준으로 봅니다)
+unstructured(및 langchain_community, 문장 분리 모델)를 쓸 수 없는 환경에서는 건너뜁니다.
+"""
+import os
+import re
+import glob
+import difflib
+
+import pytest
+
+from read_docx_util import read_docx
+
+SAMPLE_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "sample_data")
+SAMPLE_FILES = sorted(glob.glob(os.path.join(SAMPLE_DATA_DIR, "*.docx")))
+MIN_CONTENT_RATIO = 0.98 # 본문 유사도가 이 값 미만이면 불일치로 판단
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+SPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_content(content):
+    return SPACE_PATTERN.sub(" ", TAG_PATTERN.sub(" ", content)).strip()
+
+
+def compare_sections(expected, actual):
+    """섹션 목록 두 개를 비교하여 차이점 메시지 목록을 반환합니다. (빈 목록이면 일치)"""
+    problems = []
+    if len(expected) != len(actual):
+        problems.append(f"섹션 수 다름: {len(expected)} != {len(actual)}")
+
+    for index, (left, right) in enumerate(zip(expected, actual)):
+        if left["title"] != right["title"]:
+            problems.append(f"[{index}] 제목 다름: {left['title']!r} != {right['title']!r}")
+        ratio = difflib.SequenceMatcher(
+            None, normalize_content(left["content"]), normalize_content(right["content"]), autojunk=False
+        ).ratio()
+        if ratio < MIN_CONTENT_RATIO:
+            problems.append(f"[{index}] 본문 유사도 {ratio:.3f} ({left['title']!r})")
+    return problems
+
+
+@pytest.fixture(scope="module")
+def unstructured_ready():
+    pytest.importorskip("unstructured")
+    pytest.importorskip("langchain_community")
+    # unstructured는 요소 분류에 문장 분리 모델을 쓰며, 처음 사용할 때 내려받음 (오프라인 환경에서는 사용할 수 없음)
+    from unstructured.nlp.tokenize import sent_tokenize
+    try:
+        sent_tokenize("First sentence. Second sentence.")
+    except Exception as e:
+        pytest.skip(f"unstructured 문장 분리 모델을 불러올 수 없음: {e}")
+
+
+@pytest.mark.parametrize("file_path", SAMPLE_FILES, ids=os.path.basename)
+def test_fast_parser_reads_sample(file_path):
+    sections = read_docx(file_path, parser="fast")
+    assert sections
+    assert any(section["content"].strip() for section in sections)
+
+
+@pytest.mark.parametrize("file_path", SAMPLE_FILES, ids=os.path.basename)
+def test_fast_parser_matches_unstructured(file_path, unstructured_ready):
+    expected = read_docx(file_path, parser="unstructured")
+    actual = read_docx(file_path, parser="fast")
+    assert compare_sections(expected, actual) == []
@@ -0,0 +1,33 @@
+import gc
+import os
+
+from parse_cache import ParseCache
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_evicted_document_stays_readable_while_held():
+    cache = ParseCache(max_entries=1)
+    held = cache.get(b"first", ".docx")
+    path = held.file_path
+    cache.get(b"second", ".docx")
+
+    assert cache.get(b"first", ".docx") is not held # 캐시에서는 제거됨
+    assert os.path.exists(path)
+    assert held.get_raw_text(read) == b"first"
+
+    del held
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_clear_keeps_files_of_documents_in_use():
+    cache = ParseCache()
+    held = cache.get(b"data", ".pdf")
+    cache.clear()
+    assert held.get_value("bytes", read) == b"data"
+    held.cleanup()
+    assert not os.path.exists(held.file_path)
@@ -0,0 +1,95 @@
+import pytest
+
+import revision_tracker
+from revision_tracker import lineage_key, align_sections, RevisionStore, RevisionPlan, plan_revision
+
+
+@pytest.mark.parametrize("first, second", [
+    ("위원회_보고서_v3.docx", "위원회_보고서_최종(1).docx"),
+    ("report-rev2.docx", "Report v3.1.docx"),
+    ("예산안.docx", "예산안_수정본.docx"),
+    ("minutes_final.docx", "minutes (2).docx"),
+])
+def test_versions_of_one_document_share_a_lineage(first, second):
+    assert lineage_key(first) == lineage_key(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("chapter3.docx", "chapter4.docx"),
+    ("minutes_20240105.docx", "minutes_20240212.docx"),
+    ("report2.docx", "report3.docx"),
+    ("annex_a.docx", "annex_b.docx"),
+])
+def test_different_documents_keep_separate_lineages(first, second):
+    assert lineage_key(first) != lineage_key(second)
+
+
+def test_version_token_needs_a_separator():
+    assert lineage_key("chapter3.docx") == "chapter3"
+    assert lineage_key("river.docx") == "river"
+    assert lineage_key("budget_v2.docx") == "budget"
+
+
+def test_date_suffix_is_stripped_only_when_enabled(monkeypatch):
+    assert lineage_key("minutes_20240105.docx") == "minutes_20240105"
+    monkeypatch.setattr(revision_tracker, "REVISION_STRIP_DATE_SUFFIX", True)
+    assert lineage_key("minutes_20240105.docx") == lineage_key("minutes-2024-02-12.docx") == "minutes"
+
+
+def _sections(*contents):
+    return [{"title": f"{index}. 제목", "content": content} for index, content in enumerate(contents)]
+
+
+def test_align_sections_marks_unchanged_changed_new_and_removed():
+    old = _sections("첫 번째 섹션 본문입니다.", "두 번째 섹션은 조금 바뀔 예정입니다.", "삭제될 섹션입니다. 전혀 다른 내용.")
+    new = [old[0], {"title": old[1]["title"], "content": "두 번째 섹션은 조금 바뀐 내용입니다."},
+           {"title": "새 제목", "content": "완전히 새로 추가된 부록"}]
+    alignment, removed = align_sections(old, new)
+    assert [aligned["status"] for aligned in alignment] == ["unchanged", "changed", "new"]
+    assert alignment[1]["previous_index"] == 1
+    assert removed == [2]
+
+
+def test_plan_carries_unchanged_findings_and_labels_changes(tmp_path):
+    store = RevisionStore(path=str(tmp_path / "revisions.sqlite3"))
+    old = _sections("변하지 않는 섹션입니다.", "수정될 섹션입니다 오타가 있읍니다.")
+    kept = {"error_sentence": "변하지 않는", "correction": "변하지 않은", "reason": "r"}
+    fixed = {"error_sentence": "있읍니다", "correction": "있습니다", "reason": "r"}
+    first = plan_revision(store, "doc_v1.docx", "h1", old, ["proofreading"])
+    merged, summary = first.apply([{"proofreading": [kept]}, {"proofreading": [fixed]}], [{}, {}])
+    assert summary is None
+    first.save(store, old, merged, [{}, {}])
+
+    new = [old[0], {"title": old[1]["title"], "content": "수정된 섹션입니다 오타가 없습니다."}]
+    second = plan_revision(store, "doc_v2.docx", "h2", new, ["proofreading"])
+    assert second.sections_to_analyse == [1]
+    added = {"error_sentence": "없습니다", "correction": "없읍니다", "reason": "r"}
+    merged, summary = second.apply([{"proofreading": []}, {"proofreading": [added]}], [{}, {}])
+    assert merged[0]["proofreading"][0]["revision_status"] == "carried"
+    assert merged[1]["proofreading"][0]["revision_status"] == "new"
+    assert [finding["error_sentence"] for finding in summary["resolved"]] == ["있읍니다"]
+    assert (summary["new"], summary["carried"], summary["reanalysed"]) == (1, 1, 1)
+
+
+def test_plan_round_trips_through_a_background_job(tmp_path):
+    from job_queue import JobStore
+
+    store = RevisionStore(path=str(tmp_path / "revisions.sqlite3"))
+    old = _sections("변하지 않는 섹션입니다.", "수정될 섹션입니다 오타가 있읍니다.")
+    kept = {"error_sentence": "변하지 않는", "correction": "변하지 않은", "reason": "r"}
+    first = plan_revision(store, "doc_v1.docx", "h1", old, ["proofreading"])
+    first.save(store, old, [{"proofreading": [kept]}, {"proofreading": []}], [{}, {}])
+
+    new = [old[0], {"title": old[1]["title"], "content": "수정된 섹션입니다 오타가 없습니다."}]
+    plan = plan_revision(store, "doc_v2.docx", "h2", new, ["proofreading"])
+    jobs = JobStore(path=str(tmp_path / "jobs.sqlite3"))
+    job_id = jobs.create_job("h2", ["proofreading"], new, [{"text": "x"}], plan.to_dict())
+    assert jobs.latest_job("h2", ["proofreading"], chunks=[{"text": "x"}], revision=plan.to_dict())["id"] == job_id
+    assert jobs.latest_job("h2", ["proofreading"], chunks=[{"text": "x"}], revision=None) is None
+
+    restored = RevisionPlan.from_dict(jobs.get_job(job_id)["revision"], store)
+    assert restored.carried == plan.carried and 0 in restored.carried
+    assert (restored.base_id, restored.sections_to_analyse) == (plan.base_id, [1])
+    merged, summary = restored.apply([{"proofreading": []}, {"proofreading": []}], [{}, {}])
+    assert merged[0]["proofreading"][0]["revision_status"] == "carried"
+    assert summary["carried"] == 1
@@ -0,0 +1,80 @@
+import json
+
+from structured_output import parse_structured_response, reask_failed, IncrementalJsonArrayParser
+
+FINDING = {"error_sentence": "오타가 있읍니다.", "correction": "오타가 있습니다.", "reason": "맞춤법"}
+SECOND = {"error_sentence": "두번째 문장", "correction": "두 번째 문장", "reason": "띄어쓰기"}
+
+
+def test_plain_array_is_ok():
+    assert parse_structured_response(json.dumps([FINDING], ensure_ascii=False)) == ([FINDING], "ok")
+
+
+def test_empty_array_is_ok():
+    assert parse_structured_response("[]") == ([], "ok")
+
+
+def test_code_fence_is_ok():
+    text = "```json\n" + json.dumps([FINDING], ensure_ascii=False) + "\n```"
+    assert parse_structured_response(text) == ([FINDING], "ok")
+
+
+def test_wrapped_array_is_ok():
+    text = json.dumps({"errors": [FINDING]}, ensure_ascii=False)
+    assert parse_structured_response(text) == ([FINDING], "ok")
+
+
+def test_prose_around_array_is_repaired():
+    text = "검토 결과는 다음과 같습니다.\n" + json.dumps([FINDING], ensure_ascii=False) + "\n이상입니다."
+    assert parse_structured_response(text) == ([FINDING], "repaired")
+
+
+def test_trailing_commas_are_repaired():
+    text = '[{"error_sentence": "오타가 있읍니다.", "correction": "오타가 있습니다.", "reason": "맞춤법",},]'
+    assert parse_structured_response(text) == ([FINDING], "repaired")
+
+
+def test_truncated_array_keeps_completed_objects():
+    full = json.dumps([FINDING, SECOND], ensure_ascii=False)
+    truncated = full[:full.index('"두번째') + 5]
+    assert parse_structured_response(truncated) == ([FINDING], "repaired")
+
+
+def test_single_object_is_ok():
+    assert parse_structured_response(json.dumps(FINDING, ensure_ascii=False)) == ([FINDING], "ok")
+
+
+def test_single_object_with_prose_is_repaired():
+    text = "지적 사항: " + json.dumps(FINDING, ensure_ascii=False) + " 입니다."
+    assert parse_structured_response(text) == ([FINDING], "repaired")
+
+
+def test_unusable_response_fails():
+    assert parse_structured_response("문제가 없습니다.") == ([], "failed")
+    assert parse_structured_response('{"status": "ok"}') == ([], "failed")
+    assert parse_structured_response(None) == ([], "failed")
+
+
+def test_incremental_parser_yields_objects_as_they_complete():
+    parser = IncrementalJsonArrayParser()
+    text = "```json\n" + json.dumps([FINDING, SECOND], ensure_ascii=False)
+    middle = text.index("}") + 1
+    assert parser.feed(text[:middle - 1]) == []
+    assert parser.feed(text[middle - 1:middle]) == [FINDING]
+    assert parser.feed(text[middle:]) == [SECOND]
+
+
+def test_reask_failed_retries_only_unparseable_responses():
+    tasks = [("chain", "a"), ("chain", "b"), ("chain", "c")]
+    outputs = [("[]", None), ("해석할 수 없음", None), (None, RuntimeError("429"))]
+    retried = []
+
+    def run_tasks(retry_tasks):
+        retried.append([text for _, text in retry_tasks])
+        return [(json.dumps([FINDING], ensure_ascii=False), None) for _ in retry_tasks]
+
+    fixed, stats = reask_failed(tasks, outputs, lambda index: "reask-chain", run_tasks, max_reasks=1)
+    assert retried == [["b"]]
+    assert fixed[1][0] == json.dumps([FINDING], ensure_ascii=False)
+    assert fixed[2] is outputs[2]
+    assert stats == {"responses": 2, "ok": 2, "repaired": 0, "failed": 0, "reasked": 1, "recovered": 1}